@@ -0,0 +1,491 @@
+#!/usr/bin/env python3
+"""
+Admin CLI
+Batch administration commands behind admin_helper.sh. One process shares the app's
+Docker client and database session for a whole batch, runs the Docker work of a batch
+concurrently, and keeps database writes on the main thread.
+
+    python admin_cli.py users
+    python admin_cli.py force-release alice bob carol
+    python admin_cli.py add nginx=10 python=4
+    python admin_cli.py delete-users alice bob --yes
+"""
+
+import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import docker
+
+import app as web
+from app import create_app, db, User, Container, recreate_pool_container, process_launch_queue, timed, trace_release
+from catalog import get_catalog
+from streaming import iter_containers, used_host_ports
+
+app = create_app(background=False)
+
+HOST_IP = '192.168.121.183'
+
+# Docker operations running at once within one batch
+DEFAULT_WORKERS = 8
+
+
+class Progress:
+    """Per-item progress lines and a closing summary for one batch"""
+
+    def __init__(self, action, total):
+        self.action = action
+        self.total = total
+        self.done = 0
+        self.failed = 0
+        self.started = time.monotonic()
+
+    def item(self, ok, message):
+        self.done += 1
+        if not ok:
+            self.failed += 1
+        print(f"  [{self.done}/{self.total}] {'[OK]' if ok else '[FAILED]'} {message}")
+
+    def summary(self):
+        elapsed = time.monotonic() - self.started
+        succeeded = self.done - self.failed
+        status = '[OK]' if not self.failed else '[WARNING]'
+        print(f"{status} {self.action}: {succeeded} succeeded, {self.failed} failed in {elapsed:.1f}s")
+        return self.failed == 0
+
+
+def run_batch(action, jobs, workers, describe):
+    """
+    Run (key, function, args) jobs concurrently and report each as it finishes.
+    describe(key, ok, detail) returns the progress line of a finished job.
+    Returns: dict key -> (ok, detail, seconds)
+    """
+    progress = Progress(action, len(jobs))
+    results = {}
+    if not jobs:
+        progress.summary()
+        return results
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {executor.submit(timed, function, *args): key for key, function, args in jobs}
+        for future in as_completed(futures):
+            key = futures[future]
+            try:
+                (ok, detail), seconds = future.result()
+            except Exception as e:
+                ok, detail, seconds = False, str(e), None
+            results[key] = (ok, detail, seconds)
+            progress.item(ok, describe(key, ok, detail))
+    progress.summary()
+    return results
+
+
+def confirm(question, assume_yes):
+    """Ask for a yes/no confirmation unless --yes was given"""
+    if assume_yes:
+        return True
+    answer = input(f"{question} (yes/no): ")
+    return answer.strip() == 'yes'
+
+
+def docker_states():
+    """Docker state of every container in one listing: dict id -> state"""
+    if not web.docker_client:
+        return {}
+    return {summary['id']: summary['state'] for summary in iter_containers(web.docker_client)}
+
+
+def reset_container(docker_id, pool_name):
+    """
+    Stop and remove a user's container; pool containers are recreated fresh and
+    available, even when the old one is already gone.
+    Returns: tuple (ok, detail)
+    """
+    removed = 'removed'
+    try:
+        container = web.docker_client.containers.get(docker_id)
+        container.stop(timeout=10)
+        container.remove()
+    except docker.errors.NotFound:
+        removed = 'already gone'
+
+    if pool_name and pool_name.startswith('pool_'):
+        try:
+            if recreate_pool_container(pool_name):
+                return True, f"{removed}, released to pool"
+            return False, f"{removed}, {pool_name} is not a known pool slot"
+        except docker.errors.APIError as e:
+            return False, f"{removed}, failed to recreate {pool_name}: {e}"
+    return True, removed
+
+
+def find_users(usernames):
+    """
+    Look up users by name, reporting unknown ones.
+    Returns: list of User
+    """
+    users = User.query.filter(User.username.in_(usernames)).all()
+    found = {user.username for user in users}
+    for username in usernames:
+        if username not in found:
+            print(f"[ERROR] User not found: {username}")
+    return users
+
+
+def release_containers(containers, workers, action, recycle=True, delete_failed=False):
+    """
+    Reset a batch of containers concurrently and remove their rows. Pool containers
+    are recreated unless recycle is False; rows of containers that could not be reset
+    are kept for another try unless delete_failed is set.
+    Returns: True if every container was reset
+    """
+    if not web.docker_client:
+        print("[ERROR] Docker is not available")
+        return False
+
+    by_id = {container.id: container for container in containers}
+    jobs = [(container.id, reset_container,
+             (container.container_id, container.pool_name if recycle and container.from_pool else None))
+            for container in containers]
+
+    def describe(container_id, ok, detail):
+        container = by_id[container_id]
+        return f"{container.owner.username}/{container.name} ({container.image_type}): {detail}"
+
+    results = run_batch(action, jobs, workers, describe)
+
+    freed_types = set()
+    for container_id, (ok, _, seconds) in results.items():
+        container = by_id[container_id]
+        if ok:
+            trace_release(container, seconds)
+            freed_types.add(container.image_type)
+        if ok or delete_failed:
+            db.session.delete(container)
+    db.session.commit()
+
+    # Queued launches can take the freed pool containers right away
+    if freed_types:
+        process_launch_queue(sorted(freed_types))
+    return all(ok for ok, _, _ in results.values())
+
+
+def list_users():
+    """Print every user with their container count"""
+    counts = dict(db.session.query(Container.user_id, db.func.count(Container.id)).group_by(Container.user_id).all())
+    users = User.query.order_by(User.id).all()
+    print(f'Total users: {len(users)}\n')
+    print('{:<5} {:<20} {:<35} {:<12} {:<20}'.format('ID', 'Username', 'Email', 'Containers', 'Created'))
+    print('=' * 95)
+    for user in users:
+        created = user.created_at.strftime('%Y-%m-%d %H:%M')
+        print('{:<5} {:<20} {:<35} {:<12} {:<20}'.format(user.id, user.username, user.email,
+                                                         counts.get(user.id, 0), created))
+    return True
+
+
+def show_containers(usernames=None):
+    """Print assigned containers with their database and Docker status"""
+    query = Container.query.join(User).order_by(Container.id)
+    if usernames:
+        query = query.filter(User.username.in_(usernames))
+    containers = query.all()
+    if not containers:
+        print('No containers assigned')
+        return True
+
+    states = docker_states()
+    print('╔════════════════════════════════════════════════════════════════╗')
+    print('║         Assigned Containers Details                           ║')
+    print('╚════════════════════════════════════════════════════════════════╝')
+    print()
+    for c in containers:
+        docker_status = states.get(c.container_id, 'missing') if web.docker_client else 'unknown'
+        print('Container ID: {} | User: {}'.format(c.id, c.owner.username))
+        print('  Name: {}'.format(c.name))
+        print('  Type: {}'.format(c.image_type))
+        print('  Pool Name: {}'.format(c.pool_name or 'N/A'))
+        print('  IP: {}'.format(HOST_IP))
+        print('  Port: {}'.format(c.host_port))
+        if c.image_type == 'ubuntu-ssh':
+            print('  SSH: ssh devuser@{} -p {} (password: devpass123)'.format(HOST_IP, c.host_port))
+        else:
+            print('  URL: http://{}:{}'.format(HOST_IP, c.host_port))
+        print('  DB Status: {} | Docker Status: {}'.format(c.status, docker_status))
+        print('  From Pool: {}'.format('Yes' if c.from_pool else 'No'))
+        print('-' * 70)
+    return True
+
+
+def release_by_id(container_ids, workers, assume_yes, permanent=False):
+    """Release containers back to the pool, or delete them permanently"""
+    containers = Container.query.filter(Container.id.in_(container_ids)).all()
+    found = {container.id for container in containers}
+    for container_id in container_ids:
+        if container_id not in found:
+            print(f"[ERROR] Container not found: {container_id}")
+
+    if not permanent:
+        not_pooled = [c for c in containers if not c.from_pool or not c.pool_name]
+        for container in not_pooled:
+            print(f"[WARNING]  {container.name} (ID {container.id}) is not from the pool - cannot release")
+            print("   Use delete-container to delete it permanently instead")
+        containers = [c for c in containers if c not in not_pooled]
+    if not containers:
+        return False
+
+    for container in containers:
+        print(f"  {container.id:5d}  {container.owner.username:20s} {container.name:25s} "
+              f"{container.image_type:10s} port {container.host_port}")
+    if permanent:
+        print('[WARNING]  WARNING: This will PERMANENTLY delete these containers!')
+        question = f"DELETE {len(containers)} containers permanently?"
+    else:
+        question = f"Release {len(containers)} containers back to pool?"
+    if not confirm(question, assume_yes):
+        print("Cancelled")
+        return False
+
+    if permanent:
+        # The pool slot goes away with the container
+        return release_containers(containers, workers, 'Delete containers', recycle=False, delete_failed=True)
+    return release_containers(containers, workers, 'Release containers')
+
+
+def force_release_users(usernames, workers, assume_yes):
+    """Release every container of many users at once"""
+    users = find_users(usernames)
+    containers = [container for user in users for container in user.containers]
+    if not containers:
+        print('No containers to release')
+        return bool(users)
+
+    for user in users:
+        pool_count = sum(1 for c in user.containers if c.from_pool)
+        print(f"{user.username}: {len(user.containers)} containers "
+              f"({pool_count} from pool, {len(user.containers) - pool_count} will be deleted)")
+    if not confirm(f"Release all {len(containers)} containers of {len(users)} users?", assume_yes):
+        print("Cancelled")
+        return False
+
+    # Rows go even when the Docker side failed, like the interactive release always did
+    return release_containers(containers, workers, 'Force release', delete_failed=True)
+
+
+def delete_users(usernames, workers, assume_yes):
+    """Delete many users, releasing their containers to the pool first"""
+    users = find_users(usernames)
+    if not users:
+        return False
+
+    for user in users:
+        print(f"{user.username} (ID {user.id}, {user.email}): {len(user.containers)} containers, "
+              f"created {user.created_at.strftime('%Y-%m-%d %H:%M')}")
+    if not confirm(f"Delete {len(users)} users?", assume_yes):
+        print("Cancelled")
+        return False
+
+    containers = [container for user in users for container in user.containers]
+    ok = True
+    if containers:
+        ok = release_containers(containers, workers, 'Release containers', delete_failed=True)
+
+    # Deleting a user also removes its launch requests
+    for user in users:
+        db.session.delete(user)
+    db.session.commit()
+    print(f"[OK] Deleted {len(users)} users")
+    return ok
+
+
+def parse_counts(specs):
+    """
+    Parse TYPE=N arguments.
+    Returns: dict image type -> count, or None when an argument is invalid
+    """
+    catalog = get_catalog()
+    counts = {}
+    for spec in specs:
+        image_type, _, count = spec.partition('=')
+        if image_type not in catalog.pool_types() or not count.isdigit() or int(count) <= 0:
+            print(f"[ERROR] Expected TYPE=N with a pooled type ({', '.join(catalog.pool_types())}): {spec}")
+            return None
+        counts[image_type] = counts.get(image_type, 0) + int(count)
+    return counts
+
+
+def free_pool_slots(image_type, count, used_indices, used_ports):
+    """
+    The next `count` pool slots of a type, filling gaps in the index sequence and
+    skipping host ports that are already published.
+    Returns: list of (pool_index, host_port)
+    """
+    catalog = get_catalog()
+    start, end = catalog.port_range(image_type)
+    slots = []
+    pool_index = 0
+    while len(slots) < count and start + pool_index <= end:
+        host_port = start + pool_index
+        if pool_index not in used_indices:
+            if host_port in used_ports:
+                print(f"  [WARNING]  Port {host_port} already in use, skipping")
+            else:
+                slots.append((pool_index, host_port))
+        pool_index += 1
+    return slots
+
+
+def create_pool_slot(image_type, pool_index, host_port):
+    """
+    Create one available pool container.
+    Returns: tuple (ok, detail)
+    """
+    config = get_catalog().build_container_config(
+        image_type,
+        name=f'pool_{image_type}_{pool_index}_{host_port}',
+        host_port=host_port,
+        labels={
+            'pool': 'true',
+            'type': image_type,
+            'status': 'available',
+            'pool_index': str(pool_index)
+        }
+    )
+    web.docker_client.containers.run(**config)
+    return True, f"port {host_port}"
+
+
+def add_containers(counts, workers):
+    """Add pool containers of several types in one concurrent batch"""
+    if not web.docker_client:
+        print("[ERROR] Docker is not available")
+        return False
+
+    catalog = get_catalog()
+    used_ports = used_host_ports(web.docker_client)
+    jobs = []
+    for image_type, count in counts.items():
+        used_indices = {int(summary['labels']['pool_index'])
+                        for summary in iter_containers(web.docker_client,
+                                                       filters={'label': ['pool=true', f'type={image_type}']})
+                        if summary['labels'].get('pool_index', '').isdigit()}
+        slots = free_pool_slots(image_type, count, used_indices, used_ports)
+        if len(slots) < count:
+            print(f"[WARNING]  Only {len(slots)} free {image_type} slots in its port range")
+        print(f"Adding {len(slots)} {image_type} containers")
+
+        # Pull once per type instead of once per container
+        image = catalog.images[image_type]['name']
+        try:
+            web.docker_client.images.get(image)
+        except docker.errors.ImageNotFound:
+            print(f"  Pulling {image}...")
+            web.docker_client.images.pull(image)
+
+        jobs.extend(((image_type, pool_index), create_pool_slot, (image_type, pool_index, host_port))
+                    for pool_index, host_port in slots)
+    print()
+
+    results = run_batch('Add containers', jobs, workers,
+                        lambda key, ok, detail: f"pool_{key[0]}_{key[1]}: {detail}")
+
+    created = {}
+    for (image_type, _), (ok, _, _) in results.items():
+        if ok:
+            created[image_type] = created.get(image_type, 0) + 1
+    for image_type, number in created.items():
+        print(f"[OK] Created {number} new {image_type} containers")
+
+    # Waiting launches can use the new containers immediately
+    if created:
+        process_launch_queue(sorted(created))
+    return all(ok for ok, _, _ in results.values())
+
+
+def set_admin(usernames, granted):
+    """Grant or revoke access to the admin pages"""
+    users = find_users(usernames)
+    for user in users:
+        user.is_admin = granted
+        print(f"[OK] {user.username} {'is now an admin' if granted else 'is no longer an admin'}")
+    db.session.commit()
+    return len(users) == len(set(usernames))
+
+
+def show_status():
+    """Print user and container totals"""
+    print(" USERS:")
+    print('   Total: {}'.format(User.query.count()))
+    print()
+    print(" ASSIGNED CONTAINERS:")
+    total = Container.query.count()
+    from_pool = Container.query.filter_by(from_pool=True).count()
+    print('   Total: {} ({} from pool)'.format(total, from_pool))
+    return True
+
+
+def parse_args(args):
+    """Parse admin_cli.py command line options"""
+    parser = argparse.ArgumentParser(description='Batch administration for the container pool')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help='Docker operations to run at once')
+    parser.add_argument('--yes', action='store_true', help='Do not ask for confirmation')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    commands.add_parser('users', help='List all users')
+    commands.add_parser('status', help='Show user and container totals')
+
+    containers = commands.add_parser('containers', help='Show assigned containers with Docker status')
+    containers.add_argument('usernames', nargs='*', help='Only these users')
+
+    release = commands.add_parser('release', help='Release containers back to the pool')
+    release.add_argument('ids', nargs='+', type=int, metavar='ID')
+
+    delete = commands.add_parser('delete-container', help='Delete containers permanently')
+    delete.add_argument('ids', nargs='+', type=int, metavar='ID')
+
+    force = commands.add_parser('force-release', help='Release all containers of the given users')
+    force.add_argument('usernames', nargs='+', metavar='USER')
+
+    delete_user = commands.add_parser('delete-users', help='Delete users after releasing their containers')
+    delete_user.add_argument('usernames', nargs='+', metavar='USER')
+
+    add = commands.add_parser('add', help='Add pool containers, e.g. nginx=5 python=2')
+    add.add_argument('counts', nargs='+', metavar='TYPE=N')
+
+    grant = commands.add_parser('grant-admin', help='Give users access to the admin pages')
+    grant.add_argument('usernames', nargs='+', metavar='USER')
+
+    revoke = commands.add_parser('revoke-admin', help='Remove access to the admin pages')
+    revoke.add_argument('usernames', nargs='+', metavar='USER')
+    return parser.parse_args(args)
+
+
+def main(args):
+    options = parse_args(args)
+    with app.app_context():
+        if options.command == 'users':
+            return list_users()
+        if options.command == 'status':
+            return show_status()
+        if options.command == 'containers':
+            return show_containers(options.usernames)
+        if options.command == 'release':
+            return release_by_id(options.ids, options.workers, options.yes)
+        if options.command == 'delete-container':
+            return release_by_id(options.ids, options.workers, options.yes, permanent=True)
+        if options.command == 'force-release':
+            return force_release_users(options.usernames, options.workers, options.yes)
+        if options.command == 'delete-users':
+            return delete_users(options.usernames, options.workers, options.yes)
+        if options.command == 'add':
+            counts = parse_counts(options.counts)
+            return counts is not None and add_containers(counts, options.workers)
+        if options.command in ('grant-admin', 'revoke-admin'):
+            return set_admin(options.usernames, options.command == 'grant-admin')
+    return False
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main(sys.argv[1:]) else 1)
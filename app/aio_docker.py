@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Asyncio Docker Client
+A small Engine API client on asyncio streams, for the ASGI app (asgi.py): a request
+waiting on Docker holds a coroutine instead of a worker thread, so one process can
+keep hundreds of Docker calls in flight. Talks HTTP/1.1 over the unix socket (or
+tcp:// from DOCKER_HOST) with a pool of keep-alive connections.
+
+Only the calls the pool needs are implemented: list, inspect, create, start, stop and
+remove containers. Container configs are the docker-py run() arguments built by
+catalog.build_container_config(), translated with docker-py's own helpers so both
+clients create identical containers.
+"""
+
+import asyncio
+import json
+import os
+from urllib.parse import urlencode, urlparse
+
+from docker.models.containers import _create_container_args
+from docker.types import ContainerConfig
+
+DEFAULT_HOST = 'unix:///var/run/docker.sock'
+
+# Engine API version used in request paths (Docker 20.10 and later)
+API_VERSION = '1.41'
+
+# Client settings
+# MAX_CONNECTIONS: sockets open to the daemon at once; further calls wait for one
+# TIMEOUT:         seconds a call may take before it fails
+MAX_CONNECTIONS = 64
+TIMEOUT = 60
+
+
+class DockerError(Exception):
+    """Engine API error response, or a failed connection (status 0)"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class NotFound(DockerError):
+    """No such container"""
+
+
+async def read_response(reader):
+    """
+    Read one HTTP/1.1 response.
+    Returns: tuple (status, body bytes, keep_alive)
+    """
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionResetError('Connection closed by Docker')
+    status = int(status_line.split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    keep_alive = headers.get('connection', '').lower() != 'close'
+    if status in (204, 304) or 100 <= status < 200:
+        return status, b'', keep_alive
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        chunks = []
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            if size == 0:
+                await reader.readline()
+                break
+            chunks.append(await reader.readexactly(size))
+            await reader.readline()
+        return status, b''.join(chunks), keep_alive
+    if 'content-length' in headers:
+        return status, await reader.readexactly(int(headers['content-length'])), keep_alive
+    return status, await reader.read(), False
+
+
+def create_body(config, version=API_VERSION):
+    """
+    Engine API create request for a docker-py containers.run() config.
+    Returns: tuple (container name, body dict)
+    """
+    kwargs = dict(config)
+    name = kwargs.pop('name', None)
+    kwargs.pop('detach', None)
+    kwargs.setdefault('command', None)
+    kwargs['version'] = version
+    create_kwargs = _create_container_args(kwargs)
+    create_kwargs.pop('name', None)
+    return name, dict(ContainerConfig(version, detach=True, **create_kwargs))
+
+
+class AsyncDockerClient:
+    """Engine API client sharing keep-alive connections between coroutines of one event loop"""
+
+    def __init__(self, base_url=None, max_connections=MAX_CONNECTIONS, timeout=TIMEOUT, version=API_VERSION):
+        self.base_url = base_url or os.environ.get('DOCKER_HOST', DEFAULT_HOST)
+        self.version = version
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.loop = None
+        self.slots = None
+        self.idle = []
+        self.requests = 0
+
+    def bind(self):
+        """
+        Connections belong to one event loop; start afresh when called from another
+        (call close() before a loop ends, as the ASGI lifespan shutdown does)
+        """
+        loop = asyncio.get_running_loop()
+        if loop is not self.loop:
+            self.loop = loop
+            self.slots = asyncio.Semaphore(self.max_connections)
+            self.idle = []
+
+    async def connect(self):
+        url = urlparse(self.base_url)
+        if url.scheme == 'unix':
+            return await asyncio.open_unix_connection(url.path)
+        if url.scheme in ('tcp', 'http'):
+            return await asyncio.open_connection(url.hostname, url.port or 2375)
+        raise DockerError(0, f"Unsupported DOCKER_HOST: {self.base_url}")
+
+    async def request(self, method, path, params=None, body=None):
+        """
+        Send one Engine API call.
+        Returns: decoded JSON body, or None when there is none
+        """
+        target = f"/v{self.version}{path}"
+        if params:
+            target += '?' + urlencode(params)
+        payload = json.dumps(body).encode() if body is not None else b''
+        message = (f"{method} {target} HTTP/1.1\r\nHost: docker\r\n"
+                   f"Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n\r\n").encode() + payload
+
+        self.bind()
+        async with self.slots:
+            # A pooled connection the daemon has closed fails at once; retry on a new one
+            for attempt in range(2):
+                reused = bool(self.idle)
+                reader, writer = self.idle.pop() if reused else await self.open()
+                try:
+                    writer.write(message)
+                    await writer.drain()
+                    status, data, keep_alive = await asyncio.wait_for(read_response(reader), self.timeout)
+                except (OSError, asyncio.IncompleteReadError) as e:
+                    writer.close()
+                    if reused and attempt == 0:
+                        continue
+                    raise DockerError(0, f"Docker connection failed: {e}")
+                except BaseException:
+                    # Timeouts and cancellation leave the response unread
+                    writer.close()
+                    raise
+                break
+            if keep_alive:
+                self.idle.append((reader, writer))
+            else:
+                writer.close()
+        self.requests += 1
+
+        result = json.loads(data) if data and data[:1] in (b'{', b'[') else None
+        if status >= 400:
+            message = result.get('message') if isinstance(result, dict) else data.decode(errors='replace')
+            raise (NotFound if status == 404 else DockerError)(status, message or f"HTTP {status}")
+        return result
+
+    async def open(self):
+        try:
+            return await asyncio.wait_for(self.connect(), self.timeout)
+        except (OSError, asyncio.TimeoutError) as e:
+            raise DockerError(0, f"Could not connect to Docker at {self.base_url}: {e}")
+
+    async def containers(self, all=False, filters=None):
+        """Container summaries (GET /containers/json); filters as in docker-py"""
+        params = {'all': '1' if all else '0'}
+        if filters:
+            params['filters'] = json.dumps({key: value if isinstance(value, list) else [value]
+                                            for key, value in filters.items()})
+        return await self.request('GET', '/containers/json', params)
+
+    async def inspect(self, container_id):
+        return await self.request('GET', f"/containers/{container_id}/json")
+
+    async def create(self, config):
+        """Create a container from a docker-py run() config; returns its id"""
+        name, body = create_body(config, self.version)
+        result = await self.request('POST', '/containers/create', {'name': name} if name else None, body)
+        return result['Id']
+
+    async def start(self, container_id):
+        await self.request('POST', f"/containers/{container_id}/start")
+
+    async def run(self, config):
+        """Create and start a container, like docker-py containers.run(detach=True); returns its id"""
+        container_id = await self.create(config)
+        await self.start(container_id)
+        return container_id
+
+    async def stop(self, container_id, timeout=10):
+        await self.request('POST', f"/containers/{container_id}/stop", {'t': timeout})
+
+    async def remove(self, container_id, force=False):
+        await self.request('DELETE', f"/containers/{container_id}", {'force': '1'} if force else None)
+
+    async def close(self):
+        """Close the pooled connections"""
+        idle, self.idle = self.idle, []
+        for _, writer in idle:
+            writer.close()
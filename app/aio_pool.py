@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Async Pool Operations
+Coroutine versions of the pool operations in app.py (availability, status, assign
+and release) on top of aio_docker.AsyncDockerClient, for the ASGI app. They follow
+the synchronous versions step for step and create the same containers and labels, so
+the monitor and the CLI tools cannot tell which path made a container.
+"""
+
+import asyncio
+
+from aio_docker import DockerError, NotFound
+from catalog import get_catalog
+from lifecycle import Timeline
+
+# Pool containers being assigned by this process; hidden from other launches meanwhile
+claimed = set()
+
+
+def available_filters(image_type):
+    return {'label': ['pool=true', f'type={image_type}', 'status=available'], 'status': 'running'}
+
+
+async def list_available(client, image_type):
+    """Summaries of running available pool containers of one type not already being assigned here"""
+    summaries = await client.containers(filters=available_filters(image_type))
+    return [summary for summary in summaries if summary['Id'] not in claimed]
+
+
+async def claim_available(client, image_type, count):
+    """
+    Reserve up to count available pool containers of one type for assignment.
+    Returns: list of container summaries; pass each to assign_from_pool()
+    """
+    summaries = (await list_available(client, image_type))[:count]
+    # Nothing is awaited between filtering out claimed containers and claiming these,
+    # so concurrent launches never get the same container
+    claimed.update(summary['Id'] for summary in summaries)
+    return summaries
+
+
+async def pool_availability(client):
+    """Get the count of available containers in the pool for each type"""
+    types = get_catalog().pool_types()
+    counts = await asyncio.gather(*(list_available(client, image_type) for image_type in types),
+                                  return_exceptions=True)
+    availability = {}
+    for image_type, available in zip(types, counts):
+        if isinstance(available, Exception):
+            print(f"Error getting pool availability for {image_type}: {available}")
+            availability[image_type] = 0
+        else:
+            availability[image_type] = len(available)
+    return availability
+
+
+async def container_status(client, container_id):
+    """
+    Get the current status of a container.
+    Returns: status string, 'stopped', or 'unknown' while Docker cannot be reached
+    """
+    try:
+        return (await client.inspect(container_id))['State']['Status']
+    except NotFound:
+        return 'stopped'
+    except DockerError as e:
+        if e.status == 0:
+            return 'unknown'
+        print(f"Error getting container status: {e}")
+        return 'error'
+    except Exception as e:
+        print(f"Error getting container status: {e}")
+        return 'error'
+
+
+def host_port_of(summary):
+    """Published host port of a container summary, or None"""
+    for port in summary.get('Ports') or []:
+        if port.get('PublicPort'):
+            return int(port['PublicPort'])
+    return None
+
+
+async def assign_from_pool(client, image_type, user_id, pool_container, timeline=None):
+    """
+    Assign a claimed pool container to a user (see app.assign_container_from_pool).
+    pool_container: summary from claim_available()
+    Returns: tuple (container_id, host_port, status, pool_name) or (None, None, error_message, None)
+    """
+    timeline = timeline or Timeline(None, image_type)
+    catalog = get_catalog()
+    try:
+        if image_type not in catalog.images:
+            return None, None, f"Invalid image type: {image_type}", None
+        pool_name = pool_container['Names'][0].lstrip('/')
+        host_port = host_port_of(pool_container)
+        if not host_port:
+            return None, None, "Could not determine container port", None
+        timeline.mark('claimed', detail=pool_name)
+
+        # Stop and remove the pool container, then recreate it with "assigned" labels
+        await client.stop(pool_container['Id'])
+        await client.remove(pool_container['Id'])
+        container_config = catalog.build_container_config(
+            image_type,
+            name=pool_name,
+            host_port=host_port,
+            labels={
+                'pool': 'true',
+                'type': image_type,
+                'status': 'assigned',
+                'user_id': str(user_id)
+            },
+            image=pool_container.get('Image')
+        )
+        container_id = await client.run(container_config)
+        timeline.mark('started')
+
+        if (await client.inspect(container_id))['State']['Status'] == 'running':
+            timeline.mark('ready', detail=f"port {host_port}")
+        return container_id, host_port, 'running', pool_name
+
+    except Exception as e:
+        print(f"Error assigning container from pool: {e}")
+        timeline.mark('failed', detail=str(e))
+        return None, None, str(e), None
+    finally:
+        claimed.discard(pool_container['Id'])
+
+
+async def release_to_pool(client, container_id, pool_name):
+    """
+    Release a container back to the pool by resetting it to available status.
+    pool_name: original pool slot, or None for on-demand containers, which are not recycled
+    Returns: True if successful, False otherwise
+    """
+    try:
+        await client.stop(container_id, timeout=10)
+        await client.remove(container_id)
+
+        if not pool_name or not pool_name.startswith('pool_'):
+            return True
+        container_config = get_catalog().pool_slot_config(pool_name)
+        if not container_config:
+            return False
+        await client.run(container_config)
+        return True
+    except DockerError as e:
+        print(f"Error releasing container to pool: {e}")
+        return False
@@ -6,98 +6,75 @@ A simple platform that allows users to provision Docker containers on demand.
 
 import os
 import random
+import stat as stat_module
+import secrets
+import hashlib
+import mimetypes
 import shutil
+import time
+from functools import wraps
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from flask import Flask, render_template, redirect, url_for, flash, request, send_from_directory
+from flask import Flask, render_template, redirect, url_for, flash, request, send_from_directory, jsonify, g, abort
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
 from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+from werkzeug.security import generate_password_hash, check_password_hash, safe_join
 from werkzeug.utils import secure_filename
 import docker
-from datetime import datetime
+from datetime import datetime, timedelta
+from catalog import get_catalog, start_watcher as start_catalog_watcher
+from launch_queue import fair_order, estimate_wait_seconds, format_wait, get_queue_settings
+from leases import get_lease_settings, lease_expiry, format_remaining
+from warm_cache import get_warm_settings, warm_cutoff, make_room
+from metrics import record_metrics
+from demand_trace import record_event
+from lifecycle import EventWriter, Timeline, event_row, summarize_events
+from database import get_database_uri, engine_options
+from lazy_docker import LazyDockerClient
+from docker_scheduler import scheduler as docker_scheduler
+from circuit_breaker import breaker as docker_breaker, DOCKER_UNREACHABLE
+from resource_sampler import get_sampler, start_sampler, sparkline
+from streaming import iter_containers
+from resource_profiles import format_size
+from session_cache import TTLCache, StaleCache
+from file_cache import FileCache, file_etag
+from request_profiler import RequestProfiler, MODES as PROFILE_MODES
 
-# Initialize Flask app
+# Flask app; create_app() binds the extensions and starts background work, so
+# importing this module (as the CLI tools do) touches neither Docker nor the disk
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///paas_platform.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = get_database_uri()
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['UPLOAD_FOLDER'] = '/opt/my-paas/user_files'
+app.config['UPLOAD_FOLDER'] = os.environ.get('UPLOAD_FOLDER', '/opt/my-paas/user_files')  # Created on first upload
 app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024  # 50MB max file size
 app.config['ALLOWED_EXTENSIONS'] = {'html', 'css', 'js', 'jpg', 'jpeg', 'png', 'gif', 'txt', 'md', 'json'}
+app.config['USER_CACHE_TTL'] = int(os.environ.get('USER_CACHE_TTL', '5'))  # Seconds, 0 disables; per process, see README
+app.config['API_MAX_BATCH'] = 50  # Items per bulk API request
+app.config['API_PARALLELISM'] = int(os.environ.get('API_PARALLELISM', '4'))  # Concurrent Docker operations per request
+app.config['PREVIEW_CACHE_BYTES'] = int(os.environ.get('PREVIEW_CACHE_BYTES', 16 * 1024 * 1024))  # 0 disables the cache
+app.config['PREVIEW_CACHE_MAX_FILE'] = int(os.environ.get('PREVIEW_CACHE_MAX_FILE', 256 * 1024))  # Larger files stream from disk
+app.config['USE_X_SENDFILE'] = os.environ.get('USE_X_SENDFILE') == '1'  # Only behind a server that honors X-Sendfile
+app.config['PROFILE_ROUTES'] = [r for r in os.environ.get('PROFILE_ROUTES', '').split(',') if r]  # Endpoints to profile
+app.config['PROFILE_SAMPLE_RATE'] = float(os.environ.get('PROFILE_SAMPLE_RATE', '0'))  # Share of all requests to profile
+app.config['PROFILE_MODE'] = os.environ.get('PROFILE_MODE', 'sample')  # sample or cprofile
+app.config['DASHBOARD_MAX_AGE'] = float(os.environ.get('DASHBOARD_MAX_AGE', '5'))  # Seconds before Docker state is refreshed
+app.config['DASHBOARD_WAIT'] = float(os.environ.get('DASHBOARD_WAIT', '0.5'))  # Seconds a page waits for the refresh
 
-# Create upload folder if it doesn't exist
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-
-# Available container images
-AVAILABLE_IMAGES = {
-    'nginx': {
-        'name': 'nginx:alpine',
-        'port': 80,
-        'description': 'Lightweight web server (perfect for static sites)',
-        'category': 'Web Server'
-    },
-    'apache': {
-        'name': 'httpd:alpine',
-        'port': 80,
-        'description': 'Apache HTTP Server',
-        'category': 'Web Server'
-    },
-    'node': {
-        'name': 'node:18-alpine',
-        'port': 3000,
-        'description': 'Node.js runtime environment',
-        'category': 'Runtime'
-    },
-    'python': {
-        'name': 'python:3.11-alpine',
-        'port': 8000,
-        'description': 'Python runtime with built-in HTTP server',
-        'category': 'Runtime'
-    },
-    'wordpress': {
-        'name': 'wordpress:latest',
-        'port': 80,
-        'description': 'WordPress CMS (requires database)',
-        'category': 'CMS'
-    },
-    'redis': {
-        'name': 'redis:alpine',
-        'port': 6379,
-        'description': 'Redis in-memory data store',
-        'category': 'Database'
-    },
-    'mysql': {
-        'name': 'mysql:8',
-        'port': 3306,
-        'description': 'MySQL database server',
-        'category': 'Database'
-    },
-    'postgres': {
-        'name': 'postgres:alpine',
-        'port': 5432,
-        'description': 'PostgreSQL database server',
-        'category': 'Database'
-    },
-    'ubuntu-ssh': {
-        'name': 'ubuntu-ssh:latest',
-        'port': 22,
-        'description': 'Ubuntu Linux with SSH access (full shell environment)',
-        'category': 'Linux Machine'
-    }
-}
-
-# Initialize extensions
-db = SQLAlchemy(app)
-login_manager = LoginManager(app)
+# Extensions, bound to the app in create_app()
+db = SQLAlchemy()
+login_manager = LoginManager()
 login_manager.login_view = 'login'
 login_manager.login_message = 'Please log in to access this page.'
 
-# Initialize Docker client
-try:
-    docker_client = docker.from_env()
-except Exception as e:
-    print(f"Warning: Could not connect to Docker: {e}")
-    docker_client = None
+# Docker client, connected on first use
+docker_client = LazyDockerClient()
+
+app.add_template_filter(format_remaining, 'lease_remaining')
+app.add_template_filter(sparkline, 'sparkline')
+app.add_template_filter(format_size, 'size')
 
 # Database Models
 class User(UserMixin, db.Model):
@@ -107,7 +84,13 @@ class User(UserMixin, db.Model):
     email = db.Column(db.String(120), unique=True, nullable=False)
     password_hash = db.Column(db.String(200), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_seen_at = db.Column(db.DateTime, nullable=True)  # Last authenticated request, used to prioritize recovery
+    plan = db.Column(db.String(20), nullable=True)  # Lease plan from pool_catalog.json, None for the default plan
+    api_token_hash = db.Column(db.String(64), unique=True, index=True, nullable=True)  # SHA-256 of the JSON API token
+    is_admin = db.Column(db.Boolean, default=False)  # Granted with admin_cli.py grant-admin
     containers = db.relationship('Container', backref='owner', lazy=True, cascade='all, delete-orphan')
+    launch_requests = db.relationship('LaunchRequest', backref='owner', lazy=True, cascade='all, delete-orphan')
+    warm_containers = db.relationship('WarmContainer', backref='owner', lazy=True, cascade='all, delete-orphan')
     
     def set_password(self, password):
         """Hash and set the user password"""
@@ -123,28 +106,286 @@ class User(UserMixin, db.Model):
 
 class Container(db.Model):
     """Container model to track user's deployed containers"""
+    # Ids are never reused (upgrade_schema() rebuilds older SQLite tables), so a warm
+    # container's id and files folder stay its own
+    __table_args__ = {'sqlite_autoincrement': True}
     id = db.Column(db.Integer, primary_key=True)
     container_id = db.Column(db.String(64), unique=True, nullable=False)
     name = db.Column(db.String(100), nullable=True)  # User-friendly name
     image_name = db.Column(db.String(100), nullable=False)
-    image_type = db.Column(db.String(50), nullable=False, default='nginx')
-    status = db.Column(db.String(20), nullable=False)
+    image_type = db.Column(db.String(50), nullable=False, default='nginx', index=True)
+    status = db.Column(db.String(20), nullable=False, index=True)
     host_port = db.Column(db.Integer, nullable=False)
     container_port = db.Column(db.Integer, nullable=False)
     has_custom_files = db.Column(db.Boolean, default=False)
     from_pool = db.Column(db.Boolean, default=True)  # Track if container is from pool
-    pool_name = db.Column(db.String(100), nullable=True)  # Original pool container name
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    pool_name = db.Column(db.String(100), nullable=True, index=True)  # Original pool container name
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    lease_expires_at = db.Column(db.DateTime, nullable=True)  # None means the lease never expires
+    snapshot = db.relationship('ContainerSnapshot', backref='container', uselist=False, cascade='all, delete-orphan')
     
     def __repr__(self):
         return f'<Container {self.container_id[:12]}>'
 
 
+class ContainerSnapshot(db.Model):
+    """Latest writable-layer snapshot of an assigned container, taken by the container monitor (snapshots.py)"""
+    container_id = db.Column(db.Integer, db.ForeignKey('container.id'), primary_key=True)  # Container.id
+    image = db.Column(db.String(200), nullable=False)  # repository:tag the snapshot is committed to
+    image_id = db.Column(db.String(80), nullable=False)
+    source_id = db.Column(db.String(64), nullable=False)  # Docker id of the container it was taken from
+    layer_bytes = db.Column(db.BigInteger, nullable=False)  # Writable layer size when taken
+    taken_at = db.Column(db.DateTime, nullable=False)
+    seconds = db.Column(db.Float, nullable=True)  # Time the commit took
+    restores = db.Column(db.Integer, default=0)
+    restored_at = db.Column(db.DateTime, nullable=True)
+    restore_seconds = db.Column(db.Float, nullable=True)  # Time the last restore took
+    
+    def __repr__(self):
+        return f'<ContainerSnapshot {self.container_id} {self.image}>'
+
+
+class WarmContainer(db.Model):
+    """Pool container its user stopped, kept paused for a quick relaunch (warm_cache.py)"""
+    id = db.Column(db.Integer, primary_key=True)  # Container.id it had; a reclaim restores the row under it
+    container_id = db.Column(db.String(64), unique=True, nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    image_type = db.Column(db.String(50), nullable=False, index=True)
+    image_name = db.Column(db.String(100), nullable=False)
+    name = db.Column(db.String(100), nullable=True)
+    host_port = db.Column(db.Integer, nullable=False)
+    container_port = db.Column(db.Integer, nullable=False)
+    pool_name = db.Column(db.String(100), nullable=False)
+    has_custom_files = db.Column(db.Boolean, default=False)
+    created_at = db.Column(db.DateTime, nullable=True)  # When the container was first assigned
+    released_at = db.Column(db.DateTime, nullable=False, index=True)
+    
+    def __repr__(self):
+        return f'<WarmContainer {self.id} {self.image_type} {self.container_id[:12]}>'
+
+
+class LaunchRequest(db.Model):
+    """Launch request waiting for a free container of its type"""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    image_type = db.Column(db.String(50), nullable=False)
+    container_name = db.Column(db.String(100), nullable=True)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, claimed, assigned, cancelled
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    claimed_at = db.Column(db.DateTime, nullable=True)
+    served_at = db.Column(db.DateTime, nullable=True)
+    
+    def __repr__(self):
+        return f'<LaunchRequest {self.id} {self.image_type} {self.status}>'
+
+
+class ContainerEvent(db.Model):
+    """One step in the life of a container, written in batches by lifecycle.EventWriter"""
+    id = db.Column(db.Integer, primary_key=True)
+    container_id = db.Column(db.Integer, nullable=True, index=True)  # Container.id; kept after the container is gone
+    user_id = db.Column(db.Integer, nullable=True)
+    image_type = db.Column(db.String(50), nullable=False, index=True)
+    event = db.Column(db.String(20), nullable=False)  # claimed, started, ready, files-mounted, released, recovered, failed
+    at = db.Column(db.DateTime, nullable=False, index=True)
+    phase_ms = db.Column(db.Float, nullable=True)  # Duration of the phase this event ends
+    elapsed_ms = db.Column(db.Float, nullable=True)  # Time since the operation started
+    detail = db.Column(db.String(255), nullable=True)
+    
+    def __repr__(self):
+        return f'<ContainerEvent {self.event} {self.container_id}>'
+
+
+class MonitorWorker(db.Model):
+    """Container monitor worker process, kept alive by its heartbeat"""
+    name = db.Column(db.String(100), primary_key=True)
+    heartbeat_at = db.Column(db.DateTime, nullable=False)
+    started_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<MonitorWorker {self.name}>'
+
+
+class ShardLease(db.Model):
+    """Lease of one container shard by a monitor worker"""
+    shard = db.Column(db.Integer, primary_key=True)
+    owner = db.Column(db.String(100), nullable=True)
+    expires_at = db.Column(db.DateTime, nullable=True)
+    last_cycle_at = db.Column(db.DateTime, nullable=True)
+    last_cycle_seconds = db.Column(db.Float, nullable=True)
+    last_cycle_containers = db.Column(db.Integer, nullable=True)
+    
+    def __repr__(self):
+        return f'<ShardLease {self.shard} {self.owner}>'
+
+
+def write_container_events(rows):
+    """Insert a batch of lifecycle events (runs on the writer thread)"""
+    with app.app_context():
+        db.session.execute(db.insert(ContainerEvent), rows)
+        db.session.commit()
+
+
+# Lifecycle events are written off the request path
+event_writer = EventWriter(write_container_events)
+
+
+def start_timeline(image_type, user_id=None):
+    """Timeline of a launch or restart whose events go to the lifecycle table"""
+    return Timeline(event_writer, image_type, user_id)
+
+
+def log_container_event(container, event, seconds=None, detail=None):
+    """Record a single lifecycle event of a tracked container"""
+    event_writer.emit(event_row(event, container.image_type, container_id=container.id, user_id=container.user_id,
+                                phase=seconds, detail=detail))
+
+
+# Users and their containers for load_user, so polling requests skip the database. Each
+# process has its own: invalidate_user_cache() reaches only this one, and other workers
+# see a change once their entry expires, hence the short USER_CACHE_TTL
+user_cache = TTLCache(app.config['USER_CACHE_TTL'])
+
+# Small uploaded files served by the preview route, kept in memory
+preview_cache = FileCache(app.config['PREVIEW_CACHE_BYTES'], app.config['PREVIEW_CACHE_MAX_FILE'])
+
+# Container statuses and pool availability shown on the dashboard, refreshed from Docker in the background
+dashboard_state = StaleCache(app.config['DASHBOARD_MAX_AGE'])
+
+# How often cache hit counts are written to the metrics file (seconds)
+CACHE_METRICS_INTERVAL = 30
+
+
+def snapshot(obj):
+    """Column values of a model instance"""
+    return {attr.key: getattr(obj, attr.key) for attr in db.inspect(type(obj)).column_attrs}
+
+
+def display_copy(model, values):
+    """
+    Model instance holding cached column values for display. It stays out of the session,
+    so queries in the same request still read the database rather than this copy.
+    """
+    return model(**values)
+
+
+def invalidate_user_cache(user_id):
+    """Drop a user's cached row and containers after they change (in this process only)"""
+    user_cache.invalidate(int(user_id))
+
+
 @login_manager.user_loader
 def load_user(user_id):
-    """Load user by ID for Flask-Login"""
-    return User.query.get(int(user_id))
+    """
+    Load user by ID for Flask-Login, with their containers, from the cache when possible.
+    The user and containers are display copies outside the session: routes that change a
+    container read it with get_container_or_404(), and user columns change by query.
+    """
+    user_id = int(user_id)
+    entry = user_cache.get(user_id)
+    if entry is None:
+        # Containers are loaded eagerly, since the dashboard lists them right away
+        user = User.query.options(selectinload(User.containers)).get(user_id)
+        if user is None:
+            return None
+        entry = {
+            'user': snapshot(user),
+            'containers': [snapshot(container) for container in user.containers]
+        }
+        user_cache.set(user_id, entry)
+    
+    user = display_copy(User, entry['user'])
+    set_committed_value(user, 'containers', [display_copy(Container, values) for values in entry['containers']])
+    return user
+
+
+@app.after_request
+def report_cache_metrics(response):
+    """Write user and preview cache hit counts to the metrics file every CACHE_METRICS_INTERVAL seconds"""
+    counts = user_cache.take_counts(CACHE_METRICS_INTERVAL)
+    if counts and any(counts):
+        record_metrics(
+            counters={'cache.user.hits': counts[0], 'cache.user.misses': counts[1]},
+            gauges={'cache.user.hit_rate': round(user_cache.hit_rate(), 3),
+                    'cache.user.entries': len(user_cache.entries)}
+        )
+    counts = preview_cache.take_counts(CACHE_METRICS_INTERVAL)
+    if counts and any(counts):
+        record_metrics(
+            counters={'cache.preview.hits': counts[0], 'cache.preview.misses': counts[1]},
+            gauges={'cache.preview.hit_rate': round(preview_cache.hit_rate(), 3),
+                    'cache.preview.bytes': preview_cache.size}
+        )
+    return response
+
+
+@app.after_request
+def report_docker_metrics(response):
+    """Write Docker request, wait, shed and breaker counts to the metrics file every CACHE_METRICS_INTERVAL seconds"""
+    docker_scheduler.report(CACHE_METRICS_INTERVAL)
+    docker_breaker.report(CACHE_METRICS_INTERVAL)
+    return response
+
+
+# Requests selected in /admin/profiling, or asked for by an admin with X-Profile: 1 (or: cprofile)
+profiler = RequestProfiler()
+PROFILE_HEADER = 'X-Profile'
+
+
+def start_profiling():
+    """Profile the request if its endpoint or the sampling rate selects it, or an admin asks for it"""
+    asked = request.headers.get(PROFILE_HEADER)
+    if not asked and not profiler.active:
+        return
+    endpoint = request.endpoint
+    if endpoint is None or endpoint == 'static' or endpoint.startswith('admin_profiling'):
+        return
+    if asked and current_user.is_authenticated and current_user.is_admin:
+        mode = asked if asked in PROFILE_MODES else None
+    elif profiler.wants(endpoint):
+        mode = None
+    else:
+        return
+    g.profile_run = profiler.begin(endpoint, f"{request.method} {request.full_path.rstrip('?')}", mode)
+
+
+# First, so user loading and activity tracking are part of the profile
+app.before_request_funcs.setdefault(None, []).insert(0, start_profiling)
+
+
+@app.after_request
+def note_profile_status(response):
+    if 'profile_run' in g:
+        g.profile_status = response.status_code
+    return response
+
+
+@app.teardown_request
+def finish_profiling(error=None):
+    run = g.pop('profile_run', None)
+    if run is not None:
+        profiler.finish(run, g.get('profile_status', 500))
+
+
+# How often a user's last_seen_at is written back, to avoid a commit on every request
+ACTIVITY_UPDATE_INTERVAL = timedelta(minutes=5)
+
+
+def record_activity(user):
+    """Record when a user was last active and renew their leases, once per ACTIVITY_UPDATE_INTERVAL"""
+    now = datetime.utcnow()
+    if user.last_seen_at is None or now - user.last_seen_at >= ACTIVITY_UPDATE_INTERVAL:
+        User.query.filter_by(id=user.id).update({'last_seen_at': now}, synchronize_session=False)
+        renew_leases(user, now)
+        db.session.commit()
+        invalidate_user_cache(user.id)
+
+
+@app.before_request
+def track_activity():
+    """Record when a logged-in user was last active (API clients: api_auth_required)"""
+    if current_user.is_authenticated:
+        record_activity(current_user)
 
 
 # Helper Functions
@@ -161,6 +402,17 @@ def get_user_files_path(user_id, db_container_id):
     return path
 
 
+def get_container_or_404(container_id):
+    """
+    A container row read fresh from the database, never an instance already in the
+    session: the monitor may have replaced its Docker container since it was loaded
+    """
+    container = db.session.get(Container, container_id, populate_existing=True)
+    if container is None:
+        abort(404)
+    return container
+
+
 def get_random_port():
     """Generate a random port number between 8000-9000"""
     used_ports = [c.host_port for c in Container.query.all()]
@@ -170,13 +422,18 @@ def get_random_port():
             return port
 
 
-def get_pool_availability():
-    """Get the count of available containers in the pool for each type"""
+def get_pool_availability(raise_errors=False):
+    """
+    Get the count of available containers in the pool for each type.
+    With raise_errors, Docker errors are raised instead of counting as 0 available.
+    """
     if not docker_client:
+        if raise_errors:
+            raise docker.errors.DockerException('Docker is not available')
         return {}
     
     availability = {}
-    for image_type in ['nginx', 'apache', 'node', 'python', 'ubuntu-ssh']:
+    for image_type in get_catalog().pool_types():
         try:
             available = docker_client.containers.list(
                 filters={
@@ -190,35 +447,59 @@ def get_pool_availability():
             )
             availability[image_type] = len(available)
         except Exception as e:
+            if raise_errors:
+                raise
             print(f"Error getting pool availability for {image_type}: {e}")
             availability[image_type] = 0
     
     return availability
 
 
-def assign_container_from_pool(image_type='nginx', container_name=None, user_id=None, mount_files=False, db_container_id=None):
+def list_available(image_type):
+    """Running available pool containers of one type"""
+    return docker_client.containers.list(
+        filters={
+            'label': [
+                'pool=true',
+                f'type={image_type}',
+                'status=available'
+            ],
+            'status': 'running'
+        }
+    )
+
+
+def count_available(image_type):
+    """Count running available pool containers of one type"""
+    if not docker_client:
+        return 0
+    try:
+        return len(list_available(image_type))
+    except Exception as e:
+        print(f"Error counting available {image_type} containers: {e}")
+        return 0
+
+
+def assign_container_from_pool(image_type='nginx', container_name=None, user_id=None, mount_files=False, db_container_id=None,
+                               pool_container=None, timeline=None):
     """
     Assign a pre-built container from the pool to a user.
+    pool_container: a specific available pool container to use, so parallel callers
+                    never pick the same one
+    timeline: lifecycle Timeline that gets the claimed/started/ready phases
     Returns: tuple (container_id, host_port, status, pool_name) or (None, None, error_message, None)
     """
+    timeline = timeline or Timeline(None, image_type)
     if not docker_client:
         return None, None, "Docker client not available", None
     
-    if image_type not in AVAILABLE_IMAGES:
+    catalog = get_catalog()
+    if image_type not in catalog.images:
         return None, None, f"Invalid image type: {image_type}", None
     
     try:
         # Find available container of requested type from pool
-        available = docker_client.containers.list(
-            filters={
-                'label': [
-                    'pool=true',
-                    f'type={image_type}',
-                    'status=available'
-                ],
-                'status': 'running'
-            }
-        )
+        available = [pool_container] if pool_container else list_available(image_type)
         
         if not available:
             return None, None, f"No available {image_type} containers in pool. Please contact administrator.", None
@@ -237,74 +518,59 @@ def assign_container_from_pool(image_type='nginx', container_name=None, user_id=
         
         if not host_port:
             return None, None, "Could not determine container port", None
-        
-        # Get container config for recreation
-        image_config = AVAILABLE_IMAGES[image_type]
-        container_port = image_config['port']
+        timeline.mark('claimed', detail=pool_name)
         
         # Stop the container
         container.stop()
         
-        # Prepare volumes if needed
-        volumes = {}
+        # Mount user files if needed
+        volume_path = None
         if mount_files and user_id and db_container_id:
-            user_files_path = get_user_files_path(user_id, db_container_id)
-            
-            # Different mount points based on image type
-            if image_type in ['nginx', 'apache']:
-                mount_point = '/usr/share/nginx/html' if image_type == 'nginx' else '/usr/local/apache2/htdocs'
-                volumes = {str(user_files_path): {'bind': mount_point, 'mode': 'rw'}}
-            elif image_type == 'node':
-                volumes = {str(user_files_path): {'bind': '/app', 'mode': 'rw'}}
-            elif image_type == 'python':
-                volumes = {str(user_files_path): {'bind': '/app', 'mode': 'rw'}}
+            volume_path = get_user_files_path(user_id, db_container_id)
         
         # Remove old container
         container_name_saved = container.name
         container.remove()
         
         # Recreate container with "assigned" label
-        container_config = {
-            'image': container.image.tags[0] if container.image.tags else image_config['name'],
-            'detach': True,
-            'ports': {f'{container_port}/tcp': host_port},
-            'name': container_name_saved,
-            'labels': {
+        container_config = catalog.build_container_config(
+            image_type,
+            name=container_name_saved,
+            host_port=host_port,
+            labels={
                 'pool': 'true',
                 'type': image_type,
                 'status': 'assigned',  # Mark as assigned!
                 'user_id': str(user_id)
-            }
-        }
-        
-        # Add volumes if any
-        if volumes:
-            container_config['volumes'] = volumes
-        
-        # Add commands
-        if image_type == 'node':
-            container_config['command'] = 'sh -c "while true; do sleep 3600; done"'
-            container_config['working_dir'] = '/app'
-        elif image_type == 'python':
-            container_config['command'] = 'python -m http.server 8000'
-            container_config['working_dir'] = '/app'
+            },
+            volume_path=volume_path,
+            image=container.image.tags[0] if container.image.tags else None
+        )
         
         # Create the assigned container
         container = docker_client.containers.run(**container_config)
+        timeline.mark('files-mounted' if volume_path else 'started', detail=str(volume_path) if volume_path else None)
+        
+        container.reload()
+        if container.status == 'running':
+            timeline.mark('ready', detail=f"port {host_port}")
         
         return container.id, host_port, 'running', pool_name
     
     except Exception as e:
         print(f"Error assigning container from pool: {e}")
+        timeline.mark('failed', detail=str(e))
         return None, None, str(e), None
 
 
-def launch_container(image_type='nginx', container_name=None, user_id=None, mount_files=False, db_container_id=None):
+def launch_container(image_type='nginx', container_name=None, user_id=None, mount_files=False, db_container_id=None,
+                     timeline=None):
     """
     Launch a Docker container - now uses pool system.
     Returns: tuple (container_id, host_port, status, pool_name) or (None, None, error_message, None)
     """
-    return assign_container_from_pool(image_type, container_name, user_id, mount_files, db_container_id)
+    return assign_container_from_pool(image_type, container_name, user_id, mount_files, db_container_id,
+                                      timeline=timeline)
 
 
 def stop_and_remove_container(container_id):
@@ -340,50 +606,222 @@ def release_container_to_pool(container_id, pool_name):
         container.stop(timeout=10)
         container.remove()
         
-        # Recreate the original pool container
-        # Parse the pool name to extract image type and port
-        # Format: pool_<type>_<index>_<port>
-        parts = pool_name.split('_')
-        if len(parts) >= 4 and parts[0] == 'pool':
-            image_type = parts[1]
-            port = int(parts[3])
-            
-            if image_type in AVAILABLE_IMAGES:
-                image_config = AVAILABLE_IMAGES[image_type]
-                
-                container_config = {
-                    'image': image_config['name'],
-                    'detach': True,
-                    'ports': {f"{image_config['port']}/tcp": port},
-                    'name': pool_name,
-                    'labels': {
-                        'pool': 'true',
-                        'type': image_type,
-                        'status': 'available'
-                    }
-                }
-                
-                # Add commands
-                if image_type == 'node':
-                    container_config['command'] = 'sh -c "while true; do sleep 3600; done"'
-                    container_config['working_dir'] = '/app'
-                elif image_type == 'python':
-                    container_config['command'] = 'python -m http.server 8000'
-                    container_config['working_dir'] = '/app'
-                
-                docker_client.containers.run(**container_config)
-                return True
+        # On-demand containers created outside the pool are not recycled
+        if not pool_name.startswith('pool_'):
+            return True
         
-        return False
+        return recreate_pool_container(pool_name)
     except Exception as e:
         print(f"Error releasing container to pool: {e}")
         return False
 
 
+def recreate_pool_container(pool_name):
+    """
+    Create a fresh, available pool container in the slot named by pool_name.
+    Returns: True if created, False if the name is not a pool slot of a known type
+    """
+    container_config = get_catalog().pool_slot_config(pool_name)
+    if not container_config:
+        return False
+    
+    docker_client.containers.run(**container_config)
+    return True
+
+
+def keep_warm(container):
+    """
+    Pause a pool container its user stopped and keep it for a quick relaunch instead of
+    recycling it, evicting the least recently stopped ones to make room. Not done while
+    launches of its type are queued; the freed slot goes to them.
+    Returns: True if kept (the caller deletes the Container row), False to release it as usual
+    """
+    settings = get_warm_settings(get_catalog())
+    if not settings['enabled'] or min(settings['max_per_user'], settings['max_containers']) <= 0:
+        return False
+    if not container.from_pool or not (container.pool_name or '').startswith('pool_') or not docker_client:
+        return False
+    if LaunchRequest.query.filter_by(image_type=container.image_type, status='queued').first():
+        return False
+    
+    evict_warm(make_room(WarmContainer.query.all(), container.user_id, settings), 'capacity')
+    
+    # The row goes in first, so the monitor never takes the paused container for an orphan
+    db.session.add(WarmContainer(
+        id=container.id,
+        container_id=container.container_id,
+        user_id=container.user_id,
+        image_type=container.image_type,
+        image_name=container.image_name,
+        name=container.name,
+        host_port=container.host_port,
+        container_port=container.container_port,
+        pool_name=container.pool_name,
+        has_custom_files=container.has_custom_files,
+        created_at=container.created_at,
+        released_at=datetime.utcnow()
+    ))
+    db.session.commit()
+    try:
+        docker_client.api.pause(container.container_id)
+    except docker.errors.APIError as e:
+        print(f"Could not keep container {container.id} warm: {e}")
+        WarmContainer.query.filter_by(id=container.id).delete(synchronize_session=False)
+        db.session.commit()
+        return False
+    record_metrics(counters={'warm.kept': 1}, gauges={'warm.containers': WarmContainer.query.count()})
+    return True
+
+
+def claim_warm(entry):
+    """
+    Atomically take an entry out of the warm cache so only one process reclaims or evicts it.
+    Returns: its column values, or None if another process got it first
+    """
+    values = snapshot(entry)
+    db.session.expunge(entry)
+    claimed = WarmContainer.query.filter_by(id=values['id']).delete(synchronize_session=False)
+    db.session.commit()
+    return values if claimed else None
+
+
+def recycle_warm(container_id, pool_name):
+    """
+    Remove a warm (or orphaned paused) container and put a fresh one in its pool slot.
+    Returns: True if recycled
+    """
+    try:
+        try:
+            docker_client.api.remove_container(container_id, force=True)
+        except docker.errors.NotFound:
+            pass
+        return recreate_pool_container(pool_name)
+    except docker.errors.DockerException as e:
+        print(f"Error recycling warm container {pool_name}: {e}")
+        return False
+
+
+def evict_warm(entries, reason):
+    """
+    Recycle warm containers back into their pool slots.
+    reason: capacity, expired or pressure, counted in the warm.evicted.* metrics
+    Returns: number evicted
+    """
+    evicted = 0
+    for entry in entries:
+        values = claim_warm(entry)
+        if values is None:
+            continue
+        recycle_warm(values['container_id'], values['pool_name'])
+        evicted += 1
+    if evicted:
+        record_metrics(counters={'warm.evicted': evicted, f'warm.evicted.{reason}': evicted},
+                       gauges={'warm.containers': WarmContainer.query.count()})
+    return evicted
+
+
+def evict_warm_for(image_type, count):
+    """Recycle up to count warm containers of a type for launches that find its pool empty"""
+    entries = WarmContainer.query.filter_by(image_type=image_type) \
+        .order_by(WarmContainer.released_at).limit(count).all()
+    return evict_warm(entries, 'pressure')
+
+
+def reclaim_warm(user_id, image_type, container_name=None, timeline=None):
+    """
+    Give a user back their most recently stopped warm container of a type: unpause it and
+    restore its row under the same id, so its port, files and history carry over.
+    Returns: the Container, or None when the user has none warm
+    """
+    settings = get_warm_settings(get_catalog())
+    if not settings['enabled'] or not docker_client:
+        return None
+    timeline = timeline or Timeline(None, image_type)
+    
+    entries = WarmContainer.query.filter(WarmContainer.user_id == user_id, WarmContainer.image_type == image_type,
+                                         WarmContainer.released_at > warm_cutoff(settings)) \
+        .order_by(WarmContainer.released_at.desc()).all()
+    for entry in entries:
+        values = claim_warm(entry)
+        if values is None:
+            continue
+        # An old SQLite database may have handed the id to another container meanwhile
+        reusable = Container.query.get(values['id']) is None
+        try:
+            if reusable:
+                docker_client.api.unpause(values['container_id'])
+        except docker.errors.APIError as e:
+            print(f"Could not reclaim warm container {values['id']}: {e}")
+            reusable = False
+        if not reusable:
+            recycle_warm(values['container_id'], values['pool_name'])
+            record_metrics(counters={'warm.evicted': 1, 'warm.evicted.failed': 1})
+            continue
+        timeline.mark('claimed', detail='warm')
+        
+        user = User.query.get(user_id)
+        container = Container(
+            id=values['id'],
+            container_id=values['container_id'],
+            name=container_name or values['name'],
+            image_name=values['image_name'],
+            image_type=image_type,
+            status='running',
+            host_port=values['host_port'],
+            container_port=values['container_port'],
+            has_custom_files=values['has_custom_files'],
+            from_pool=True,
+            pool_name=values['pool_name'],
+            user_id=user_id,
+            created_at=values['created_at'],
+            lease_expires_at=lease_expiry(get_lease_settings(get_catalog()), user.plan if user else None)
+        )
+        db.session.add(container)
+        db.session.commit()
+        invalidate_user_cache(user_id)
+        timeline.mark('ready', detail=f"port {container.host_port}")
+        record_metrics(counters={'warm.hits': 1}, gauges={'warm.containers': WarmContainer.query.count()})
+        return container
+    
+    record_metrics(counters={'warm.misses': 1})
+    return None
+
+
+def sweep_warm_containers():
+    """
+    Evict warm containers whose window ended and those of types with fewer free pool
+    containers than min_available, and recycle paused pool containers nothing refers to.
+    Returns: dict of expired, pressure and orphaned counts
+    """
+    settings = get_warm_settings(get_catalog())
+    counts = {'expired': 0, 'pressure': 0, 'orphaned': 0}
+    
+    expired = WarmContainer.query.filter(WarmContainer.released_at <= warm_cutoff(settings)).all()
+    counts['expired'] = evict_warm(expired, 'expired')
+    
+    for image_type, in db.session.query(WarmContainer.image_type).distinct().all():
+        shortfall = settings['min_available'] - count_available(image_type)
+        if shortfall > 0:
+            counts['pressure'] += evict_warm_for(image_type, shortfall)
+    
+    # Left paused by a process that died between pausing and recording, or by a deleted user
+    paused = list(iter_containers(docker_client, filters={'label': ['pool=true'], 'status': ['paused']}))
+    if paused:
+        ids = [summary['id'] for summary in paused]
+        known = {row[0] for row in db.session.query(WarmContainer.container_id)
+                 .filter(WarmContainer.container_id.in_(ids))}
+        # Snapshot commits pause assigned containers for a moment
+        known.update(row[0] for row in db.session.query(Container.container_id).filter(Container.container_id.in_(ids)))
+        for summary in paused:
+            if summary['id'] not in known and recycle_warm(summary['id'], summary['name']):
+                counts['orphaned'] += 1
+    return counts
+
+
 def get_container_status(container_id):
     """
     Get the current status of a container.
-    Returns: status string or 'stopped'
+    Returns: status string, 'stopped', or 'unknown' while Docker cannot be asked
     """
     if not docker_client:
         return 'unknown'
@@ -393,11 +831,335 @@ def get_container_status(container_id):
         return container.status
     except docker.errors.NotFound:
         return 'stopped'
+    except DOCKER_UNREACHABLE:
+        return 'unknown'
     except Exception as e:
         print(f"Error getting container status: {e}")
         return 'error'
 
 
+def sync_container_statuses(user_id):
+    """
+    Update the status of a user's containers from Docker, writing only changes.
+    Updates are keyed on the Docker container id as well, so a row read before the
+    monitor replaced a container cannot overwrite the new one. 'unknown' (Docker could
+    not be asked) is never written; the last known status stands.
+    Returns: dict container id -> status read from Docker
+    """
+    statuses = {}
+    changed = False
+    for container in Container.query.filter_by(user_id=user_id).all():
+        current_status = get_container_status(container.container_id)
+        statuses[container.id] = current_status
+        if current_status not in (container.status, 'unknown'):
+            Container.query.filter_by(id=container.id, container_id=container.container_id) \
+                .update({'status': current_status}, synchronize_session=False)
+            changed = True
+    if changed:
+        db.session.commit()
+        invalidate_user_cache(user_id)
+    return statuses
+
+
+def load_container_statuses(user_id):
+    """
+    Dashboard loader: sync a user's container statuses (on a background thread).
+    Raises while Docker cannot be asked, so the last statuses are kept as they are.
+    """
+    with app.app_context():
+        statuses = sync_container_statuses(user_id)
+    if 'unknown' in statuses.values():
+        raise docker.errors.DockerException('Docker is not responding')
+    return statuses
+
+
+def load_pool_availability():
+    """Dashboard loader: pool availability, raising on Docker errors so the last counts are kept"""
+    with app.app_context():
+        return get_pool_availability(raise_errors=True)
+
+
+def serve_queue_in_background():
+    """Dashboard loader: hand freed containers to waiting launches"""
+    with app.app_context():
+        return process_launch_queue()
+
+
+def format_age(seconds):
+    """Human readable age of state shown on a page"""
+    if seconds is None:
+        return 'never'
+    if seconds < 60:
+        return f"{int(seconds)}s ago"
+    if seconds < 3600:
+        return f"{int(seconds // 60)}m ago"
+    return f"{int(seconds // 3600)}h {int(seconds % 3600 // 60)}m ago"
+
+
+app.add_template_filter(format_age, 'age')
+
+
+def timed(function, *args, **kwargs):
+    """
+    Call a function and measure it.
+    Returns: tuple (result, seconds)
+    """
+    started = time.monotonic()
+    result = function(*args, **kwargs)
+    return result, time.monotonic() - started
+
+
+def trace_release(container, seconds, detail=None):
+    """Record a container going back to the pool (or warm) in the demand trace and its lifecycle"""
+    held = (datetime.utcnow() - container.created_at).total_seconds() if container.created_at else None
+    record_event('release', container.image_type, latency=seconds, held=held)
+    log_container_event(container, 'released', seconds, detail=detail or container.pool_name)
+
+
+def record_container(user_id, image_type, container_name, container_id, host_port, status, pool_name):
+    """Save a container assigned to a user to the database"""
+    images = get_catalog().images
+    image_config = images.get(image_type, images['nginx'])
+    user = User.query.get(user_id)
+    
+    container = Container(
+        container_id=container_id,
+        name=container_name or f"{image_type}-{host_port}",
+        image_name=image_config['name'],
+        image_type=image_type,
+        status=status,
+        host_port=host_port,
+        container_port=image_config['port'],
+        from_pool=True,
+        pool_name=pool_name,
+        user_id=user_id,
+        lease_expires_at=lease_expiry(get_lease_settings(get_catalog()), user.plan if user else None)
+    )
+    db.session.add(container)
+    db.session.commit()
+    invalidate_user_cache(user_id)
+    return container
+
+
+def renew_leases(user, now=None):
+    """Extend the leases of all of a user's containers from now (caller commits)"""
+    expires_at = lease_expiry(get_lease_settings(get_catalog()), user.plan, now)
+    Container.query.filter_by(user_id=user.id).update({'lease_expires_at': expires_at})
+
+
+def reclaim_expired_leases(batch_size=None):
+    """
+    Release containers whose lease has expired back to the pool, oldest expiry first,
+    committing once per batch. Uploaded files stay on disk under the user's folder.
+    Returns: tuple (reclaimed_count, failed_count)
+    """
+    settings = get_lease_settings(get_catalog())
+    batch_size = batch_size or settings['reclaim_batch_size']
+    now = datetime.utcnow()
+    
+    reclaimed = {}
+    failed_ids = set()
+    while True:
+        query = Container.query.filter(Container.lease_expires_at.isnot(None),
+                                       Container.lease_expires_at <= now)
+        if failed_ids:
+            query = query.filter(Container.id.notin_(failed_ids))
+        batch = query.order_by(Container.lease_expires_at).limit(batch_size).all()
+        if not batch:
+            break
+        
+        for container in batch:
+            if container.from_pool and container.pool_name:
+                released, seconds = timed(release_container_to_pool, container.container_id, container.pool_name)
+            else:
+                released, seconds = timed(stop_and_remove_container, container.container_id)
+            
+            if released:
+                trace_release(container, seconds)
+                reclaimed[container.image_type] = reclaimed.get(container.image_type, 0) + 1
+                invalidate_user_cache(container.user_id)
+                db.session.delete(container)
+            else:
+                failed_ids.add(container.id)
+        db.session.commit()
+    
+    reclaimed_count = sum(reclaimed.values())
+    counters = {f'leases.reclaimed.{image_type}': count for image_type, count in reclaimed.items()}
+    counters['leases.reclaimed'] = reclaimed_count
+    counters['leases.reclaim_failed'] = len(failed_ids)
+    record_metrics(counters=counters, gauges={
+        'leases.active': Container.query.filter(Container.lease_expires_at.isnot(None)).count()
+    })
+    
+    # Reclaimed slots go to waiting launches first
+    if reclaimed:
+        process_launch_queue(list(reclaimed))
+    
+    return reclaimed_count, len(failed_ids)
+
+
+def count_user_slots(user_id):
+    """Containers a user holds plus launches they are waiting for"""
+    held = Container.query.filter_by(user_id=user_id).count()
+    waiting = LaunchRequest.query.filter(
+        LaunchRequest.user_id == user_id,
+        LaunchRequest.status.in_(['queued', 'claimed'])
+    ).count()
+    return held + waiting
+
+
+def get_active_counts(user_ids):
+    """Number of containers each of the given users holds"""
+    if not user_ids:
+        return {}
+    rows = db.session.query(Container.user_id, db.func.count(Container.id)) \
+        .filter(Container.user_id.in_(user_ids)) \
+        .group_by(Container.user_id).all()
+    return dict(rows)
+
+
+def get_fair_queue(image_type):
+    """Queued requests of one type in the order they will be served"""
+    queued = LaunchRequest.query.filter_by(image_type=image_type, status='queued').all()
+    active_counts = get_active_counts({r.user_id for r in queued})
+    return fair_order(queued, active_counts)
+
+
+def enqueue_launch(user_id, image_type, container_name):
+    """Queue a launch until a container of its type frees up"""
+    launch_request = LaunchRequest(user_id=user_id, image_type=image_type, container_name=container_name)
+    db.session.add(launch_request)
+    db.session.commit()
+    return launch_request
+
+
+def claim_launch_request(launch_request):
+    """
+    Atomically move a request from queued to claimed so only one process serves it.
+    Returns: True if this process won the claim
+    """
+    claimed = LaunchRequest.query.filter_by(id=launch_request.id, status='queued') \
+        .update({'status': 'claimed', 'claimed_at': datetime.utcnow()}, synchronize_session=False)
+    db.session.commit()
+    if claimed:
+        db.session.refresh(launch_request)
+    return claimed == 1
+
+
+def complete_launch_request(launch_request, container_id, host_port, status, pool_name):
+    """
+    Record the container that served a claimed request.
+    Returns: the new Container
+    """
+    container = record_container(launch_request.user_id, launch_request.image_type, launch_request.container_name,
+                                 container_id, host_port, status, pool_name)
+    launch_request.status = 'assigned'
+    launch_request.served_at = datetime.utcnow()
+    db.session.commit()
+    return container
+
+
+def requeue_stale_claims(max_age_seconds=300):
+    """Put back requests claimed by a process that died before serving them"""
+    cutoff = datetime.utcnow() - timedelta(seconds=max_age_seconds)
+    LaunchRequest.query.filter(LaunchRequest.status == 'claimed', LaunchRequest.claimed_at < cutoff) \
+        .update({'status': 'queued', 'claimed_at': None}, synchronize_session=False)
+    db.session.commit()
+
+
+def process_launch_queue(image_types=None):
+    """
+    Serve queued launch requests from free pool containers, fairly across users.
+    Returns: number of requests served
+    """
+    requeue_stale_claims()
+    
+    query = db.session.query(LaunchRequest.image_type).filter_by(status='queued').distinct()
+    waiting_types = [row[0] for row in query.all()]
+    if image_types:
+        waiting_types = [t for t in waiting_types if t in image_types]
+    
+    served = 0
+    for image_type in waiting_types:
+        queue = get_fair_queue(image_type)
+        available = count_available(image_type)
+        if not available and evict_warm_for(image_type, len(queue)):
+            available = count_available(image_type)
+        if not available:
+            continue
+        
+        for launch_request in queue[:available]:
+            if not claim_launch_request(launch_request):
+                continue
+            
+            timeline = start_timeline(image_type, launch_request.user_id)
+            container_id, host_port, status, pool_name = assign_container_from_pool(
+                image_type=image_type,
+                container_name=launch_request.container_name,
+                user_id=launch_request.user_id,
+                mount_files=False,
+                timeline=timeline
+            )
+            
+            if not container_id:
+                # Another process drained the pool first; wait for the next slot
+                timeline.finish()
+                launch_request.status = 'queued'
+                launch_request.claimed_at = None
+                db.session.commit()
+                break
+            
+            container = complete_launch_request(launch_request, container_id, host_port, status, pool_name)
+            timeline.finish(container.id)
+            served += 1
+    
+    return served
+
+
+def get_user_queue(user_id):
+    """
+    Describe a user's waiting launches with their position and estimated wait.
+    Returns: list of dicts
+    """
+    waiting = LaunchRequest.query.filter(
+        LaunchRequest.user_id == user_id,
+        LaunchRequest.status.in_(['queued', 'claimed'])
+    ).order_by(LaunchRequest.created_at).all()
+    if not waiting:
+        return []
+    
+    settings = get_queue_settings(get_catalog())
+    window_start = datetime.utcnow() - timedelta(minutes=settings['history_window_minutes'])
+    
+    entries = []
+    orders = {}
+    for launch_request in waiting:
+        image_type = launch_request.image_type
+        if image_type not in orders:
+            orders[image_type] = [r.id for r in get_fair_queue(image_type)]
+        
+        if launch_request.status == 'claimed':
+            position = 0
+            wait_text = 'starting now'
+        else:
+            position = orders[image_type].index(launch_request.id) + 1
+            served_times = [row[0] for row in db.session.query(LaunchRequest.served_at).filter(
+                LaunchRequest.image_type == image_type,
+                LaunchRequest.served_at >= window_start
+            ).all()]
+            wait_text = format_wait(estimate_wait_seconds(position, served_times, settings))
+        
+        entries.append({
+            'id': launch_request.id,
+            'image_type': image_type,
+            'name': launch_request.container_name,
+            'position': position,
+            'wait': wait_text,
+            'created_at': launch_request.created_at
+        })
+    return entries
+
+
 # Routes
 @app.route('/')
 def index():
@@ -492,21 +1254,44 @@ def logout():
 @app.route('/dashboard')
 @login_required
 def dashboard():
-    """User dashboard showing their containers"""
-    # Update container statuses
-    for container in current_user.containers:
-        current_status = get_container_status(container.container_id)
-        if current_status != container.status:
-            container.status = current_status
-            db.session.commit()
+    """
+    User dashboard showing their containers. Docker state is refreshed in the
+    background: the page waits for it at most DASHBOARD_WAIT seconds, then shows the
+    last known statuses and pool counts with their age, however slow the daemon is.
+    """
+    started = time.monotonic()
+    deadline = started + app.config['DASHBOARD_WAIT']
+    user_id = current_user.id
+    status_key = ('statuses', user_id)
+    dashboard_state.revalidate(status_key, lambda: load_container_statuses(user_id))
+    dashboard_state.revalidate('pool', load_pool_availability)
+    
+    # Hand freed containers to waiting launches
+    if LaunchRequest.query.filter_by(status='queued').first():
+        dashboard_state.revalidate('launch-queue', serve_queue_in_background)
+        dashboard_state.read('launch-queue', deadline)
+    
+    statuses, status_age, status_error = dashboard_state.read(status_key, deadline)
+    pool_availability, pool_age, pool_error = dashboard_state.read('pool', deadline)
     
-    # Get pool availability counts
-    pool_availability = get_pool_availability()
+    # Statuses read during this request are newer than the user's cached rows
+    if statuses and status_age <= time.monotonic() - started:
+        for container in current_user.containers:
+            if statuses.get(container.id, 'unknown') != 'unknown':
+                set_committed_value(container, 'status', statuses[container.id])
+    
+    # Recent CPU and memory of each container, from the background sampler
+    sampler = get_sampler(docker_client)
+    usage = {c.id: sampler.series(c.container_id) for c in current_user.containers if c.container_id}
     
     return render_template('dashboard.html', 
                          user=current_user,
-                         available_images=AVAILABLE_IMAGES,
-                         pool_availability=pool_availability)
+                         available_images=get_catalog().images,
+                         pool_availability=pool_availability or {},
+                         queued_launches=get_user_queue(current_user.id),
+                         usage=usage,
+                         state_age=max(status_age or 0, pool_age or 0) if statuses is not None else None,
+                         state_error=status_error or pool_error)
 
 
 @app.route('/launch', methods=['POST'])
@@ -516,50 +1301,99 @@ def launch():
     if not docker_client:
         flash('Docker is not available. Please contact the administrator.', 'error')
         return redirect(url_for('dashboard'))
+    if docker_breaker.is_open():
+        flash('Docker is not responding right now. Please try again in a minute.', 'error')
+        return redirect(url_for('dashboard'))
     
     # Get form data
     image_type = request.form.get('image_type', 'nginx')
     container_name = request.form.get('container_name', '')
     
+    if image_type not in get_catalog().pool_types():
+        flash(f'Invalid image type: {image_type}', 'error')
+        return redirect(url_for('dashboard'))
+    
+    settings = get_queue_settings(get_catalog())
+    if count_user_slots(current_user.id) >= settings['max_containers_per_user']:
+        flash(f'You can run or wait for at most {settings["max_containers_per_user"]} containers. '
+              'Stop one before launching another.', 'error')
+        return redirect(url_for('dashboard'))
+    
+    # A container of this type the user stopped recently comes back as it was
+    timeline = start_timeline(image_type, current_user.id)
+    warm, seconds = timed(reclaim_warm, current_user.id, image_type, container_name, timeline)
+    if warm:
+        record_event('launch', image_type, latency=seconds)
+        timeline.finish(warm.id)
+        flash(f'Your {image_type} container is back on port {warm.host_port}, files and all.', 'success')
+        return redirect(url_for('dashboard'))
+    
+    # Queue behind users already waiting for this type, or when the pool is empty
+    # and no warm container of another user can be recycled for it
+    queue_ahead = LaunchRequest.query.filter_by(image_type=image_type, status='queued').count()
+    if queue_ahead or not (count_available(image_type) or evict_warm_for(image_type, 1)):
+        enqueue_launch(current_user.id, image_type, container_name)
+        record_event('launch', image_type, pool_empty=True)
+        flash(f'No {image_type} container is free right now. Your launch is queued and will start '
+              'automatically as soon as one frees up.', 'info')
+        return redirect(url_for('dashboard'))
+    
     # Launch the container (assign from pool)
-    container_id, host_port, status, pool_name = launch_container(
+    (container_id, host_port, status, pool_name), seconds = timed(
+        launch_container,
         image_type=image_type,
         container_name=container_name,
         user_id=current_user.id,
-        mount_files=False
+        mount_files=False,
+        timeline=timeline
     )
     
     if container_id:
-        image_config = AVAILABLE_IMAGES.get(image_type, AVAILABLE_IMAGES['nginx'])
-        
-        # Save to database
-        container = Container(
-            container_id=container_id,
-            name=container_name or f"{image_type}-{host_port}",
-            image_name=image_config['name'],
-            image_type=image_type,
-            status=status,
-            host_port=host_port,
-            container_port=image_config['port'],
-            from_pool=True,
-            pool_name=pool_name,
-            user_id=current_user.id
-        )
-        db.session.add(container)
-        db.session.commit()
-        
+        record_event('launch', image_type, latency=seconds)
+        container = record_container(current_user.id, image_type, container_name, container_id, host_port, status,
+                                     pool_name)
+        timeline.finish(container.id)
+        image_config = get_catalog().images[image_type]
         flash(f'{image_config["description"]} launched successfully on port {host_port}!', 'success')
+    elif not count_available(image_type):
+        # The last free container was taken while we were assigning
+        timeline.finish()
+        enqueue_launch(current_user.id, image_type, container_name)
+        record_event('launch', image_type, pool_empty=True)
+        flash(f'No {image_type} container is free right now. Your launch is queued.', 'info')
     else:
+        timeline.finish()
         flash(f'Failed to launch container: {status}', 'error')
     
     return redirect(url_for('dashboard'))
 
 
+@app.route('/queue/cancel/<int:request_id>', methods=['POST'])
+@login_required
+def cancel_launch(request_id):
+    """Cancel a queued launch"""
+    launch_request = LaunchRequest.query.get_or_404(request_id)
+    
+    # Verify ownership
+    if launch_request.user_id != current_user.id:
+        flash('You do not have permission to cancel this launch.', 'error')
+        return redirect(url_for('dashboard'))
+    
+    cancelled = LaunchRequest.query.filter_by(id=request_id, status='queued') \
+        .update({'status': 'cancelled'}, synchronize_session=False)
+    db.session.commit()
+    if cancelled:
+        flash('Queued launch cancelled.', 'info')
+    else:
+        flash('This launch is already starting and can no longer be cancelled.', 'warning')
+    return redirect(url_for('dashboard'))
+
+
 @app.route('/stop/<int:container_id>', methods=['POST'])
 @login_required
 def stop_container(container_id):
     """Stop and remove a user's container (or release back to pool)"""
-    container = Container.query.get_or_404(container_id)
+    container = get_container_or_404(container_id)
     
     # Verify ownership
     if container.user_id != current_user.id:
@@ -568,18 +1402,37 @@ def stop_container(container_id):
     
     # Check if container is from pool
     if container.from_pool and container.pool_name:
-        # Release back to pool
-        if release_container_to_pool(container.container_id, container.pool_name):
+        # Kept paused for a quick relaunch, or released back to pool
+        kept, seconds = timed(keep_warm, container)
+        if kept:
+            window = get_warm_settings(get_catalog())['window_minutes']
+            flash(f'Container stopped. Launch {container.image_type} again within {window} minutes '
+                  f'to get it back on port {container.host_port}.', 'success')
+            trace_release(container, seconds, detail='warm')
+            db.session.delete(container)
+            db.session.commit()
+            invalidate_user_cache(current_user.id)
+            return redirect(url_for('dashboard'))
+        
+        released, seconds = timed(release_container_to_pool, container.container_id, container.pool_name)
+        if released:
+            image_type = container.image_type
+            trace_release(container, seconds)
             db.session.delete(container)
             db.session.commit()
             flash('Container released back to pool successfully.', 'success')
+            
+            # The freed slot goes to the next waiting launch
+            process_launch_queue([image_type])
         else:
             flash('Failed to release container to pool.', 'warning')
             container.status = 'stopped'
             db.session.commit()
     else:
         # Stop and remove the container (non-pool containers)
-        if stop_and_remove_container(container.container_id):
+        released, seconds = timed(stop_and_remove_container, container.container_id)
+        if released:
+            trace_release(container, seconds)
             db.session.delete(container)
             db.session.commit()
             flash('Container stopped and removed successfully.', 'success')
@@ -588,19 +1441,22 @@ def stop_container(container_id):
             container.status = 'stopped'
             db.session.commit()
     
+    invalidate_user_cache(current_user.id)
     return redirect(url_for('dashboard'))
 
 
 @app.route('/refresh')
 @login_required
 def refresh_status():
-    """Refresh container statuses"""
-    for container in current_user.containers:
-        current_status = get_container_status(container.container_id)
-        if current_status != container.status:
-            container.status = current_status
-    db.session.commit()
-    flash('Container statuses refreshed.', 'info')
+    """Refresh container statuses, waiting for Docker no longer than the dashboard does"""
+    user_id = current_user.id
+    status_key = ('statuses', user_id)
+    dashboard_state.revalidate(status_key, lambda: load_container_statuses(user_id), force=True)
+    _, age, error = dashboard_state.read(status_key, time.monotonic() + app.config['DASHBOARD_WAIT'])
+    if age is not None and age < app.config['DASHBOARD_WAIT'] and not error:
+        flash('Container statuses refreshed.', 'info')
+    else:
+        flash('Docker is slow to answer. Statuses will update as soon as it does.', 'warning')
     return redirect(url_for('dashboard'))
 
 
@@ -608,7 +1464,7 @@ def refresh_status():
 @login_required
 def upload_files(container_id):
     """Upload files to a container"""
-    container = Container.query.get_or_404(container_id)
+    container = get_container_or_404(container_id)
     
     # Verify ownership
     if container.user_id != current_user.id:
@@ -647,13 +1503,16 @@ def upload_files(container_id):
                 stop_and_remove_container(container.container_id)
                 
                 # Launch new container with files mounted
+                timeline = start_timeline(container.image_type, current_user.id)
                 new_container_id, new_host_port, status, pool_name = launch_container(
                     image_type=container.image_type,
                     container_name=container.name,
                     user_id=current_user.id,
                     mount_files=True,
-                    db_container_id=container.id  # Pass database container ID
+                    db_container_id=container.id,  # Pass database container ID
+                    timeline=timeline
                 )
+                timeline.finish(container.id)
                 
                 if new_container_id:
                     container.container_id = new_container_id
@@ -664,6 +1523,7 @@ def upload_files(container_id):
                     db.session.commit()
                     flash(f'Container restarted on port {new_host_port}', 'success')
         
+        invalidate_user_cache(current_user.id)
         return redirect(url_for('upload_files', container_id=container.id))
     
     # Get list of uploaded files using database container ID
@@ -679,7 +1539,7 @@ def upload_files(container_id):
 @login_required
 def delete_file(container_id, filename):
     """Delete a file from a container"""
-    container = Container.query.get_or_404(container_id)
+    container = get_container_or_404(container_id)
     
     # Verify ownership
     if container.user_id != current_user.id:
@@ -695,19 +1555,630 @@ def delete_file(container_id, filename):
     else:
         flash(f'File "{filename}" not found.', 'error')
     
+    invalidate_user_cache(current_user.id)
     return redirect(url_for('upload_files', container_id=container.id))
 
+# Uploaded pages run in a sandbox with an opaque origin, so their scripts cannot use the
+# platform session; PREVIEW_SANDBOX keeps scripts, forms and popups working
+PREVIEW_SANDBOX = 'sandbox allow-scripts allow-forms allow-popups'
+
+
+@app.route('/preview/<int:container_id>/', defaults={'filename': ''})
+@app.route('/preview/<int:container_id>/<path:filename>')
+@login_required
+def preview_file(container_id, filename):
+    """
+    Serve a container's uploaded files from disk, so a site can be previewed whether or
+    not its container is running. Responses carry an ETag and Last-Modified and answer
+    conditional and range requests; small files come from memory, larger ones are sent
+    with the server's sendfile support (or X-Sendfile with USE_X_SENDFILE).
+    """
+    container = get_container_or_404(container_id)
+    if container.user_id != current_user.id:
+        abort(404)
+    
+    directory = str(Path(app.config['UPLOAD_FOLDER']) / str(current_user.id) / f"container_{container.id}")
+    path = safe_join(directory, filename)
+    if path is None:
+        abort(404)
+    if os.path.isdir(path):
+        # Like a web server: directories get a trailing slash, so relative links work, and serve index.html
+        if filename and not filename.endswith('/'):
+            return redirect(url_for('preview_file', container_id=container.id, filename=f"{filename}/"))
+        filename += 'index.html'
+        path = os.path.join(path, 'index.html')
+    try:
+        file_stat = os.stat(path)
+    except OSError:
+        abort(404)
+    if not stat_module.S_ISREG(file_stat.st_mode):
+        abort(404)
+    
+    etag = file_etag(file_stat)
+    data = None
+    if preview_cache.fits(file_stat) and not app.config['USE_X_SENDFILE']:
+        data = preview_cache.get(path, file_stat)
+        if data is None:
+            with open(path, 'rb') as f:
+                data = f.read()
+            preview_cache.set(path, file_stat, data)
+    
+    if data is not None:
+        response = app.response_class(data, mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+        response.set_etag(etag)
+        response.last_modified = file_stat.st_mtime
+        response.make_conditional(request, accept_ranges=True, complete_length=len(data))
+    else:
+        response = send_from_directory(directory, filename, etag=etag, last_modified=file_stat.st_mtime)
+    
+    # Always revalidate: a fresh upload must show up on the next reload
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    response.headers['Content-Security-Policy'] = PREVIEW_SANDBOX
+    response.headers['X-Content-Type-Options'] = 'nosniff'
+    return response
+
+
+def admin_required(view):
+    """Restrict a page to users with is_admin set"""
+    @wraps(view)
+    @login_required
+    def wrapper(*args, **kwargs):
+        if not current_user.is_admin:
+            abort(403)
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def lifecycle_summary(hours=24):
+    """
+    Launch-to-ready and per-phase latency percentiles per image type over the last hours.
+    Returns: dict from lifecycle.summarize_events
+    """
+    since = datetime.utcnow() - timedelta(hours=hours)
+    rows = db.session.query(ContainerEvent.image_type, ContainerEvent.event,
+                            ContainerEvent.phase_ms, ContainerEvent.elapsed_ms) \
+        .filter(ContainerEvent.at >= since).yield_per(1000)
+    return summarize_events(rows)
+
+
+@app.route('/admin/lifecycle')
+@admin_required
+def admin_lifecycle():
+    """Launch-to-ready latency per image type"""
+    hours = request.args.get('hours', 24, type=int)
+    return render_template('admin_lifecycle.html', summary=lifecycle_summary(hours), hours=hours,
+                           phases=['claimed', 'started', 'files-mounted', 'ready', 'released', 'recovered'])
+
+
+@app.route('/admin/profiling', methods=['GET', 'POST'])
+@admin_required
+def admin_profiling():
+    """Select requests to profile and show the slowest ones with where their time went"""
+    if request.method == 'POST':
+        if request.form.get('action') == 'reset':
+            profiler.reset()
+            flash('Profiling results cleared.', 'info')
+        else:
+            routes = [r.strip() for r in request.form.get('routes', '').split(',') if r.strip()]
+            unknown = [r for r in routes if r not in app.view_functions]
+            if unknown:
+                flash(f"Unknown endpoints: {', '.join(unknown)}", 'error')
+            else:
+                profiler.configure(routes, request.form.get('sample_rate', 0, type=float) or 0,
+                                   request.form.get('mode', 'sample'))
+                flash('Profiling settings applied to this worker.', 'success')
+        return redirect(url_for('admin_profiling'))
+    
+    endpoints, slowest = profiler.summary()
+    return render_template('admin_profiling.html', profiler=profiler, endpoints=endpoints, slowest=slowest,
+                           modes=PROFILE_MODES, worker=os.getpid(),
+                           choices=sorted(e for e in app.view_functions if e != 'static'))
+
+
+@app.route('/admin/profiling/collapsed')
+@admin_required
+def admin_profiling_collapsed():
+    """Sampled stacks in collapsed format (flamegraph.pl, speedscope), for one endpoint or all"""
+    route = request.args.get('route')
+    response = app.response_class(profiler.collapsed(route), mimetype='text/plain')
+    response.headers['Content-Disposition'] = f"attachment; filename=profile-{route or 'all'}.folded"
+    return response
+
+
+@app.route('/api/token', methods=['POST'])
+@login_required
+def create_api_token():
+    """Generate a new JSON API token for the user, replacing any previous one"""
+    token = secrets.token_urlsafe(32)
+    User.query.filter_by(id=current_user.id).update({'api_token_hash': hash_api_token(token)},
+                                                    synchronize_session=False)
+    db.session.commit()
+    invalidate_user_cache(current_user.id)
+    flash(f'Your new API token (shown only once): {token}', 'success')
+    return redirect(url_for('dashboard'))
+
+
+# JSON API
+def hash_api_token(token):
+    """Tokens are stored hashed, like passwords"""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def api_error(message, status=400):
+    """JSON error response"""
+    return jsonify({'error': message}), status
+
+
+def api_auth_required(view):
+    """Authenticate an API request by its 'Authorization: Bearer <token>' header"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        header = request.headers.get('Authorization', '')
+        if not header.startswith('Bearer '):
+            return api_error('Missing API token', 401)
+        user = User.query.filter_by(api_token_hash=hash_api_token(header[len('Bearer '):].strip())).first()
+        if not user:
+            return api_error('Invalid API token', 401)
+        g.api_user = user
+        record_activity(user)
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def container_json(container):
+    """API representation of a container"""
+    return {
+        'id': container.id,
+        'name': container.name,
+        'image_type': container.image_type,
+        'status': container.status,
+        'host_port': container.host_port,
+        'container_port': container.container_port,
+        'created_at': container.created_at.isoformat() if container.created_at else None,
+        'lease_expires_at': container.lease_expires_at.isoformat() if container.lease_expires_at else None
+    }
+
+
+def get_batch_ids(payload):
+    """
+    Container ids from a bulk request body {"ids": [...]}.
+    Returns: list of ints, or None when the body is malformed or too large
+    """
+    ids = (payload or {}).get('ids')
+    if not isinstance(ids, list) or not ids or len(ids) > app.config['API_MAX_BATCH']:
+        return None
+    try:
+        return [int(container_id) for container_id in ids]
+    except (TypeError, ValueError):
+        return None
+
+
+def summarize_results(results):
+    """Count per-item outcomes of a bulk request"""
+    summary = {}
+    for result in results:
+        summary[result['status']] = summary.get(result['status'], 0) + 1
+    return summary
+
+
+@app.route('/api/v1/containers', methods=['GET'])
+@api_auth_required
+def api_list_containers():
+    """List the caller's containers and queued launches"""
+    containers = Container.query.filter_by(user_id=g.api_user.id).order_by(Container.id).all()
+    return jsonify({
+        'containers': [container_json(c) for c in containers],
+        'queued': [{'request_id': q['id'], 'image_type': q['image_type'], 'name': q['name'],
+                    'position': q['position'], 'wait': q['wait']} for q in get_user_queue(g.api_user.id)]
+    })
+
+
+def parse_launch_items(payload):
+    """
+    Expand a bulk launch body {"items": [{"image_type": ..., "name": ..., "count": ...}]}
+    into one (image_type, name) entry per container.
+    Returns: tuple (entries, error message or None)
+    """
+    items = (payload or {}).get('items')
+    if not isinstance(items, list) or not items:
+        return None, 'Expected {"items": [{"image_type": ..., "name": ..., "count": ...}]}'
+    
+    max_batch = app.config['API_MAX_BATCH']
+    too_many = f"At most {max_batch} containers per request"
+    wanted = []
+    for item in items:
+        if not isinstance(item, dict):
+            return None, 'Each item must be an object'
+        try:
+            count = int(item.get('count', 1))
+        except (TypeError, ValueError):
+            return None, 'count must be an integer'
+        # Checked before expanding, so a huge count costs nothing
+        if len(wanted) + max(count, 0) > max_batch:
+            return None, too_many
+        name = item.get('name') or ''
+        for number in range(max(count, 0)):
+            wanted.append((item.get('image_type'), f"{name}-{number + 1}" if name and count > 1 else name))
+    return wanted, None
+
+
+def plan_launch(user_id, wanted):
+    """
+    Check bulk launch entries against the catalog and the user's container limit.
+    Returns: tuple (results, pending) with one result dict per entry (rejected entries
+             already filled in) and pending: image type -> (indexes needing a container,
+             True if launches of that type are already queued and these must queue too)
+    """
+    catalog = get_catalog()
+    settings = get_queue_settings(catalog)
+    slots_left = settings['max_containers_per_user'] - count_user_slots(user_id)
+    
+    results = []
+    pending = {}
+    for index, (image_type, name) in enumerate(wanted):
+        result = {'index': index, 'image_type': image_type, 'name': name}
+        results.append(result)
+        if image_type not in catalog.pool_types():
+            result.update(status='error', error=f"Invalid image type: {image_type}")
+            continue
+        if slots_left <= 0:
+            result.update(status='error', error=f"Container limit of {settings['max_containers_per_user']} reached")
+            continue
+        slots_left -= 1
+        if image_type not in pending:
+            queue_ahead = LaunchRequest.query.filter_by(image_type=image_type, status='queued').count()
+            pending[image_type] = ([], queue_ahead > 0)
+        pending[image_type][0].append(index)
+    return results, pending
+
+
+def reclaim_warm_batch(user_id, results, pending):
+    """
+    Give bulk launch entries the containers of their type the user stopped recently,
+    filling in their results and taking their indexes out of pending (from plan_launch())
+    """
+    for image_type, (indexes, _) in pending.items():
+        while indexes:
+            timeline = start_timeline(image_type, user_id)
+            warm, seconds = timed(reclaim_warm, user_id, image_type, results[indexes[0]]['name'], timeline)
+            if not warm:
+                break
+            record_event('launch', image_type, latency=seconds)
+            timeline.finish(warm.id)
+            results[indexes.pop(0)].update(status='launched', container=container_json(warm), warm=True)
+
+
+def queue_launch(user_id, result):
+    """Queue a bulk launch entry that found the pool empty"""
+    launch_request = enqueue_launch(user_id, result['image_type'], result['name'])
+    record_event('launch', result['image_type'], pool_empty=True)
+    result.update(status='queued', request_id=launch_request.id)
+
+
+def finish_launch(user_id, result, outcome, seconds, timeline):
+    """Record the outcome of one bulk launch assignment in the database and its result"""
+    container_id, host_port, status, pool_name = outcome
+    record_event('launch', result['image_type'], latency=seconds if container_id else None,
+                 pool_empty=not container_id)
+    if container_id:
+        container = record_container(user_id, result['image_type'], result['name'],
+                                     container_id, host_port, status, pool_name)
+        timeline.finish(container.id)
+        result.update(status='launched', container=container_json(container))
+    else:
+        timeline.finish()
+        # The container was taken by another launch meanwhile; wait for the next one
+        launch_request = enqueue_launch(user_id, result['image_type'], result['name'])
+        result.update(status='queued', request_id=launch_request.id, error=status)
+
+
+@app.route('/api/v1/containers/launch', methods=['POST'])
+@api_auth_required
+def api_launch_containers():
+    """
+    Launch a batch of containers: {"items": [{"image_type": "nginx", "name": "web", "count": 2}, ...]}.
+    Pool assignments run in parallel (at most API_PARALLELISM at once); items that find the
+    pool empty are queued like form launches. Returns one result per container, in order.
+    """
+    if not docker_client:
+        return api_error('Docker is not available', 503)
+    
+    wanted, error = parse_launch_items(request.get_json(silent=True))
+    if error:
+        return api_error(error)
+    
+    user = g.api_user
+    results, pending = plan_launch(user.id, wanted)
+    reclaim_warm_batch(user.id, results, pending)
+    jobs = []
+    for image_type, (indexes, queue_ahead) in pending.items():
+        # One listing per type; each job gets its own pool container
+        free = [] if queue_ahead else list_available(image_type)
+        if not queue_ahead and len(free) < len(indexes) and evict_warm_for(image_type, len(indexes) - len(free)):
+            free = list_available(image_type)
+        for index in indexes:
+            if free:
+                jobs.append((index, image_type, results[index]['name'], free.pop(),
+                             start_timeline(image_type, user.id)))
+            else:
+                queue_launch(user.id, results[index])
+    
+    with ThreadPoolExecutor(max_workers=app.config['API_PARALLELISM']) as executor:
+        futures = {
+            executor.submit(timed, assign_container_from_pool, image_type, name, user.id,
+                            pool_container=pool_container, timeline=timeline): (index, timeline)
+            for index, image_type, name, pool_container, timeline in jobs
+        }
+        # Database writes stay on the request thread
+        for future in as_completed(futures):
+            index, timeline = futures[future]
+            outcome, seconds = future.result()
+            finish_launch(user.id, results[index], outcome, seconds, timeline)
+    
+    return jsonify({'results': results, 'summary': summarize_results(results)})
+
+
+@app.route('/api/v1/pool', methods=['GET'])
+@api_auth_required
+def api_pool_availability():
+    """Available pool containers per image type"""
+    return jsonify({'available': get_pool_availability()})
+
+
+def plan_release(user_id, ids):
+    """
+    Match bulk stop ids to the user's containers.
+    Returns: tuple (results, jobs) with one result dict per id (unknown and duplicate ids
+             already filled in) and jobs: Container.id -> (Docker id, pool name or None)
+    """
+    owned = owned_containers(user_id, ids)
+    results = []
+    jobs = {}
+    for container_id in ids:
+        result = {'id': container_id}
+        results.append(result)
+        container = owned.get(container_id)
+        if not container:
+            result.update(status='error', error='Container not found')
+        elif container_id in jobs:
+            result.update(status='error', error='Duplicate id')
+        else:
+            jobs[container_id] = (container.container_id, container.pool_name if container.from_pool else None)
+    return results, jobs
+
+
+def finish_release(container_id, released, seconds, detail=None):
+    """
+    Record the outcome of releasing one container of a bulk stop.
+    Returns: tuple (result fields, image type freed or None)
+    """
+    container = Container.query.get(container_id)
+    if released:
+        trace_release(container, seconds, detail)
+        db.session.delete(container)
+        db.session.commit()
+        return {'status': 'stopped'}, container.image_type
+    container.status = 'stopped'
+    db.session.commit()
+    return {'status': 'error', 'error': 'Failed to stop container'}, None
+
+
+def keep_warm_batch(results, jobs):
+    """
+    Keep the pool containers of a bulk stop warm when there is room (a pause is quick and
+    writes the database), filling in their results and taking them out of jobs (from
+    plan_release()), which then holds the containers still to release
+    """
+    by_id = {result['id']: result for result in results if 'status' not in result}
+    for container_id, (docker_id, pool_name) in list(jobs.items()):
+        if pool_name:
+            kept, seconds = timed(keep_warm, Container.query.get(container_id))
+            if kept:
+                fields, _ = finish_release(container_id, True, seconds, detail='warm')
+                by_id[container_id].update(fields, warm=True)
+                del jobs[container_id]
+
+
+@app.route('/api/v1/containers/stop', methods=['POST'])
+@api_auth_required
+def api_stop_containers():
+    """Stop a batch of containers: {"ids": [...]}, releasing pool containers in parallel"""
+    if not docker_client:
+        return api_error('Docker is not available', 503)
+    
+    ids = get_batch_ids(request.get_json(silent=True))
+    if ids is None:
+        return api_error(f"Expected {{\"ids\": [...]}} with 1 to {app.config['API_MAX_BATCH']} container ids")
+    
+    results, jobs = plan_release(g.api_user.id, ids)
+    keep_warm_batch(results, jobs)
+    
+    def release(docker_id, pool_name):
+        if pool_name:
+            return release_container_to_pool(docker_id, pool_name)
+        return stop_and_remove_container(docker_id)
+    
+    freed_types = set()
+    by_id = {result['id']: result for result in results if 'status' not in result}
+    
+    with ThreadPoolExecutor(max_workers=app.config['API_PARALLELISM']) as executor:
+        futures = {executor.submit(timed, release, *job): container_id for container_id, job in jobs.items()}
+        for future in as_completed(futures):
+            container_id = futures[future]
+            released, seconds = future.result()
+            fields, freed_type = finish_release(container_id, released, seconds)
+            by_id[container_id].update(fields)
+            if freed_type:
+                freed_types.add(freed_type)
+    
+    invalidate_user_cache(g.api_user.id)
+    if freed_types:
+        process_launch_queue(list(freed_types))
+    return jsonify({'results': results, 'summary': summarize_results(results)})
+
+
+def owned_containers(user_id, ids):
+    """The user's containers among ids, by Container.id"""
+    return {c.id: c for c in Container.query.filter(Container.id.in_(ids), Container.user_id == user_id)}
+
+
+def store_statuses(user_id, ids, owned, statuses):
+    """
+    Write changed Docker statuses of a bulk status request. Like sync_container_statuses(),
+    'unknown' (Docker could not be asked) is never written; the last known status is returned.
+    Returns: one result dict per id
+    """
+    results = []
+    changed = False
+    for container_id in ids:
+        container = owned.get(container_id)
+        if not container:
+            results.append({'id': container_id, 'status': 'error', 'error': 'Container not found'})
+            continue
+        status = statuses[container_id]
+        if status == 'unknown':
+            results.append(container_json(container))
+            continue
+        if status != container.status:
+            Container.query.filter_by(id=container.id, container_id=container.container_id) \
+                .update({'status': status}, synchronize_session=False)
+            changed = True
+        results.append(dict(container_json(container), status=status))
+    if changed:
+        db.session.commit()
+        invalidate_user_cache(user_id)
+    return results
+
+
+@app.route('/api/v1/containers/status', methods=['POST'])
+@api_auth_required
+def api_container_status():
+    """Current Docker status of a batch of containers: {"ids": [...]}"""
+    ids = get_batch_ids(request.get_json(silent=True))
+    if ids is None:
+        return api_error(f"Expected {{\"ids\": [...]}} with 1 to {app.config['API_MAX_BATCH']} container ids")
+    
+    owned = owned_containers(g.api_user.id, ids)
+    with ThreadPoolExecutor(max_workers=app.config['API_PARALLELISM']) as executor:
+        statuses = dict(zip(owned, executor.map(get_container_status, [c.container_id for c in owned.values()])))
+    
+    return jsonify({'results': store_statuses(g.api_user.id, ids, owned, statuses)})
+
 
 # Initialize database
+def upgrade_schema():
+    """
+    Add columns and indexes that were introduced after a table was first created.
+    create_all() only creates missing tables, so existing databases need the new
+    (nullable) columns and indexes added explicitly.
+    """
+    inspector = db.inspect(db.engine)
+    with db.engine.begin() as connection:
+        for table in db.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                column_type = column.type.compile(dialect=db.engine.dialect)
+                connection.execute(db.text(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'))
+                print(f"Added column {table.name}.{column.name}")
+            
+            existing_indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing_indexes:
+                    index.create(connection)
+                    print(f"Added index {index.name}")
+        
+        if db.engine.dialect.name == 'sqlite' and inspector.has_table(Container.__tablename__):
+            rebuild_with_autoincrement(connection, Container.__table__)
+
+
+def rebuild_with_autoincrement(connection, table):
+    """
+    Recreate a SQLite table created before it had AUTOINCREMENT, so ids of deleted rows are
+    never handed out again. The id sequence starts past every id still referred to: warm
+    containers and lifecycle events keep the ids of containers whose rows are gone.
+    """
+    sql = connection.execute(db.text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                             {'name': table.name}).scalar()
+    if 'AUTOINCREMENT' in sql.upper():
+        return
+    
+    new_name = f"{table.name}_rebuilt"
+    for index in db.inspect(connection).get_indexes(table.name):
+        connection.execute(db.text(f'DROP INDEX "{index["name"]}"'))
+    metadata = db.MetaData()
+    for foreign_key in table.foreign_keys:
+        foreign_key.column.table.to_metadata(metadata)
+    new_table = table.to_metadata(metadata, name=new_name)
+    # Indexes are created after the rename, so they keep their names
+    new_table.indexes.clear()
+    new_table.create(connection)
+    columns = ', '.join(f'"{column.name}"' for column in table.columns)
+    connection.execute(db.text(f'INSERT INTO "{new_name}" ({columns}) SELECT {columns} FROM "{table.name}"'))
+    connection.execute(db.text(f'DROP TABLE "{table.name}"'))
+    connection.execute(db.text(f'ALTER TABLE "{new_name}" RENAME TO "{table.name}"'))
+    for index in table.indexes:
+        index.create(connection)
+    
+    last_id = max(connection.execute(db.select(db.func.max(column))).scalar() or 0
+                  for column in (table.c.id, WarmContainer.__table__.c.id, ContainerEvent.__table__.c.container_id))
+    connection.execute(db.text("DELETE FROM sqlite_sequence WHERE name = :name"), {'name': table.name})
+    connection.execute(db.text("INSERT INTO sqlite_sequence (name, seq) VALUES (:name, :seq)"),
+                       {'name': table.name, 'seq': last_id})
+    print(f"Rebuilt table {table.name} with AUTOINCREMENT (ids continue after {last_id})")
+
+
+def create_app(config=None, background=True):
+    """
+    Application factory: apply config overrides and bind the extensions on the first
+    call, then (with background) start the catalog watcher and resource sampler. Later
+    calls return the same app, so the web server and the CLI tools can all call it.
+    """
+    if 'sqlalchemy' not in app.extensions:
+        app.config.update(config or {})
+        app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config['SQLALCHEMY_DATABASE_URI']))
+        db.init_app(app)
+        login_manager.init_app(app)
+        user_cache.ttl = app.config['USER_CACHE_TTL']
+        dashboard_state.max_age = app.config['DASHBOARD_MAX_AGE']
+        profiler.configure(app.config['PROFILE_ROUTES'], app.config['PROFILE_SAMPLE_RATE'], app.config['PROFILE_MODE'])
+        preview_cache.max_bytes = app.config['PREVIEW_CACHE_BYTES']
+        preview_cache.max_file_bytes = app.config['PREVIEW_CACHE_MAX_FILE']
+    if background:
+        # Image and pool catalog, hot-reloaded when pool_catalog.json changes
+        start_catalog_watcher()
+        # Container CPU, memory and network history for the dashboard
+        start_sampler(docker_client)
+    return app
+
+
+def after_fork():
+    """
+    Reset per-process state in a worker forked from a preloading server: drop database
+    and Docker connections inherited from the parent and start the background threads,
+    which do not survive the fork.
+    """
+    with app.app_context():
+        db.engine.dispose(close=False)
+    docker_client.reset()
+    start_catalog_watcher()
+    start_sampler(docker_client)
+
+
 def init_db():
     """Initialize the database"""
     with app.app_context():
         db.create_all()
+        upgrade_schema()
         print("Database initialized successfully!")
 
 
 if __name__ == '__main__':
+    create_app()
     init_db()
-    # Run the Flask app
-    # In production, use a proper WSGI server like Gunicorn
+    # Development server; production runs gunicorn with gunicorn.conf.py (see wsgi.py)
     app.run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+ASGI Entry Point
+Serves the JSON API's Docker-bound endpoints natively on asyncio (aio_docker.py,
+aio_pool.py), so a request waiting on Docker costs a coroutine rather than a thread
+and one process can hold hundreds of launches and status checks in flight. Every
+other path goes to the Flask app on a thread pool, so pages behave as under gunicorn.
+
+    pip install uvicorn
+    uvicorn asgi:application --host 0.0.0.0 --port 5000
+    gunicorn -c gunicorn.conf.py -k uvicorn.workers.UvicornWorker asgi:application
+
+Natively served (same requests and responses as the Flask routes):
+    POST /api/v1/containers/launch, /stop, /status and GET /api/v1/pool
+Database work of those endpoints runs on threads, as do the quick pauses and unpauses
+of the warm cache; they are short next to the other Docker calls.
+"""
+
+import asyncio
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import aio_pool
+from aio_docker import AsyncDockerClient, DockerError
+from app import (create_app, init_db, User, hash_api_token, get_batch_ids, parse_launch_items,
+                 plan_launch, reclaim_warm_batch, evict_warm_for, queue_launch, finish_launch, plan_release,
+                 keep_warm_batch, finish_release, owned_containers, store_statuses, summarize_results,
+                 record_activity, start_timeline, invalidate_user_cache, process_launch_queue, docker_client)
+from catalog import start_watcher as start_catalog_watcher
+from resource_sampler import start_sampler
+
+# Threads serving Flask pages and the database work of the async endpoints [ASGI_THREADS]
+THREADS = int(os.environ.get('ASGI_THREADS', '16'))
+
+# Largest request body of a natively served endpoint
+MAX_API_BODY = 1024 * 1024
+
+flask_app = create_app(background=False)
+init_db()
+
+docker = AsyncDockerClient()
+executor = ThreadPoolExecutor(max_workers=THREADS, thread_name_prefix='asgi')
+
+
+async def in_app(function, *args):
+    """Run a function in the Flask app context on a worker thread; it must return plain data"""
+    def call():
+        with flask_app.app_context():
+            return function(*args)
+    return await asyncio.get_running_loop().run_in_executor(executor, call)
+
+
+async def timed(coroutine):
+    """
+    Await a coroutine and measure it.
+    Returns: tuple (result, seconds)
+    """
+    started = time.monotonic()
+    result = await coroutine
+    return result, time.monotonic() - started
+
+
+async def read_body(receive, limit=None):
+    """Request body, or None when it is larger than limit"""
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            break
+        chunks.append(message.get('body', b''))
+        size += len(chunks[-1])
+        if limit is not None and size > limit:
+            return None
+        if not message.get('more_body'):
+            break
+    return b''.join(chunks)
+
+
+async def send_json(send, status, data):
+    body = json.dumps(data).encode()
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+# Native endpoints: handler(user_id, payload) -> (status, data)
+def batch_error():
+    return 400, {'error': f"Expected {{\"ids\": [...]}} with 1 to {flask_app.config['API_MAX_BATCH']} container ids"}
+
+
+def api_user_id(token):
+    user = User.query.filter_by(api_token_hash=hash_api_token(token)).first()
+    if user is None:
+        return None
+    record_activity(user)
+    return user.id
+
+
+async def claim_containers(wanted):
+    """
+    Claim available pool containers for several types at once.
+    wanted: image type -> count
+    Returns: image type -> list of summaries; raises DockerError with nothing claimed
+    """
+    types = list(wanted)
+    found = await asyncio.gather(*(aio_pool.claim_available(docker, image_type, wanted[image_type])
+                                   for image_type in types), return_exceptions=True)
+    errors = [result for result in found if isinstance(result, BaseException)]
+    if errors:
+        for result in found:
+            if not isinstance(result, BaseException):
+                aio_pool.claimed.difference_update(summary['Id'] for summary in result)
+        raise errors[0]
+    return dict(zip(types, found))
+
+
+async def api_launch(user_id, payload):
+    """Async POST /api/v1/containers/launch (see app.api_launch_containers)"""
+    wanted, error = parse_launch_items(payload)
+    if error:
+        return 400, {'error': error}
+
+    def plan():
+        results, pending = plan_launch(user_id, wanted)
+        # Containers the user stopped recently come back first
+        reclaim_warm_batch(user_id, results, pending)
+        return results, pending
+    results, pending = await in_app(plan)
+
+    needed = {image_type: len(indexes)
+              for image_type, (indexes, queue_ahead) in pending.items() if indexes and not queue_ahead}
+    free = await claim_containers(needed)
+    # Warm containers of other users make room in pools that ran short
+    short = {image_type: count - len(free[image_type])
+             for image_type, count in needed.items() if len(free[image_type]) < count}
+    if short:
+        evicted = await in_app(lambda: [image_type for image_type, count in short.items()
+                                        if evict_warm_for(image_type, count)])
+        try:
+            more = await claim_containers({image_type: short[image_type] for image_type in evicted})
+        except DockerError:
+            for summaries in free.values():
+                aio_pool.claimed.difference_update(summary['Id'] for summary in summaries)
+            raise
+        for image_type, summaries in more.items():
+            free[image_type].extend(summaries)
+
+    jobs = []
+    queued = []
+    for image_type, (indexes, _) in pending.items():
+        available = free.get(image_type, [])
+        for index in indexes:
+            if available:
+                jobs.append((index, image_type, available.pop(), start_timeline(image_type, user_id)))
+            else:
+                queued.append(results[index])
+
+    outcomes = await asyncio.gather(*(timed(aio_pool.assign_from_pool(docker, image_type, user_id, pool_container,
+                                                                      timeline))
+                                      for index, image_type, pool_container, timeline in jobs))
+
+    def record():
+        for result in queued:
+            queue_launch(user_id, result)
+        for (index, _, _, timeline), (outcome, seconds) in zip(jobs, outcomes):
+            finish_launch(user_id, results[index], outcome, seconds, timeline)
+    await in_app(record)
+
+    return 200, {'results': results, 'summary': summarize_results(results)}
+
+
+async def api_stop(user_id, payload):
+    """Async POST /api/v1/containers/stop (see app.api_stop_containers)"""
+    ids = get_batch_ids(payload)
+    if ids is None:
+        return batch_error()
+
+    def plan():
+        results, jobs = plan_release(user_id, ids)
+        # Pool containers are kept warm when there is room; the rest are released below
+        keep_warm_batch(results, jobs)
+        return results, jobs
+    results, jobs = await in_app(plan)
+    outcomes = await asyncio.gather(*(timed(aio_pool.release_to_pool(docker, docker_id, pool_name))
+                                      for docker_id, pool_name in jobs.values()))
+
+    def record():
+        by_id = {result['id']: result for result in results if 'status' not in result}
+        freed_types = set()
+        for container_id, (released, seconds) in zip(jobs, outcomes):
+            fields, freed_type = finish_release(container_id, released, seconds)
+            by_id[container_id].update(fields)
+            if freed_type:
+                freed_types.add(freed_type)
+        invalidate_user_cache(user_id)
+        # Queued launches are served by the synchronous path, on this worker thread
+        if freed_types:
+            process_launch_queue(list(freed_types))
+    await in_app(record)
+
+    return 200, {'results': results, 'summary': summarize_results(results)}
+
+
+async def api_status(user_id, payload):
+    """Async POST /api/v1/containers/status (see app.api_container_status)"""
+    ids = get_batch_ids(payload)
+    if ids is None:
+        return batch_error()
+
+    docker_ids = await in_app(lambda: {c.id: c.container_id for c in owned_containers(user_id, ids).values()})
+    found = await asyncio.gather(*(aio_pool.container_status(docker, docker_id) for docker_id in docker_ids.values()))
+    statuses = dict(zip(docker_ids, found))
+
+    def record():
+        # Containers deleted meanwhile are reported as not found
+        owned = {c_id: c for c_id, c in owned_containers(user_id, ids).items() if c_id in statuses}
+        return store_statuses(user_id, ids, owned, statuses)
+    return 200, {'results': await in_app(record)}
+
+
+async def api_pool(user_id, payload):
+    """Async GET /api/v1/pool (see app.api_pool_availability)"""
+    return 200, {'available': await aio_pool.pool_availability(docker)}
+
+
+ROUTES = {
+    ('POST', '/api/v1/containers/launch'): api_launch,
+    ('POST', '/api/v1/containers/stop'): api_stop,
+    ('POST', '/api/v1/containers/status'): api_status,
+    ('GET', '/api/v1/pool'): api_pool,
+}
+
+
+async def serve_api(handler, scope, receive, send):
+    """Authenticate like app.api_auth_required, then run a native handler"""
+    body = await read_body(receive, MAX_API_BODY)
+    if body is None:
+        return await send_json(send, 413, {'error': 'Request body too large'})
+    header = dict(scope['headers']).get(b'authorization', b'').decode('latin-1')
+    if not header.startswith('Bearer '):
+        return await send_json(send, 401, {'error': 'Missing API token'})
+    user_id = await in_app(api_user_id, header[len('Bearer '):].strip())
+    if user_id is None:
+        return await send_json(send, 401, {'error': 'Invalid API token'})
+
+    try:
+        payload = json.loads(body) if body else None
+    except ValueError:
+        payload = None
+    try:
+        status, data = await handler(user_id, payload)
+    except DockerError as e:
+        print(f"Docker error in {scope['path']}: {e}")
+        status, data = 503, {'error': 'Docker is not available'}
+    await send_json(send, status, data)
+
+
+# Everything else: the Flask app, one request per worker thread
+def wsgi_environ(scope, body):
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode().decode('latin-1'),
+        'PATH_INFO': scope['path'].encode().decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': str(server[0]),
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': (scope.get('client') or ('', 0))[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope['headers']:
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_TYPE' or name == 'CONTENT_LENGTH':
+            environ[name] = value
+            continue
+        key = f"HTTP_{name}"
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+def run_wsgi(environ, send):
+    """Call the Flask app and stream its response with a blocking send(message)"""
+    response = {}
+
+    def start_response(status, headers, exc_info=None):
+        response['status'] = int(status.split(' ', 1)[0])
+        response['headers'] = [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+
+    def start():
+        if 'started' not in response:
+            response['started'] = True
+            send({'type': 'http.response.start', 'status': response['status'], 'headers': response['headers']})
+
+    chunks = flask_app(environ, start_response)
+    try:
+        for chunk in chunks:
+            if chunk:
+                start()
+                send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        start()
+        send({'type': 'http.response.body', 'body': b''})
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+
+async def serve_flask(scope, receive, send):
+    body = await read_body(receive)
+    loop = asyncio.get_running_loop()
+
+    def send_blocking(message):
+        asyncio.run_coroutine_threadsafe(send(message), loop).result()
+    await loop.run_in_executor(executor, run_wsgi, wsgi_environ(scope, body), send_blocking)
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            # Background threads of this process (after_fork() when forked by gunicorn)
+            start_catalog_watcher()
+            start_sampler(docker_client)
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await docker.close()
+            executor.shutdown(wait=False)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+    if scope['type'] != 'http':
+        return
+    handler = ROUTES.get((scope['method'], scope['path']))
+    if handler:
+        return await serve_api(handler, scope, receive, send)
+    await serve_flask(scope, receive, send)
@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Pool and Image Catalog
+Loads pool_catalog.json once into precomputed container-spec templates shared by
+every create path, and hot-reloads it when the file changes on disk.
+"""
+
+import copy
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+from resource_profiles import PROFILE_FIELDS, build_resource_limits, parse_size
+
+CATALOG_FILE = os.environ.get('POOL_CATALOG', str(Path(__file__).resolve().parent / 'pool_catalog.json'))
+
+# How often the watcher thread checks the catalog file for changes (seconds)
+WATCH_INTERVAL = 2
+
+# Fields copied into the public image info used by the web app
+IMAGE_INFO_FIELDS = ('port', 'description', 'category')
+
+
+class Catalog:
+    """Parsed, validated catalog with one prebuilt container-spec template per image type"""
+
+    def __init__(self, data, path=None, mtime=None):
+        self.path = path
+        self.mtime = mtime
+        self.host = data.get('host', {'reserved_memory': '512m', 'reserved_cpus': 0.5, 'cpu_overcommit': 4.0})
+        self.rebalance = data.get('rebalance', {})
+        self.queue = data.get('queue', {})
+        self.leases = data.get('leases', {})
+        self.monitor = data.get('monitor', {})
+        self.snapshots = data.get('snapshots', {})
+        self.scheduler = data.get('scheduler', {})
+        self.breaker = data.get('breaker', {})
+        self.warm = data.get('warm', {})
+        self.specs = {}
+        self.images = {}
+        self.templates = {}
+
+        default_resources = data.get('default_resources', {})
+        for image_type, spec in data['images'].items():
+            for field in ('image', 'port'):
+                if field not in spec:
+                    raise ValueError(f"Catalog entry '{image_type}' is missing '{field}'")
+
+            spec = dict(spec)
+            spec.setdefault('pooled', False)
+            spec.setdefault('pool_size', 0)
+            spec.setdefault('min_pool_size', 1 if spec['pooled'] else 0)
+            resources = dict(default_resources)
+            resources.update(spec.get('resources', {}))
+            missing = [field for field in PROFILE_FIELDS if field not in resources]
+            if missing:
+                raise ValueError(f"Catalog entry '{image_type}' has no resources for: {', '.join(missing)}")
+            spec['resources'] = resources
+
+            if spec['pooled']:
+                if 'port_range' not in spec:
+                    raise ValueError(f"Pooled catalog entry '{image_type}' is missing 'port_range'")
+                start_port, end_port = spec['port_range']
+                if spec['pool_size'] > end_port - start_port + 1:
+                    raise ValueError(f"Pool size of '{image_type}' exceeds its port range")
+
+            self.specs[image_type] = spec
+
+            # Same shape as the old AVAILABLE_IMAGES dicts
+            info = {'name': spec['image']}
+            info.update({field: spec.get(field, '') for field in IMAGE_INFO_FIELDS})
+            self.images[image_type] = info
+
+            template = {
+                'image': spec['image'],
+                'detach': True,
+            }
+            template.update(build_resource_limits(resources))
+            if spec.get('command'):
+                template['command'] = spec['command']
+            if spec.get('working_dir'):
+                template['working_dir'] = spec['working_dir']
+            self.templates[image_type] = template
+
+        self.check_port_overlaps()
+
+    def check_port_overlaps(self):
+        """Reject catalogs where two pooled types share host ports"""
+        ranges = sorted((spec['port_range'][0], spec['port_range'][1], image_type)
+                        for image_type, spec in self.specs.items() if spec['pooled'])
+        for (_, prev_end, prev_type), (start, _, image_type) in zip(ranges, ranges[1:]):
+            if start <= prev_end:
+                raise ValueError(f"Port ranges of '{prev_type}' and '{image_type}' overlap")
+
+    def pool_types(self):
+        """Image types that are kept in the pool"""
+        return [image_type for image_type, spec in self.specs.items() if spec['pooled']]
+
+    def pool_sizes(self):
+        """Configured pool size for each pooled image type"""
+        return {image_type: self.specs[image_type]['pool_size'] for image_type in self.pool_types()}
+
+    def min_pool_size(self, image_type):
+        """Number of pool containers of a type the rebalancer must leave in place"""
+        return self.specs[image_type]['min_pool_size']
+
+    def port_range(self, image_type):
+        """Host port range (start, end) for an image type, or None"""
+        spec = self.specs.get(image_type)
+        if not spec or 'port_range' not in spec:
+            return None
+        return tuple(spec['port_range'])
+
+    def base_port(self, image_type):
+        """First host port of an image type's range"""
+        return self.port_range(image_type)[0]
+
+    def mount_point(self, image_type):
+        """Path user files are mounted at inside the container, or None"""
+        return self.specs[image_type].get('mount_point')
+
+    def resource_profile(self, image_type):
+        """Resolved resource profile for an image type"""
+        return self.specs[image_type]['resources']
+
+    def memory_bytes(self, image_type):
+        """Memory limit of an image type in bytes"""
+        return parse_size(self.resource_profile(image_type)['mem_limit'])
+
+    def build_container_config(self, image_type, name, host_port, labels, volume_path=None, image=None):
+        """
+        Build docker-py run() arguments from the precomputed template of an image type.
+        User files are mounted when volume_path is given and the type has a mount point.
+        Returns: dict ready for client.containers.run(**config)
+        """
+        config = dict(self.templates[image_type])
+        config['ports'] = {f"{self.specs[image_type]['port']}/tcp": host_port}
+        config['name'] = name
+        config['labels'] = dict(labels)
+        if image:
+            config['image'] = image
+
+        mount_point = self.mount_point(image_type)
+        if volume_path and mount_point:
+            config['volumes'] = {str(volume_path): {'bind': mount_point, 'mode': 'rw'}}
+
+        return config
+
+    def pool_slot_config(self, pool_name):
+        """
+        Config of a fresh, available container for the pool slot named
+        pool_<type>_<index>_<port>.
+        Returns: dict ready for client.containers.run(**config), or None if the name is
+                 not a pool slot of a known type
+        """
+        parts = pool_name.split('_')
+        if len(parts) < 4 or parts[0] != 'pool' or parts[1] not in self.images:
+            return None
+        image_type = parts[1]
+        return self.build_container_config(
+            image_type,
+            name=pool_name,
+            host_port=int(parts[3]),
+            labels={
+                'pool': 'true',
+                'type': image_type,
+                'status': 'available',
+                'pool_index': parts[2]
+            }
+        )
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+_watcher = None
+
+
+def load_catalog(path=CATALOG_FILE):
+    """Read and parse a catalog file"""
+    with open(path) as f:
+        data = json.load(f)
+    return Catalog(data, path=path, mtime=os.stat(path).st_mtime_ns)
+
+
+def get_catalog():
+    """Get the current catalog, loading it on first use"""
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = load_catalog()
+    return _catalog
+
+
+def reload_if_changed():
+    """
+    Reload the catalog if its file changed since it was loaded.
+    A broken file keeps the previous catalog in place.
+    Returns: True if a new catalog was loaded
+    """
+    global _catalog
+    current = get_catalog()
+    try:
+        mtime = os.stat(current.path).st_mtime_ns
+    except OSError:
+        return False
+    if mtime == current.mtime:
+        return False
+
+    try:
+        new_catalog = load_catalog(current.path)
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        print(f"Warning: Ignoring invalid catalog update in {current.path}: {e}")
+        current.mtime = mtime
+        return False
+
+    with _catalog_lock:
+        _catalog = new_catalog
+    print(f"Reloaded catalog from {current.path}: pool sizes {new_catalog.pool_sizes()}")
+    return True
+
+
+def _watch(interval):
+    """Watcher thread body"""
+    while True:
+        time.sleep(interval)
+        try:
+            reload_if_changed()
+        except Exception as e:
+            print(f"Warning: Catalog watcher error: {e}")
+
+
+def start_watcher(interval=WATCH_INTERVAL):
+    """Start a daemon thread that hot-reloads the catalog when its file changes"""
+    global _watcher
+    if _watcher is None or not _watcher.is_alive():
+        get_catalog()
+        _watcher = threading.Thread(target=_watch, args=(interval,), name='catalog-watcher', daemon=True)
+        _watcher.start()
+    return _watcher
+
+
+def update_catalog_file(update, path=CATALOG_FILE):
+    """
+    Apply update(data) to the raw catalog JSON and write it back atomically, so a
+    watching process never reads a half-written file. The result is validated first.
+    """
+    with open(path) as f:
+        data = json.load(f)
+    data = copy.deepcopy(data)
+    update(data)
+    Catalog(data)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+        f.write('\n')
+    os.replace(tmp_path, path)
+
+
+def set_pool_size(image_type, count, path=CATALOG_FILE):
+    """Change the configured pool size of an image type in the catalog file"""
+    def update(data):
+        if image_type not in data['images']:
+            raise ValueError(f"Unknown image type: {image_type}")
+        data['images'][image_type]['pool_size'] = int(count)
+    update_catalog_file(update, path)
+
+
+def set_image(image_type, image, path=CATALOG_FILE):
+    """Change the image an image type is created from in the catalog file"""
+    def update(data):
+        if image_type not in data['images']:
+            raise ValueError(f"Unknown image type: {image_type}")
+        data['images'][image_type]['image'] = image
+    update_catalog_file(update, path)
+
+
+SHELL_VARIABLES = {
+    'nginx': 'NGINX_COUNT',
+    'apache': 'APACHE_COUNT',
+    'python': 'PYTHON_COUNT',
+    'node': 'NODE_COUNT',
+    'ubuntu-ssh': 'SSH_COUNT',
+}
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--shell':
+        # Pool sizes as shell assignments for admin_helper.sh
+        sizes = load_catalog().pool_sizes()
+        for image_type, variable in SHELL_VARIABLES.items():
+            print(f"{variable}={sizes.get(image_type, 0)}")
+    elif len(sys.argv) > 3 and sys.argv[1] == '--set-size':
+        set_pool_size(sys.argv[2], sys.argv[3])
+        print(f"[OK] {sys.argv[2]} pool size set to {sys.argv[3]}")
+    elif len(sys.argv) > 1 and sys.argv[1] == '--show':
+        catalog = load_catalog()
+        print("Type       | Image              | Port  | Pool | Host Ports")
+        print("-----------|--------------------|-------|------|------------")
+        for image_type, spec in catalog.specs.items():
+            ports = '-'.join(str(p) for p in spec['port_range']) if spec['pooled'] else 'not pooled'
+            print(f"{image_type:10s} | {spec['image']:18s} | {spec['port']:5d} | {spec['pool_size']:4d} | {ports}")
+    else:
+        print("Usage:")
+        print("  python catalog.py --show                 # Show the catalog")
+        print("  python catalog.py --shell                # Print pool sizes as shell variables")
+        print("  python catalog.py --set-size TYPE COUNT  # Change a pool size")
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Docker Circuit Breaker
+A slow or wedged daemon makes every Docker request wait for its timeout, and the
+threads waiting on it pile up until nothing else gets served. The breaker watches the
+outcome of each request and stops sending them once the daemon looks unhealthy:
+
+    closed     requests go through; transport failures (timeouts, refused or dropped
+               connections, 502-504) are counted
+    open       after several failures in a row, or too high a failure rate, requests
+               fail at once with CircuitOpen instead of waiting on the daemon
+    half-open  after a cooldown the next request goes through as a probe; its success
+               closes the breaker, its failure opens it for another cooldown
+
+Quick reads also get a short timeout, so a wedged daemon is noticed in seconds rather
+than after docker-py's default minute. Breakers are per process, like schedulers;
+clients are attached to both in lazy_docker.py.
+"""
+
+import threading
+import time
+from collections import deque
+
+import docker
+import requests
+
+from catalog import get_catalog
+from docker_scheduler import measures_latency
+from metrics import record_metrics
+
+# Defaults for the "breaker" section of pool_catalog.json
+# consecutive_failures:  failures in a row that open the breaker
+# failure_rate:          share of failed requests in the window that opens it...
+# min_requests:          ...once the window holds at least this many requests
+# window_seconds:        how far back the failure rate looks
+# open_seconds:          how long the breaker stays open before a probe
+# read_timeout_seconds:  timeout of quick reads (status, listings); other requests keep the client's
+BREAKER_DEFAULTS = {
+    'consecutive_failures': 3,
+    'failure_rate': 0.5,
+    'min_requests': 10,
+    'window_seconds': 30,
+    'open_seconds': 15,
+    'read_timeout_seconds': 5,
+}
+
+# Errors that say the daemon did not answer, as opposed to answering with an error
+TRANSPORT_ERRORS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+
+# Responses of a proxy or daemon that cannot serve right now
+UNAVAILABLE_STATUSES = (502, 503, 504)
+
+
+def get_breaker_settings(catalog):
+    """Breaker settings from the catalog, filled in with defaults"""
+    settings = dict(BREAKER_DEFAULTS)
+    settings.update(catalog.breaker)
+    return settings
+
+
+class CircuitOpen(docker.errors.DockerException):
+    """A Docker request was refused without being sent because the daemon is unhealthy"""
+
+    def __init__(self, retry_in):
+        super().__init__(f"Docker is not responding, retrying in {max(retry_in, 0):.0f}s")
+        self.retry_in = retry_in
+
+
+# Everything that means Docker could not be asked, so nothing is known about a container
+DOCKER_UNREACHABLE = (CircuitOpen,) + TRANSPORT_ERRORS
+
+
+class CircuitBreaker:
+    """Health of the Docker daemon as seen by this process, and the gate in front of it"""
+
+    def __init__(self, settings=None):
+        self.fixed_settings = settings
+        self.catalog = None
+        self.current_settings = None
+        self.lock = threading.Lock()
+        self.state = 'closed'
+        self.opened_at = None
+        self.probing = False
+        self.failures_in_row = 0
+        self.outcomes = deque()
+        self.reset_counts()
+        self.reported_at = time.monotonic()
+
+    def reset_counts(self):
+        self.trips = 0
+        self.rejected = 0
+        self.failures = 0
+
+    def settings(self):
+        """Current settings, following catalog reloads"""
+        if self.fixed_settings is not None:
+            return self.fixed_settings
+        catalog = get_catalog()
+        if catalog is not self.catalog:
+            self.current_settings = get_breaker_settings(catalog)
+            self.catalog = catalog
+        return self.current_settings
+
+    def retry_in(self):
+        """Seconds until an open breaker lets a probe through"""
+        return self.opened_at + self.settings()['open_seconds'] - time.monotonic()
+
+    def is_open(self):
+        """Whether a request sent now would be refused"""
+        with self.lock:
+            if self.state == 'closed':
+                return False
+            return self.probing or self.retry_in() > 0
+
+    def before(self):
+        """
+        Admit a request or refuse it with CircuitOpen. Once the cooldown is over, the
+        first request admitted is the probe.
+        Returns: True when the request is the probe
+        """
+        with self.lock:
+            if self.state == 'closed':
+                return False
+            if self.probing or self.retry_in() > 0:
+                self.rejected += 1
+                raise CircuitOpen(self.retry_in())
+            self.state = 'half-open'
+            self.probing = True
+            return True
+
+    def record(self, failed, probe=False):
+        """Count the outcome of an admitted request, opening or closing the breaker"""
+        settings = self.settings()
+        now = time.monotonic()
+        with self.lock:
+            if probe:
+                self.probing = False
+                if failed:
+                    self.failures += 1
+                    self.open(now, 'probe failed')
+                else:
+                    self.state = 'closed'
+                    self.failures_in_row = 0
+                    self.outcomes.clear()
+                    print("Docker is responding again, circuit breaker closed")
+                return
+            if self.state != 'closed':
+                # Sent before the breaker opened; the probe decides from here
+                return
+
+            self.outcomes.append((now, failed))
+            while self.outcomes and now - self.outcomes[0][0] > settings['window_seconds']:
+                self.outcomes.popleft()
+            if not failed:
+                self.failures_in_row = 0
+                return
+            self.failures += 1
+            self.failures_in_row += 1
+            failed_count = sum(1 for _, f in self.outcomes if f)
+            if self.failures_in_row >= settings['consecutive_failures']:
+                self.open(now, f"{self.failures_in_row} failed requests in a row")
+            elif (len(self.outcomes) >= settings['min_requests']
+                  and failed_count / len(self.outcomes) >= settings['failure_rate']):
+                self.open(now, f"{failed_count} of {len(self.outcomes)} requests failed")
+
+    def open(self, now, reason):
+        # Called with the lock held
+        self.state = 'open'
+        self.opened_at = now
+        self.trips += 1
+        self.failures_in_row = 0
+        self.outcomes.clear()
+        print(f"Docker is not responding ({reason}), circuit breaker open "
+              f"for {self.settings()['open_seconds']}s")
+
+    def attach(self, client):
+        """Send every HTTP request of a docker.DockerClient through the breaker"""
+        send = client.api.send
+
+        def guarded_send(request, **kwargs):
+            probe = self.before()
+            if measures_latency(request) and not isinstance(kwargs.get('timeout'), tuple):
+                timeout = self.settings()['read_timeout_seconds']
+                kwargs['timeout'] = min(kwargs.get('timeout') or timeout, timeout)
+            try:
+                response = send(request, **kwargs)
+            except TRANSPORT_ERRORS:
+                self.record(True, probe)
+                raise
+            except BaseException:
+                if probe:
+                    with self.lock:
+                        self.probing = False
+                raise
+            self.record(response.status_code in UNAVAILABLE_STATUSES, probe)
+            return response
+
+        client.api.send = guarded_send
+        return client
+
+    def report(self, min_interval=0):
+        """
+        Write trips, refused requests and failures to the metrics file, at most once per
+        `min_interval` seconds and only after something happened or while open.
+        """
+        now = time.monotonic()
+        with self.lock:
+            if now - self.reported_at < min_interval:
+                return
+            self.reported_at = now
+            trips, rejected, failures = self.trips, self.rejected, self.failures
+            is_open = self.state != 'closed'
+            self.reset_counts()
+        if not (trips or rejected or failures or is_open):
+            return
+        record_metrics(counters={'breaker.trips': trips, 'breaker.rejected': rejected, 'breaker.failures': failures},
+                       gauges={'breaker.open': int(is_open)})
+
+
+# The breaker of this process; Docker clients are attached to it in lazy_docker.py
+breaker = CircuitBreaker()
@@ -4,74 +4,78 @@ Container Health Monitor and Auto-Recovery System
 Automatically detects and recovers lost containers for users
 """
 
+import os
 import sys
+import time
+import argparse
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from pathlib import Path
 import docker
-from app import app, db, Container, User
+from app import (create_app, db, Container, User, LaunchRequest, process_launch_queue, claim_launch_request,
+                 complete_launch_request, get_active_counts, reclaim_expired_leases, log_container_event,
+                 sweep_warm_containers)
+from catalog import get_catalog
+from rebalancer import rebalance_pool, get_rebalance_settings
+from shards import ShardWorker, get_monitor_settings, default_worker_name, shard_filter, show_shards
+from launch_queue import fair_order, get_queue_settings
+from leases import get_lease_settings
+from warm_cache import get_warm_settings
+from snapshots import (get_snapshot_settings, take_snapshots, prune_snapshots, restore_image, record_restore,
+                       show_snapshots)
+from streaming import iter_query, iter_containers, used_host_ports, DB_WINDOW
+from metrics import record_metrics
+from demand_trace import record_event
+from lazy_docker import LazyDockerClient
+from docker_scheduler import scheduler, Overloaded
+from circuit_breaker import breaker
+from resource_profiles import format_size
 
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
     handlers=[
-        logging.FileHandler('/opt/my-paas/container_monitor.log'),
+        logging.FileHandler(os.environ.get('MONITOR_LOG', '/opt/my-paas/container_monitor.log')),
         logging.StreamHandler()
     ]
 )
 logger = logging.getLogger('ContainerMonitor')
 
-# Initialize Docker client
-try:
-    docker_client = docker.from_env()
-except Exception as e:
-    logger.error(f"Failed to connect to Docker: {e}")
-    sys.exit(1)
-
-# Available container images configuration
-AVAILABLE_IMAGES = {
-    'nginx': {
-        'name': 'nginx:alpine',
-        'port': 80,
-        'description': 'Lightweight web server (perfect for static sites)',
-    },
-    'apache': {
-        'name': 'httpd:alpine',
-        'port': 80,
-        'description': 'Apache HTTP Server',
-    },
-    'node': {
-        'name': 'node:18-alpine',
-        'port': 3000,
-        'description': 'Node.js runtime environment',
-    },
-    'python': {
-        'name': 'python:3.11-alpine',
-        'port': 8000,
-        'description': 'Python runtime with built-in HTTP server',
-    },
-    'ubuntu-ssh': {
-        'name': 'ubuntu-ssh:latest',
-        'port': 22,
-        'description': 'Ubuntu Linux with SSH access',
-    }
-}
+app = create_app(background=False)
+
+# Docker client, connected on first use; commands that need it exit if Docker is unreachable
+docker_client = LazyDockerClient(on_error=lambda e: logger.error(f"Failed to connect to Docker: {e}"))
+
+# Docker requests outside an explicit operation are recovery work; sweeps and pool
+# refills run as lower classes, shed while the daemon is slow (docker_scheduler.py)
+scheduler.default = 'recovery'
 
+# Mass recovery after a Docker daemon restart
+# MASS_LOSS_FRACTION: share of tracked containers down at once that counts as a fleet-wide loss
+# MASS_LOSS_MIN:      minimum number of containers down before mass recovery kicks in
+# RECOVERY_WORKERS:   parallel Docker operations during mass recovery (below docker-py's pool of 10)
+MASS_LOSS_FRACTION = 0.5
+MASS_LOSS_MIN = 3
+RECOVERY_WORKERS = 8
 
 def get_user_files_path(user_id, db_container_id):
     """Get the path for user's container files using database container ID"""
-    path = Path('/opt/my-paas/user_files') / str(user_id) / f"container_{db_container_id}"
+    path = Path(app.config['UPLOAD_FOLDER']) / str(user_id) / f"container_{db_container_id}"
     return path
 
 
-def assign_container_from_pool(image_type, user_id, container_name, mount_files=False, db_container_id=None):
+def assign_container_from_pool(image_type, user_id, container_name, mount_files=False, db_container_id=None,
+                               image=None):
     """
     Assign a pre-built container from the pool to a user.
     If no pool container is available, creates a new one dynamically.
+    image: image to create it from instead of the pool container's, e.g. a snapshot
     Returns: tuple (container_id, host_port, status, pool_name) or (None, None, error_message, None)
     """
-    if image_type not in AVAILABLE_IMAGES:
+    catalog = get_catalog()
+    if image_type not in catalog.images:
         return None, None, f"Invalid image type: {image_type}", None
     
     try:
@@ -88,8 +92,10 @@ def assign_container_from_pool(image_type, user_id, container_name, mount_files=
         )
         
         if not available:
+            if count_on_demand() >= get_queue_settings(catalog)['max_on_demand']:
+                return None, None, f"No available {image_type} containers and the on-demand limit is reached", None
             logger.warning(f"No available {image_type} containers in pool, creating new container...")
-            return create_new_container(image_type, user_id, container_name, mount_files, db_container_id)
+            return create_new_container(image_type, user_id, container_name, mount_files, db_container_id, image)
         
         # Take the first available container
         container = available[0]
@@ -106,57 +112,34 @@ def assign_container_from_pool(image_type, user_id, container_name, mount_files=
         if not host_port:
             return None, None, "Could not determine container port", None
         
-        # Get container config for recreation
-        image_config = AVAILABLE_IMAGES[image_type]
-        container_port = image_config['port']
-        
         # Stop the container
         container.stop()
         
-        # Prepare volumes if needed
-        volumes = {}
+        # Mount user files if needed
+        volume_path = None
         if mount_files and user_id and db_container_id:
             user_files_path = get_user_files_path(user_id, db_container_id)
-            
             if user_files_path.exists():
-                # Different mount points based on image type
-                if image_type in ['nginx', 'apache']:
-                    mount_point = '/usr/share/nginx/html' if image_type == 'nginx' else '/usr/local/apache2/htdocs'
-                    volumes = {str(user_files_path): {'bind': mount_point, 'mode': 'rw'}}
-                elif image_type == 'node':
-                    volumes = {str(user_files_path): {'bind': '/app', 'mode': 'rw'}}
-                elif image_type == 'python':
-                    volumes = {str(user_files_path): {'bind': '/app', 'mode': 'rw'}}
+                volume_path = user_files_path
         
         # Remove old container
         container_name_saved = container.name
         container.remove()
         
         # Recreate container with "assigned" label
-        container_config = {
-            'image': container.image.tags[0] if container.image.tags else image_config['name'],
-            'detach': True,
-            'ports': {f'{container_port}/tcp': host_port},
-            'name': container_name_saved,
-            'labels': {
+        container_config = catalog.build_container_config(
+            image_type,
+            name=container_name_saved,
+            host_port=host_port,
+            labels={
                 'pool': 'true',
                 'type': image_type,
                 'status': 'assigned',
                 'user_id': str(user_id)
-            }
-        }
-        
-        # Add volumes if any
-        if volumes:
-            container_config['volumes'] = volumes
-        
-        # Add commands
-        if image_type == 'node':
-            container_config['command'] = 'sh -c "while true; do sleep 3600; done"'
-            container_config['working_dir'] = '/app'
-        elif image_type == 'python':
-            container_config['command'] = 'python -m http.server 8000'
-            container_config['working_dir'] = '/app'
+            },
+            volume_path=volume_path,
+            image=image or (container.image.tags[0] if container.image.tags else None)
+        )
         
         # Create the assigned container
         container = docker_client.containers.run(**container_config)
@@ -168,68 +151,47 @@ def assign_container_from_pool(image_type, user_id, container_name, mount_files=
         return None, None, str(e), None
 
 
-def create_new_container(image_type, user_id, container_name, mount_files=False, db_container_id=None):
+def create_new_container(image_type, user_id, container_name, mount_files=False, db_container_id=None, image=None):
     """
     Create a brand new container when pool is empty.
+    image: image to create it from instead of the catalog's, e.g. a snapshot
     Returns: tuple (container_id, host_port, status, pool_name) or (None, None, error_message, None)
     """
-    if image_type not in AVAILABLE_IMAGES:
+    catalog = get_catalog()
+    if image_type not in catalog.images:
         return None, None, f"Invalid image type: {image_type}", None
     
     try:
-        image_config = AVAILABLE_IMAGES[image_type]
-        container_port = image_config['port']
-        
         # Find available port
         host_port = find_available_port(image_type)
         if not host_port:
             return None, None, f"No available ports for {image_type} containers", None
         
-        # Prepare volumes if needed
-        volumes = {}
+        # Mount user files if needed
+        volume_path = None
         if mount_files and user_id and db_container_id:
-            user_files_path = get_user_files_path(user_id, db_container_id)
-            user_files_path.mkdir(parents=True, exist_ok=True)
-            
-            # Different mount points based on image type
-            if image_type in ['nginx', 'apache']:
-                mount_point = '/usr/share/nginx/html' if image_type == 'nginx' else '/usr/local/apache2/htdocs'
-                volumes = {str(user_files_path): {'bind': mount_point, 'mode': 'rw'}}
-            elif image_type == 'node':
-                volumes = {str(user_files_path): {'bind': '/app', 'mode': 'rw'}}
-            elif image_type == 'python':
-                volumes = {str(user_files_path): {'bind': '/app', 'mode': 'rw'}}
+            volume_path = get_user_files_path(user_id, db_container_id)
+            volume_path.mkdir(parents=True, exist_ok=True)
         
         # Generate container name
         import time
         generated_name = f"{image_type}-{host_port}-{int(time.time())}"
         
         # Build container config
-        container_config = {
-            'image': image_config['name'],
-            'detach': True,
-            'ports': {f'{container_port}/tcp': host_port},
-            'name': generated_name,
-            'labels': {
+        container_config = catalog.build_container_config(
+            image_type,
+            name=generated_name,
+            host_port=host_port,
+            labels={
                 'pool': 'true',
                 'type': image_type,
                 'status': 'assigned',
                 'user_id': str(user_id),
                 'created_by': 'monitor'
-            }
-        }
-        
-        # Add volumes if any
-        if volumes:
-            container_config['volumes'] = volumes
-        
-        # Add specific commands based on image type
-        if image_type == 'node':
-            container_config['command'] = 'sh -c "while true; do sleep 3600; done"'
-            container_config['working_dir'] = '/app'
-        elif image_type == 'python':
-            container_config['command'] = 'python -m http.server 8000'
-            container_config['working_dir'] = '/app'
+            },
+            volume_path=volume_path,
+            image=image
+        )
         
         # Create and start the container
         logger.info(f"Creating new {image_type} container on port {host_port}...")
@@ -243,38 +205,99 @@ def create_new_container(image_type, user_id, container_name, mount_files=False,
         return None, None, str(e), None
 
 
+def trace_recovery(image_type, container_id, pool_name, seconds):
+    """Record a recovery that needed a new container in the demand trace"""
+    from_pool = bool(container_id) and bool(pool_name) and pool_name.startswith('pool_')
+    record_event('recover', image_type, latency=seconds if container_id else None, pool_empty=not from_pool)
+
+
+def count_on_demand():
+    """Count containers the monitor created outside the pool"""
+    return sum(1 for _ in iter_containers(docker_client, filters={'label': ['created_by=monitor']}))
+
+
+def serve_launch_queue():
+    """
+    Serve queued launches: first from free pool containers, then by creating
+    on-demand containers, capped globally and per run so a burst of queued
+    launches cannot flood the Docker daemon.
+    """
+    with app.app_context():
+        served = process_launch_queue()
+        
+        settings = get_queue_settings(get_catalog())
+        budget = min(settings['max_on_demand'] - count_on_demand(), settings['max_on_demand_per_cycle'])
+        
+        queued = LaunchRequest.query.filter_by(status='queued').all()
+        created = 0
+        if queued and budget > 0:
+            ordered = fair_order(queued, get_active_counts({r.user_id for r in queued}))
+            for launch_request in ordered[:budget]:
+                if not claim_launch_request(launch_request):
+                    continue
+                
+                create_started = time.monotonic()
+                container_id, host_port, status, pool_name = create_new_container(
+                    launch_request.image_type,
+                    launch_request.user_id,
+                    launch_request.container_name
+                )
+                if not container_id:
+                    logger.error(f"Failed to create on-demand container for launch {launch_request.id}: {status}")
+                    launch_request.status = 'queued'
+                    launch_request.claimed_at = None
+                    db.session.commit()
+                    continue
+                
+                container = complete_launch_request(launch_request, container_id, host_port, status, pool_name)
+                log_container_event(container, 'started', time.monotonic() - create_started, detail='on-demand')
+                created += 1
+        
+        remaining = LaunchRequest.query.filter_by(status='queued').count()
+        if served or created or remaining:
+            logger.info(f"Launch queue: {served} served from pool, {created} on-demand, {remaining} still waiting")
+
+
+def reclaim_leases():
+    """Return containers with expired leases to the pool"""
+    with app.app_context():
+        reclaimed, failed = reclaim_expired_leases()
+        if reclaimed or failed:
+            logger.info(f"Lease reclaim: {reclaimed} containers returned to the pool, {failed} failed")
+
+
+def sweep_warm():
+    """Recycle expired warm containers and those of types short of free containers"""
+    with app.app_context():
+        counts = sweep_warm_containers()
+        if any(counts.values()):
+            logger.info(f"Warm containers: {counts['expired']} expired, {counts['pressure']} evicted for "
+                        f"pool pressure, {counts['orphaned']} orphaned recycled")
+
+
+def snapshot_containers():
+    """Snapshot changed stateful containers and drop images of released ones"""
+    with app.app_context():
+        counts = take_snapshots(docker_client, get_snapshot_settings(get_catalog()))
+        removed = prune_snapshots(docker_client)
+        if counts['taken'] or counts['failed'] or counts['deferred'] or removed:
+            logger.info(f"Snapshots: {counts['taken']} taken ({format_size(counts['bytes'])}), "
+                        f"{counts['deferred']} deferred to the next cycle, {counts['failed']} failed, "
+                        f"{removed} old images removed")
+
+
 def find_available_port(image_type):
     """
-    Find an available port for the given image type.
-    Port ranges:
-    - nginx: 8000-8099
-    - apache: 8100-8199
-    - python: 8200-8299
-    - node: 8300-8399
-    - ubuntu-ssh: 2200-2210
+    Find an available port for the given image type within its catalog port range.
     """
-    port_ranges = {
-        'nginx': (8000, 8099),
-        'apache': (8100, 8199),
-        'python': (8200, 8299),
-        'node': (8300, 8399),
-        'ubuntu-ssh': (2200, 2210)
-    }
-    
-    if image_type not in port_ranges:
+    port_range = get_catalog().port_range(image_type)
+    if not port_range:
         return None
     
-    start_port, end_port = port_ranges[image_type]
+    start_port, end_port = port_range
     
-    # Get all used ports
-    used_ports = set()
-    all_containers = docker_client.containers.list(all=True)
-    for container in all_containers:
-        if container.ports:
-            for port, bindings in container.ports.items():
-                if bindings:
-                    for binding in bindings:
-                        used_ports.add(int(binding['HostPort']))
+    # Get used ports in the range, streaming the container listing page by page
+    used_ports = used_host_ports(docker_client, start_port, end_port)
     
     # Find first available port
     for port in range(start_port, end_port + 1):
@@ -284,37 +307,313 @@ def find_available_port(image_type):
     return None
 
 
+def get_running_ids():
+    """
+    Docker ids of running containers, from a paged listing. Only the ids are kept: the
+    database is walked by primary key and Docker lists by creation time, so one side
+    of the join has to be a lookup.
+    """
+    return {summary['id'] for summary in iter_containers(docker_client, all=False)}
+
+
+def get_fleet_states():
+    """
+    Look up every tracked container against one paged listing of running containers,
+    reading the database in windows of ids only. Running containers are only counted.
+    Returns: tuple (number of tracked containers,
+                    dict database container id -> 'stopped' or 'missing' for those down)
+    """
+    running = get_running_ids()
+    total = 0
+    down = {}
+    rows = db.session.query(Container.id, Container.container_id)
+    for row in iter_query(rows, Container.id):
+        total += 1
+        if row.container_id not in running:
+            down[row.container_id] = row.id
+    
+    states = {db_id: 'missing' for db_id in down.values()}
+    if down:
+        # Down containers Docker still has are stopped; a second paged listing finds them
+        for summary in iter_containers(docker_client):
+            if summary['id'] in down:
+                states[down[summary['id']]] = 'stopped'
+    return total, states
+
+
+def is_mass_loss(total, states):
+    """Decide whether enough containers are down at once to treat it as a daemon restart"""
+    down = len(states)
+    return down >= MASS_LOSS_MIN and down >= MASS_LOSS_FRACTION * total
+
+
+def pool_index_from_name(pool_name):
+    """Pool index encoded in a pool_<type>_<index>_<port> name, or None"""
+    parts = (pool_name or '').split('_')
+    if len(parts) == 4 and parts[0] == 'pool' and parts[2].isdigit():
+        return parts[2]
+    return None
+
+
+def recover_in_place(job):
+    """
+    Bring one lost container back on its original port, name and mounts.
+    Runs in a worker thread, so it only touches Docker and the plain job dict.
+    Returns: new container id
+    """
+    if job['state'] == 'stopped':
+        docker_client.containers.get(job['container_id']).start()
+        return job['container_id']
+    
+    labels = {
+        'pool': 'true',
+        'type': job['image_type'],
+        'status': 'assigned',
+        'user_id': str(job['user_id'])
+    }
+    pool_index = pool_index_from_name(job['name'])
+    if pool_index is not None:
+        labels['pool_index'] = pool_index
+    else:
+        labels['created_by'] = 'monitor'
+    
+    volume_path = None
+    if job['has_files']:
+        user_files_path = get_user_files_path(job['user_id'], job['id'])
+        if user_files_path.exists():
+            volume_path = user_files_path
+    
+    container_config = get_catalog().build_container_config(
+        job['image_type'],
+        name=job['name'],
+        host_port=job['host_port'],
+        labels=labels,
+        volume_path=volume_path,
+        image=job['image']
+    )
+    started = time.monotonic()
+    container_id = docker_client.containers.run(**container_config).id
+    job['seconds'] = time.monotonic() - started
+    return container_id
+
+
+def recovery_priority(db_container):
+    """Sort key putting recently active users first, then their newest containers"""
+    last_seen = db_container.owner.last_seen_at or datetime.min
+    return (last_seen, db_container.created_at or datetime.min)
+
+
+def load_containers(ids):
+    """Load containers by id in windows, to keep IN (...) lists bounded"""
+    ids = sorted(ids)
+    containers = []
+    for start in range(0, len(ids), DB_WINDOW):
+        containers.extend(Container.query.filter(Container.id.in_(ids[start:start + DB_WINDOW])).all())
+    return containers
+
+
+def mass_recover(lost, states, total):
+    """
+    Recover a fleet-wide loss in parallel, keeping every container on its original
+    host port and pool name so users' URLs keep working. Jobs are submitted in
+    priority order (recently active users first); anything that cannot be recreated
+    in place falls back to the normal pool reassignment.
+    Returns: tuple (recovered_count, failed_count)
+    """
+    lost = sorted(lost, key=recovery_priority, reverse=True)
+    snapshot_settings = get_snapshot_settings(get_catalog())
+    snapshots = {}
+    jobs = {}
+    for db_container in lost:
+        # Stopped containers are started again with their own layer
+        snapshot = None
+        if states[db_container.id] != 'stopped':
+            snapshot = restore_image(docker_client, db_container, snapshot_settings)
+        if snapshot:
+            snapshots[db_container.id] = snapshot
+        jobs[db_container.id] = {
+            'id': db_container.id,
+            'user_id': db_container.user_id,
+            'image_type': db_container.image_type,
+            'image': snapshot.image if snapshot else db_container.image_name,
+            'container_id': db_container.container_id,
+            'host_port': db_container.host_port,
+            'name': db_container.pool_name or f"{db_container.image_type}-{db_container.host_port}-{db_container.id}",
+            'has_files': db_container.has_custom_files,
+            'state': states[db_container.id]
+        }
+    by_id = {c.id: c for c in lost}
+    
+    logger.warning(f"Mass loss detected: {len(lost)}/{total} containers down, "
+                   f"recovering with {RECOVERY_WORKERS} workers...")
+    
+    started = time.monotonic()
+    recovered_count = 0
+    failed_count = 0
+    fallback = []
+    finish_times = []
+    
+    with ThreadPoolExecutor(max_workers=RECOVERY_WORKERS) as executor:
+        futures = {executor.submit(recover_in_place, job): job for job in jobs.values()}
+        for future in as_completed(futures):
+            job = futures[future]
+            db_container = by_id[job['id']]
+            try:
+                new_container_id = future.result()
+            except Exception as e:
+                logger.warning(f"Could not recover container {job['id']} in place on port {job['host_port']}: {e}")
+                fallback.append(db_container)
+                continue
+            
+            db_container.container_id = new_container_id
+            db_container.status = 'running'
+            db_container.pool_name = job['name']
+            detail = f"in place [{job['state']}]"
+            if job['id'] in snapshots:
+                record_restore(snapshots[job['id']], job['seconds'])
+                detail += ' from snapshot'
+            db.session.commit()
+            finish_times.append(time.monotonic() - started)
+            log_container_event(db_container, 'recovered', finish_times[-1], detail=detail)
+            recovered_count += 1
+            logger.info(f"✓ Recovered container {job['id']} (user: {db_container.owner.username}) "
+                        f"on port {job['host_port']} [{job['state']}]")
+    
+    in_place_count = recovered_count
+    
+    # Whatever could not keep its port gets a fresh pool container, one at a time
+    for db_container in fallback:
+        snapshot = snapshots.get(db_container.id)
+        assign_started = time.monotonic()
+        new_container_id, new_host_port, status, pool_name = assign_container_from_pool(
+            image_type=db_container.image_type,
+            user_id=db_container.user_id,
+            container_name=db_container.name,
+            mount_files=db_container.has_custom_files,
+            db_container_id=db_container.id,
+            image=snapshot.image if snapshot else None
+        )
+        assign_seconds = time.monotonic() - assign_started
+        trace_recovery(db_container.image_type, new_container_id, pool_name, assign_seconds)
+        if new_container_id:
+            old_port = db_container.host_port
+            detail = f"port {old_port} -> {new_host_port}"
+            if snapshot:
+                record_restore(snapshot, assign_seconds)
+                detail += ' from snapshot'
+            log_container_event(db_container, 'recovered', assign_seconds, detail=detail)
+            db_container.container_id = new_container_id
+            db_container.host_port = new_host_port
+            db_container.status = status
+            if pool_name:
+                db_container.pool_name = pool_name
+            db.session.commit()
+            finish_times.append(time.monotonic() - started)
+            recovered_count += 1
+            logger.info(f"✓ Recovered container {db_container.id} on a new port: {old_port} → {new_host_port}")
+        else:
+            logger.error(f"✗ Failed to recover container {db_container.id}: {status}")
+            log_container_event(db_container, 'failed', assign_seconds, detail=status)
+            db_container.status = 'error'
+            db.session.commit()
+            failed_count += 1
+    
+    total = time.monotonic() - started
+    logger.info("=" * 70)
+    logger.info("Mass Recovery Summary:")
+    logger.info(f"  Recovered: {recovered_count} ({in_place_count} on original ports)")
+    logger.info(f"  Failed: {failed_count}")
+    if finish_times:
+        logger.info(f"  First container back after: {min(finish_times):.1f}s")
+    logger.info(f"  Total time to recover: {total:.1f}s")
+    logger.info("=" * 70)
+    
+    return recovered_count, failed_count
+
+
+def restart_pool_containers():
+    """Start stopped pool containers in parallel after a daemon restart"""
+    # Paused ones are warm (kept for their user's relaunch) and stay paused
+    stopped = [c for c in iter_containers(docker_client, filters={'label': ['pool=true']})
+               if c['state'] not in ('running', 'paused')]
+    if not stopped:
+        return 0
+    
+    started = time.monotonic()
+    restarted = 0
+    with ThreadPoolExecutor(max_workers=RECOVERY_WORKERS) as executor:
+        futures = {executor.submit(docker_client.api.start, container['id']): container for container in stopped}
+        for future in as_completed(futures):
+            try:
+                future.result()
+                restarted += 1
+            except Exception as e:
+                logger.error(f"✗ Failed to restart pool container {futures[future]['name']}: {e}")
+    logger.info(f"Restarted {restarted}/{len(stopped)} pool containers in {time.monotonic() - started:.1f}s")
+    return restarted
+
+
+def recover_after_mass_loss(force=False):
+    """
+    Check whether most tracked containers went down at once (typically a Docker
+    daemon restart) and, if so, recover them in parallel on their original ports.
+    Returns: True if a mass recovery was run
+    """
+    with app.app_context():
+        total, states = get_fleet_states()
+        if not states:
+            return False
+        if not force and not is_mass_loss(total, states):
+            return False
+        
+        lost = load_containers(states)
+        mass_recover(lost, states, total)
+        restart_pool_containers()
+        return True
 
-def check_and_recover_containers():
+
+def check_and_recover_containers(shards=None, shard_count=None, running_ids=None):
     """
-    Check all assigned containers and recover any that are lost or unhealthy
+    Check all assigned containers and recover any that are lost or unhealthy.
+    With shards given, only containers of those shards are checked.
+    Returns: dict of healthy, recovered, failed and checked counts
     """
     with app.app_context():
-        logger.info("Starting container health check...")
+        shard_text = f" (shards {', '.join(map(str, shards))})" if shards is not None else ""
+        logger.info(f"Starting container health check{shard_text}...")
         
-        # Get all containers from database
-        db_containers = Container.query.all()
+        # One paged Docker listing answers the common "still running" case
+        if running_ids is None:
+            running_ids = get_running_ids()
         
-        if not db_containers:
-            logger.info("No containers to monitor")
-            return
+        query = Container.query
+        if shards is not None:
+            query = query.filter(shard_filter(shards, shard_count))
         
         recovered_count = 0
         failed_count = 0
         healthy_count = 0
+        checked_count = 0
+        snapshot_settings = get_snapshot_settings(get_catalog())
         
-        for db_container in db_containers:
+        # Walk the database in windows instead of loading every row
+        for db_container in iter_query(query, Container.id):
+            checked_count += 1
             user = User.query.get(db_container.user_id)
             if not user:
                 logger.warning(f"Container {db_container.id} has no associated user, skipping")
                 continue
             
             try:
-                # Try to get the container from Docker
-                docker_container = docker_client.containers.get(db_container.container_id)
+                if db_container.container_id in running_ids:
+                    docker_status = 'running'
+                else:
+                    # Not running in the listing, or created after it: ask Docker directly
+                    docker_container = docker_client.containers.get(db_container.container_id)
+                    docker_status = docker_container.status
                 
                 # Check container status
-                if docker_container.status == 'running':
+                if docker_status == 'running':
                     # Container is healthy
                     if db_container.status != 'running':
                         db_container.status = 'running'
@@ -324,10 +623,13 @@ def check_and_recover_containers():
                     continue
                 else:
                     # Container exists but not running
-                    logger.warning(f"Container {db_container.id} (user: {user.username}) is {docker_container.status}, attempting restart...")
+                    logger.warning(f"Container {db_container.id} (user: {user.username}) is {docker_status}, attempting restart...")
                     
                     try:
+                        restart_started = time.monotonic()
                         docker_container.restart()
+                        log_container_event(db_container, 'recovered', time.monotonic() - restart_started,
+                                            detail=f"restarted [{docker_status}]")
                         db_container.status = 'running'
                         db.session.commit()
                         logger.info(f"Successfully restarted container {db_container.id}")
@@ -343,6 +645,12 @@ def check_and_recover_containers():
             except Exception as e:
                 logger.error(f"Error checking container {db_container.id}: {e}")
             
+            # A daemon that stopped answering says nothing about this or the remaining
+            # containers; leave them for the next cycle instead of marking them failed
+            if breaker.is_open():
+                logger.warning(f"Docker is not responding, container checks stop at container {db_container.id}")
+                break
+            
             # Container is lost or failed, attempt recovery
             logger.info(f"Attempting to recover container for user {user.username} (type: {db_container.image_type})")
             
@@ -351,14 +659,32 @@ def check_and_recover_containers():
                 has_files = db_container.has_custom_files
                 user_files_path = get_user_files_path(user.id, db_container.id)
                 
+                # Restore the user's environment from its last snapshot, if there is one
+                snapshot = restore_image(docker_client, db_container, snapshot_settings)
+                
                 # Assign new container from pool
+                assign_started = time.monotonic()
                 new_container_id, new_host_port, status, pool_name = assign_container_from_pool(
                     image_type=db_container.image_type,
                     user_id=user.id,
                     container_name=db_container.name,
                     mount_files=has_files,
-                    db_container_id=db_container.id
+                    db_container_id=db_container.id,
+                    image=snapshot.image if snapshot else None
                 )
+                if snapshot and not new_container_id:
+                    logger.warning(f"Could not recover container {db_container.id} from snapshot {snapshot.image}: "
+                                   f"{status}, using a fresh container")
+                    snapshot = None
+                    new_container_id, new_host_port, status, pool_name = assign_container_from_pool(
+                        image_type=db_container.image_type,
+                        user_id=user.id,
+                        container_name=db_container.name,
+                        mount_files=has_files,
+                        db_container_id=db_container.id
+                    )
+                assign_seconds = time.monotonic() - assign_started
+                trace_recovery(db_container.image_type, new_container_id, pool_name, assign_seconds)
                 
                 if new_container_id:
                     # Update database with new container info
@@ -368,35 +694,52 @@ def check_and_recover_containers():
                     db_container.status = status
                     if pool_name:
                         db_container.pool_name = pool_name
+                    detail = f"port {old_port} -> {new_host_port}"
+                    if snapshot:
+                        record_restore(snapshot, assign_seconds)
+                        detail += ' from snapshot'
                     
                     db.session.commit()
+                    log_container_event(db_container, 'recovered', assign_seconds, detail=detail)
                     
                     logger.info(f"✓ Successfully recovered container for user {user.username}")
                     logger.info(f"  Old port: {old_port} → New port: {new_host_port}")
                     logger.info(f"  Type: {db_container.image_type}")
                     logger.info(f"  Files preserved: {has_files}")
+                    if snapshot:
+                        logger.info(f"  Restored from snapshot: {format_size(snapshot.layer_bytes)} "
+                                    f"taken {snapshot.taken_at:%Y-%m-%d %H:%M}, in {assign_seconds:.1f}s")
                     
                     recovered_count += 1
                 else:
                     logger.error(f"✗ Failed to recover container for user {user.username}: {status}")
+                    log_container_event(db_container, 'failed', assign_seconds, detail=status)
                     db_container.status = 'error'
                     db.session.commit()
                     failed_count += 1
             
             except Exception as recovery_error:
                 logger.error(f"✗ Failed to recover container for user {user.username}: {recovery_error}")
+                log_container_event(db_container, 'failed', detail=str(recovery_error))
                 db_container.status = 'error'
                 db.session.commit()
                 failed_count += 1
         
+        counts = {'healthy': healthy_count, 'recovered': recovered_count,
+                  'failed': failed_count, 'checked': checked_count}
+        if not checked_count:
+            logger.info("No containers to monitor")
+            return counts
+        
         # Summary
         logger.info("=" * 70)
         logger.info("Container Health Check Summary:")
         logger.info(f"  Healthy: {healthy_count}")
         logger.info(f"  Recovered: {recovered_count}")
         logger.info(f"  Failed: {failed_count}")
-        logger.info(f"  Total checked: {len(db_containers)}")
+        logger.info(f"  Total checked: {checked_count}")
         logger.info("=" * 70)
+        return counts
 
 
 def check_pool_health():
@@ -404,29 +747,30 @@ def check_pool_health():
     Check pool containers and restart any that are stopped
     """
     try:
-        pool_containers = docker_client.containers.list(
-            all=True,
-            filters={'label': 'pool=true'}
-        )
+        pool_containers = iter_containers(docker_client, filters={'label': ['pool=true']})
         
         available = 0
         assigned = 0
+        warm = 0
         stopped = 0
         restarted = 0
         
         for container in pool_containers:
-            label_status = container.labels.get('status', 'available')
-            docker_status = container.status
+            label_status = container['labels'].get('status', 'available')
+            docker_status = container['state']
             
-            if docker_status != 'running':
+            if docker_status == 'paused':
+                # Kept warm for the user who stopped it; the warm sweep recycles it
+                warm += 1
+            elif docker_status != 'running':
                 stopped += 1
-                logger.warning(f"Pool container {container.name} is {docker_status}")
+                logger.warning(f"Pool container {container['name']} is {docker_status}")
                 
                 # Try to restart stopped pool containers
                 try:
-                    logger.info(f"Attempting to restart pool container {container.name}...")
-                    container.start()
-                    logger.info(f"✓ Successfully restarted pool container {container.name}")
+                    logger.info(f"Attempting to restart pool container {container['name']}...")
+                    docker_client.api.start(container['id'])
+                    logger.info(f"✓ Successfully restarted pool container {container['name']}")
                     restarted += 1
                     
                     # Check if it's available or assigned
@@ -436,7 +780,7 @@ def check_pool_health():
                         available += 1
                         
                 except Exception as restart_error:
-                    logger.error(f"✗ Failed to restart pool container {container.name}: {restart_error}")
+                    logger.error(f"✗ Failed to restart pool container {container['name']}: {restart_error}")
                     
             elif label_status == 'assigned':
                 assigned += 1
@@ -447,6 +791,8 @@ def check_pool_health():
         logger.info(f"Pool Status:")
         logger.info(f"  Available: {available}")
         logger.info(f"  Assigned: {assigned}")
+        if warm > 0:
+            logger.info(f"  Warm: {warm}")
         logger.info(f"  Stopped: {stopped}")
         if restarted > 0:
             logger.info(f"  Restarted: {restarted}")
@@ -459,18 +805,207 @@ def check_pool_health():
         logger.error(f"Error checking pool health: {e}")
 
 
+def run_pool_tasks(force_mass_recovery=False):
+    """Fleet-wide work done before the container checks, by one process only"""
+    # After a daemon restart, bring everything back in parallel on the same ports
+    if recover_after_mass_loss(force=force_mass_recovery):
+        logger.info("Mass recovery finished, continuing with the regular checks")
+    
+    # Check and restart pool containers first
+    try:
+        with scheduler.operation('replenishment'):
+            check_pool_health()
+    except Overloaded as e:
+        logger.warning(f"Pool health check skipped: {e}")
+    
+    # Shift idle capacity towards starved container types
+    if get_rebalance_settings(get_catalog())['enabled']:
+        try:
+            with scheduler.operation('background'):
+                rebalance_pool(docker_client)
+        except Overloaded as e:
+            logger.warning(f"Pool rebalancing skipped: {e}")
+        except Exception as e:
+            logger.error(f"Pool rebalancing failed: {e}")
+
+
+def run_queue_tasks():
+    """Fleet-wide work done after the container checks, by one process only"""
+    # Free the slots of abandoned containers
+    if get_lease_settings(get_catalog())['enabled']:
+        try:
+            with scheduler.operation('background'):
+                reclaim_leases()
+        except Overloaded as e:
+            logger.warning(f"Lease reclaim skipped: {e}")
+        except Exception as e:
+            logger.error(f"Lease reclaim failed: {e}")
+    
+    # Give warm containers of users who did not come back to the pool
+    if get_warm_settings(get_catalog())['enabled']:
+        try:
+            with scheduler.operation('replenishment'):
+                sweep_warm()
+        except Overloaded as e:
+            logger.warning(f"Warm container sweep skipped: {e}")
+        except Exception as e:
+            logger.error(f"Warm container sweep failed: {e}")
+    
+    # Finally hand free or new containers to queued launches; they stay queued while shed
+    try:
+        with scheduler.operation('replenishment'):
+            serve_launch_queue()
+    except Overloaded as e:
+        logger.warning(f"Launch queue skipped: {e}")
+    
+    # Snapshot stateful containers last, so their commits never delay recovery or launches
+    if get_snapshot_settings(get_catalog())['enabled']:
+        try:
+            with scheduler.operation('background'):
+                snapshot_containers()
+        except Overloaded as e:
+            logger.warning(f"Snapshots skipped: {e}")
+        except Exception as e:
+            logger.error(f"Snapshots failed: {e}")
+
+
+def run_worker_cycle(worker):
+    """
+    One cycle of a sharded worker: sync leases, check every owned shard and record
+    per-shard metrics. The owner of shard 0 also runs the fleet-wide tasks.
+    Returns: list of shards checked
+    """
+    with app.app_context():
+        owned = worker.sync()
+    if not owned:
+        logger.info(f"Worker {worker.name} owns no shards this cycle")
+        return []
+    
+    leader = 0 in owned
+    logger.info(f"Worker {worker.name} owns shards {owned}{' (leader)' if leader else ''}")
+    if leader:
+        run_pool_tasks()
+    
+    running_ids = get_running_ids()
+    checked = []
+    for shard in owned:
+        # Skip shards whose lease ran out during a long cycle; another worker has them now
+        with app.app_context():
+            if shard not in worker.renew():
+                logger.warning(f"Lost the lease on shard {shard}, skipping it")
+                continue
+        
+        started = time.monotonic()
+        counts = check_and_recover_containers([shard], worker.shard_count, running_ids)
+        elapsed = time.monotonic() - started
+        
+        with app.app_context():
+            worker.record_cycle(shard, elapsed, counts['checked'])
+        record_metrics(
+            counters={
+                f'monitor.shard.{shard}.cycles': 1,
+                f'monitor.shard.{shard}.recovered': counts['recovered'],
+                f'monitor.shard.{shard}.failed': counts['failed'],
+            },
+            gauges={
+                f'monitor.shard.{shard}.cycle_seconds': round(elapsed, 3),
+                f'monitor.shard.{shard}.containers': counts['checked'],
+            }
+        )
+        checked.append(shard)
+    
+    if leader:
+        run_queue_tasks()
+    return checked
+
+
+def run_worker(name, interval=None, cycles=None):
+    """
+    Run as one of several cooperating monitor workers until stopped.
+    interval: seconds between cycle starts (default from the catalog)
+    cycles:   stop after this many cycles, for testing
+    """
+    settings = get_monitor_settings(get_catalog())
+    interval = interval or settings['interval_seconds']
+    worker = ShardWorker(name, settings)
+    with app.app_context():
+        db.create_all()
+    logger.info(f"Worker {name} starting: {worker.shard_count} shards, {interval}s interval")
+    
+    completed = 0
+    try:
+        while cycles is None or completed < cycles:
+            started = time.monotonic()
+            try:
+                run_worker_cycle(worker)
+            except Exception as e:
+                logger.error(f"Worker cycle failed: {e}", exc_info=True)
+            completed += 1
+            
+            elapsed = time.monotonic() - started
+            record_metrics(gauges={f'monitor.worker.{name}.cycle_seconds': round(elapsed, 3)})
+            scheduler.report()
+            breaker.report()
+            if cycles is None or completed < cycles:
+                time.sleep(max(interval - elapsed, 0))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        with app.app_context():
+            worker.leave()
+        logger.info(f"Worker {name} stopped, shards released")
+
+
+def parse_args(args):
+    """Parse container_monitor.py command line options"""
+    parser = argparse.ArgumentParser(description='Container health monitor')
+    parser.add_argument('--mass-recover', action='store_true',
+                        help='Recover every down container in parallel on its original port')
+    parser.add_argument('--worker', action='store_true',
+                        help='Run continuously as one of several sharded workers')
+    parser.add_argument('--name', default=None, help='Worker name (default: host:pid)')
+    parser.add_argument('--interval', type=float, default=None, help='Seconds between worker cycles')
+    parser.add_argument('--cycles', type=int, default=None, help='Stop a worker after N cycles')
+    parser.add_argument('--shard-status', action='store_true', help='Show shard leases and exit')
+    parser.add_argument('--snapshots', action='store_true', help='Show container snapshots and exit')
+    return parser.parse_args(args)
+
+
 if __name__ == '__main__':
+    options = parse_args(sys.argv[1:])
+    
+    if options.shard_status:
+        with app.app_context():
+            show_shards()
+        sys.exit(0)
+    
+    if options.snapshots:
+        with app.app_context():
+            show_snapshots()
+        sys.exit(0)
+    
+    # Everything else works on containers
+    if not docker_client:
+        sys.exit(1)
+    
+    if options.worker:
+        run_worker(options.name or default_worker_name(), options.interval, options.cycles)
+        sys.exit(0)
+    
     try:
         logger.info("=" * 70)
         logger.info("Container Monitor - Starting health check")
         logger.info("=" * 70)
         
-        # Check and restart pool containers first
-        check_pool_health()
+        run_pool_tasks(force_mass_recovery=options.mass_recover)
         
         # Then check and recover user containers
         check_and_recover_containers()
         
+        run_queue_tasks()
+        scheduler.report()
+        breaker.report()
+        
         logger.info("Container monitor completed successfully")
         sys.exit(0)
     
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Database Configuration
+Engine settings for the configured database URI. The web app, the monitor workers and
+the CLI tools share one database, so SQLite runs in WAL mode with a busy timeout and
+server databases get a bounded, health-checked connection pool.
+"""
+
+import os
+import sqlite3
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+DEFAULT_DATABASE_URI = 'sqlite:///paas_platform.db'
+
+# SQLite connection settings
+# SQLITE_JOURNAL_MODE:    WAL lets readers run while one process writes
+# SQLITE_BUSY_TIMEOUT_MS: how long a writer waits for the lock before "database is locked"
+SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'wal')
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', '30000'))
+
+# Connection pool settings for server databases (PostgreSQL, MySQL)
+# DB_POOL_SIZE:     connections kept open per process
+# DB_MAX_OVERFLOW:  extra connections allowed under bursts
+# DB_POOL_TIMEOUT:  seconds to wait for a free connection
+# DB_POOL_RECYCLE:  seconds after which a connection is replaced
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', '5'))
+DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', '10'))
+DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', '30'))
+DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', '1800'))
+
+
+def get_database_uri():
+    """Database URI from DATABASE_URL, defaulting to the local SQLite file"""
+    uri = os.environ.get('DATABASE_URL', DEFAULT_DATABASE_URI)
+    # Heroku-style URLs use the scheme SQLAlchemy 1.4+ no longer accepts
+    if uri.startswith('postgres://'):
+        uri = 'postgresql://' + uri[len('postgres://'):]
+    return uri
+
+
+def engine_options(uri):
+    """
+    SQLAlchemy engine options for a database URI.
+    Returns: dict for app.config['SQLALCHEMY_ENGINE_OPTIONS']
+    """
+    if uri.startswith('sqlite'):
+        # Python's own lock wait, in seconds; the PRAGMA below covers the SQLite side
+        return {'connect_args': {'timeout': SQLITE_BUSY_TIMEOUT_MS / 1000}}
+
+    return {
+        'pool_size': DB_POOL_SIZE,
+        'max_overflow': DB_MAX_OVERFLOW,
+        'pool_timeout': DB_POOL_TIMEOUT,
+        'pool_recycle': DB_POOL_RECYCLE,
+        'pool_pre_ping': True,
+    }
+
+
+@event.listens_for(Engine, 'connect')
+def configure_sqlite(dbapi_connection, connection_record):
+    """Apply journal mode, busy timeout and sync level to every new SQLite connection"""
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    if SQLITE_JOURNAL_MODE.lower() == 'wal':
+        # Durable at checkpoints; safe in WAL mode and much cheaper per commit
+        cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Demand Trace
+Append-only log of pool demand: every launch, release and pool-consuming recovery,
+one tab-separated line per event. pool_simulator.py replays it against candidate
+pool sizes. Lines are written with a single O_APPEND write, so the web app, monitor
+workers and CLI tools can share one file without locking.
+
+Line format:
+    <unix time> <event> <image type> <latency ms> <pool empty 0/1> <held seconds>
+"-" marks a field that does not apply (no latency for queued launches, no held time
+for launches).
+"""
+
+import os
+import time
+from collections import namedtuple
+
+TRACE_FILE = os.environ.get('DEMAND_TRACE', '/opt/my-paas/demand_trace.log')
+
+# Events in the trace
+# launch:   a user asked for a container (pool_empty when it had to queue)
+# release:  a container went back to the pool; held is how long the user had it
+# recover:  the monitor replaced a lost container with one from the pool
+EVENTS = ('launch', 'release', 'recover')
+
+TraceEvent = namedtuple('TraceEvent', 'time event image_type latency pool_empty held')
+
+
+def format_field(value, fmt):
+    return '-' if value is None else format(value, fmt)
+
+
+def record_event(event, image_type, latency=None, pool_empty=False, held=None, path=TRACE_FILE):
+    """
+    Append one event to the trace.
+    latency: seconds the operation took, or None
+    held:    seconds a released container was assigned, or None
+    """
+    line = '\t'.join((
+        f"{time.time():.3f}",
+        event,
+        image_type,
+        format_field(None if latency is None else latency * 1000, '.0f'),
+        '1' if pool_empty else '0',
+        format_field(held, '.0f'),
+    )) + '\n'
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line.encode())
+        finally:
+            os.close(fd)
+    except OSError as e:
+        # Tracing must never break the operation being traced
+        print(f"Warning: Could not write demand trace {path}: {e}")
+
+
+def parse_field(value):
+    return None if value == '-' else float(value)
+
+
+def read_trace(path=TRACE_FILE):
+    """
+    Events from a trace file in the order they were written; malformed lines
+    (e.g. a line cut short by a crash) are skipped.
+    Returns: iterator of TraceEvent
+    """
+    with open(path) as f:
+        for line in f:
+            fields = line.rstrip('\n').split('\t')
+            if len(fields) != 6 or fields[1] not in EVENTS:
+                continue
+            try:
+                latency = parse_field(fields[3])
+                yield TraceEvent(
+                    time=float(fields[0]),
+                    event=fields[1],
+                    image_type=fields[2],
+                    latency=None if latency is None else latency / 1000,
+                    pool_empty=fields[4] == '1',
+                    held=parse_field(fields[5]),
+                )
+            except ValueError:
+                continue
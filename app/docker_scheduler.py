@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Docker Operation Scheduler
+Every request a process sends to the Docker daemon goes through one scheduler. The
+scheduler limits how many run at once, overall and per priority class, and starts
+waiting requests highest class first:
+
+    interactive    user launches, stops and status polls (web app)
+    recovery       the monitor bringing lost containers back
+    replenishment  refilling the pool and serving queued launches
+    background     sweeps: lease reclaim, rebalancing, snapshots, resource sampling
+
+Each request runs in the class of the operation its thread is in (see operation()), or
+the process default. When daemon latency rises, new operations of low classes are
+shed (Overloaded) instead of queued, so sweeps back off and leave the daemon to users.
+
+Schedulers are per process. The web workers, the monitor and pool_manager.py share
+nothing but the daemon, so they back off from each other through the latency each
+one sees.
+"""
+
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+import docker
+
+from catalog import get_catalog
+from metrics import record_metrics
+
+PRIORITIES = ('interactive', 'recovery', 'replenishment', 'background')
+
+# Defaults for the "scheduler" section of pool_catalog.json
+# max_concurrent:          Docker requests in flight per process
+# class_limits:            requests in flight per class; keep the sum of the lower classes
+#                          below max_concurrent so interactive requests always find a slot
+# shed_latency_ms:         class -> daemon latency above which its new operations are shed
+# latency_window_seconds:  a latency older than this no longer counts (nothing measured it)
+SCHEDULER_DEFAULTS = {
+    'max_concurrent': 8,
+    'class_limits': {'interactive': 8, 'recovery': 3, 'replenishment': 2, 'background': 1},
+    'shed_latency_ms': {'replenishment': 2000, 'background': 500},
+    'latency_window_seconds': 30,
+}
+
+# Weight of the newest request in the daemon latency average
+LATENCY_ALPHA = 0.2
+
+# Requests that take long by design (waiting on a container, streaming, copying data)
+# say nothing about daemon load, so they are left out of the latency
+SLOW_PATHS = ('/stop', '/restart', '/kill', '/wait', '/attach', '/logs', '/stats', '/events', '/export',
+              '/archive', '/commit', '/images/create', '/build')
+
+
+def get_scheduler_settings(catalog):
+    """Scheduler settings from the catalog, filled in with defaults"""
+    settings = dict(SCHEDULER_DEFAULTS)
+    settings.update(catalog.scheduler)
+    for field in ('class_limits', 'shed_latency_ms'):
+        merged = dict(SCHEDULER_DEFAULTS[field])
+        merged.update(catalog.scheduler.get(field, {}))
+        settings[field] = merged
+    return settings
+
+
+def measures_latency(request):
+    """Whether a request's round trip reflects daemon load: quick reads only"""
+    return request.method == 'GET' and not urlsplit(request.url).path.endswith(SLOW_PATHS)
+
+
+class Overloaded(docker.errors.DockerException):
+    """An operation was shed because the daemon is slow"""
+
+    def __init__(self, priority, latency):
+        super().__init__(f"Docker is overloaded ({latency * 1000:.0f} ms), {priority} work is shed")
+        self.priority = priority
+        self.latency = latency
+
+
+class DockerScheduler:
+    """Priority queue and concurrency limits for the Docker requests of this process"""
+
+    def __init__(self, default='interactive', settings=None):
+        self.default = default
+        self.fixed_settings = settings
+        self.catalog = None
+        self.current_settings = None
+        self.local = threading.local()
+        self.condition = threading.Condition()
+        self.sequence = itertools.count()
+        self.waiting = []
+        self.running = dict.fromkeys(PRIORITIES, 0)
+        self.queued = dict.fromkeys(PRIORITIES, 0)
+        self.latency = 0.0
+        self.latency_at = None
+        self.reset_counts()
+        self.reported_at = time.monotonic()
+
+    def reset_counts(self):
+        self.requests = dict.fromkeys(PRIORITIES, 0)
+        self.shed = dict.fromkeys(PRIORITIES, 0)
+        self.waited = dict.fromkeys(PRIORITIES, 0.0)
+        self.peak_queued = dict(self.queued)
+
+    def settings(self):
+        """Current settings, following catalog reloads"""
+        if self.fixed_settings is not None:
+            return self.fixed_settings
+        catalog = get_catalog()
+        if catalog is not self.catalog:
+            self.current_settings = get_scheduler_settings(catalog)
+            self.catalog = catalog
+        return self.current_settings
+
+    def priority(self):
+        """Class of the current thread's Docker requests"""
+        return getattr(self.local, 'priority', None) or self.default
+
+    def daemon_latency(self):
+        """Recent average round trip of quick requests in seconds, 0 when there is none"""
+        if self.latency_at is None or time.monotonic() - self.latency_at > self.settings()['latency_window_seconds']:
+            return 0.0
+        return self.latency
+
+    def shedding(self, priority):
+        """Whether new operations of a class are shed at the current daemon latency"""
+        threshold = self.settings()['shed_latency_ms'].get(priority)
+        return threshold is not None and self.daemon_latency() * 1000 > threshold
+
+    @contextmanager
+    def operation(self, priority):
+        """
+        Run the block's Docker requests in a priority class. Starting an operation of a
+        class that is being shed raises Overloaded; requests already inside one are
+        never cut off, so a started operation is not left half done.
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority class: {priority}")
+        if self.shedding(priority):
+            with self.condition:
+                self.shed[priority] += 1
+            raise Overloaded(priority, self.daemon_latency())
+        previous = getattr(self.local, 'priority', None)
+        self.local.priority = priority
+        try:
+            yield
+        finally:
+            self.local.priority = previous
+
+    def can_start(self, entry, priority, settings):
+        if sum(self.running.values()) >= settings['max_concurrent']:
+            return False
+        limits = settings['class_limits']
+        if self.running[priority] >= limits.get(priority, settings['max_concurrent']):
+            return False
+        # A better placed waiter goes first, unless its own class is at its limit
+        for other in self.waiting:
+            if other < entry:
+                other_class = PRIORITIES[other[0]]
+                if self.running[other_class] < limits.get(other_class, settings['max_concurrent']):
+                    return False
+        return True
+
+    @contextmanager
+    def slot(self, priority=None):
+        """Wait for a free slot of the class, highest class first, and hold it for the block"""
+        priority = priority or self.priority()
+        settings = self.settings()
+        entry = (PRIORITIES.index(priority), next(self.sequence))
+        queued_at = time.monotonic()
+        with self.condition:
+            self.waiting.append(entry)
+            self.queued[priority] += 1
+            self.peak_queued[priority] = max(self.peak_queued[priority], self.queued[priority])
+            try:
+                while not self.can_start(entry, priority, settings):
+                    self.condition.wait()
+            finally:
+                self.waiting.remove(entry)
+                self.queued[priority] -= 1
+            self.running[priority] += 1
+            self.requests[priority] += 1
+            self.waited[priority] += time.monotonic() - queued_at
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.running[priority] -= 1
+                self.condition.notify_all()
+
+    def observe(self, seconds):
+        """Add a quick request's round trip to the daemon latency"""
+        with self.condition:
+            if self.latency_at is None or time.monotonic() - self.latency_at > self.settings()['latency_window_seconds']:
+                self.latency = seconds
+            else:
+                self.latency += LATENCY_ALPHA * (seconds - self.latency)
+            self.latency_at = time.monotonic()
+
+    def attach(self, client):
+        """Send every HTTP request of a docker.DockerClient through the scheduler"""
+        send = client.api.send
+
+        def scheduled_send(request, **kwargs):
+            with self.slot():
+                started = time.monotonic()
+                response = send(request, **kwargs)
+                if measures_latency(request):
+                    self.observe(time.monotonic() - started)
+                return response
+
+        client.api.send = scheduled_send
+        return client
+
+    def report(self, min_interval=0):
+        """
+        Write request, wait and shed counts, queue depths and daemon latency to the
+        metrics file, at most once per `min_interval` seconds and only after activity.
+        """
+        now = time.monotonic()
+        with self.condition:
+            if now - self.reported_at < min_interval:
+                return
+            self.reported_at = now
+            requests, shed, waited, peak = self.requests, self.shed, self.waited, self.peak_queued
+            running = dict(self.running)
+            self.reset_counts()
+        if not any(requests.values()) and not any(shed.values()):
+            return
+        counters, gauges = {}, {'scheduler.latency_ms': round(self.daemon_latency() * 1000, 1)}
+        for priority in PRIORITIES:
+            counters[f'scheduler.{priority}.requests'] = requests[priority]
+            counters[f'scheduler.{priority}.shed'] = shed[priority]
+            counters[f'scheduler.{priority}.wait_seconds'] = round(waited[priority], 3)
+            gauges[f'scheduler.{priority}.queued_peak'] = peak[priority]
+            gauges[f'scheduler.{priority}.running'] = running[priority]
+        record_metrics(counters=counters, gauges=gauges)
+
+
+# The scheduler of this process; Docker clients are attached to it in lazy_docker.py
+scheduler = DockerScheduler()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+File Cache
+In-process LRU of small, frequently previewed user files, bounded by total size.
+Entries are keyed by path and validated against the file's stat on every lookup, so
+an upload or delete is picked up without explicit invalidation.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+def file_etag(stat):
+    """ETag of a file version, from its inode, size and modification time"""
+    return f"{stat.st_ino:x}-{stat.st_size:x}-{stat.st_mtime_ns:x}"
+
+
+class FileCache:
+    """Thread-safe LRU of file contents holding at most `max_bytes`, files up to `max_file_bytes` each"""
+
+    def __init__(self, max_bytes, max_file_bytes):
+        self.max_bytes = max_bytes
+        self.max_file_bytes = max_file_bytes
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.reported_hits = 0
+        self.reported_misses = 0
+        self.reported_at = time.monotonic()
+
+    def fits(self, stat):
+        """Whether a file is small enough to be cached"""
+        return stat.st_size <= min(self.max_file_bytes, self.max_bytes)
+
+    def get(self, path, stat):
+        """Cached contents of the file version described by stat, or None"""
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry is None or entry[0] != file_etag(stat):
+                self.misses += 1
+                return None
+            self.entries.move_to_end(path)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, path, stat, data):
+        """Store a file's contents, evicting the least recently used files to make room"""
+        if len(data) > min(self.max_file_bytes, self.max_bytes):
+            return
+        with self.lock:
+            old = self.entries.pop(path, None)
+            if old is not None:
+                self.size -= len(old[1])
+            while self.entries and self.size + len(data) > self.max_bytes:
+                _, (_, evicted) = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+            self.entries[path] = (file_etag(stat), data)
+            self.size += len(data)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def hit_rate(self):
+        """Share of lookups answered from the cache since the process started"""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def take_counts(self, min_interval=0):
+        """
+        Hits and misses since the previous call, at most once per `min_interval` seconds.
+        Returns: tuple (hits, misses), or None when called again too soon
+        """
+        now = time.monotonic()
+        with self.lock:
+            if now - self.reported_at < min_interval:
+                return None
+            hits = self.hits - self.reported_hits
+            misses = self.misses - self.reported_misses
+            self.reported_hits, self.reported_misses, self.reported_at = self.hits, self.misses, now
+        return hits, misses
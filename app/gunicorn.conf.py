@@ -0,0 +1,40 @@
+"""
+Gunicorn Settings for the PaaS Web App
+Used by paas-app.service: gunicorn -c gunicorn.conf.py wsgi:application
+Every setting can be overridden with the environment variable in brackets.
+"""
+
+import multiprocessing
+import os
+
+# Listen address [GUNICORN_BIND]
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+
+# Worker processes [GUNICORN_WORKERS], each with a few threads [GUNICORN_THREADS]:
+# requests spend most of their time waiting on Docker, so threads keep a worker busy
+workers = int(os.environ.get('GUNICORN_WORKERS', min(multiprocessing.cpu_count() * 2 + 1, 8)))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', '4'))
+
+# Import the app once in the master and fork workers from it: workers start faster,
+# share the imported code pages, and the schema is created once (see wsgi.py)
+preload_app = True
+
+# Replace each worker after this many requests [GUNICORN_MAX_REQUESTS], with jitter so
+# the workers do not all restart at once; bounds slow memory growth in long-running workers
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', '1000'))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', '100'))
+
+# Launches and uploads wait on Docker for a while [GUNICORN_TIMEOUT]
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '120'))
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = '-'
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    """Give each worker its own connections and background threads"""
+    from app import after_fork
+    after_fork()
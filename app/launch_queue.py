@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Launch Queue Policy
+Fair-share ordering and wait estimates for launch requests that arrive while the
+pool of their image type is empty. The queue itself is the LaunchRequest table in app.py.
+"""
+
+import math
+from datetime import datetime, timedelta
+
+# Defaults for the "queue" section of pool_catalog.json
+# max_containers_per_user:  running plus queued containers one user may hold
+# max_on_demand:            containers the monitor may create outside the pool at once
+# max_on_demand_per_cycle:  on-demand creations per monitor run, to smooth out bursts
+# default_wait_seconds:     assumed time to free a slot when there is no history yet
+# history_window_minutes:   how far back served requests count towards the ETA
+QUEUE_DEFAULTS = {
+    'max_containers_per_user': 3,
+    'max_on_demand': 5,
+    'max_on_demand_per_cycle': 2,
+    'default_wait_seconds': 60,
+    'history_window_minutes': 60,
+}
+
+
+def get_queue_settings(catalog):
+    """Queue settings from the catalog, filled in with defaults"""
+    settings = dict(QUEUE_DEFAULTS)
+    settings.update(catalog.queue)
+    return settings
+
+
+def fair_order(requests, active_counts):
+    """
+    Order queued requests so users share freed slots fairly.
+
+    Each user's n-th waiting request ranks as if the user already held n more
+    containers, so a user with many queued launches cannot starve a user with one,
+    and users holding fewer containers are served first. Ties go to the oldest request.
+
+    requests:      objects with user_id and created_at
+    active_counts: dict user_id -> containers the user currently holds
+    Returns: new list in service order
+    """
+    seen = {}
+    ranked = []
+    for request in sorted(requests, key=lambda r: r.created_at):
+        ordinal = seen.get(request.user_id, 0)
+        seen[request.user_id] = ordinal + 1
+        ranked.append((active_counts.get(request.user_id, 0) + ordinal, request.created_at, request))
+    ranked.sort(key=lambda item: (item[0], item[1]))
+    return [request for _, _, request in ranked]
+
+
+def estimate_wait_seconds(position, served_times, settings, now=None):
+    """
+    Estimate how long the request at a 1-based queue position will wait, from the rate
+    at which requests of the same type were served recently.
+
+    served_times: datetimes at which recent requests of the type left the queue
+    Returns: seconds (int)
+    """
+    now = now or datetime.utcnow()
+    window = timedelta(minutes=settings['history_window_minutes'])
+    recent = [t for t in served_times if now - t <= window]
+
+    if len(recent) < 2:
+        return position * settings['default_wait_seconds']
+
+    span = (now - min(recent)).total_seconds()
+    rate = len(recent) / span if span > 0 else 0
+    if rate <= 0:
+        return position * settings['default_wait_seconds']
+    return int(math.ceil(position / rate))
+
+
+def format_wait(seconds):
+    """Human readable wait estimate"""
+    if seconds < 60:
+        return 'under a minute'
+    minutes = int(math.ceil(seconds / 60))
+    return f"about {minutes} minute{'s' if minutes != 1 else ''}"
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Lazy Docker Client
+docker.from_env() talks to the daemon as soon as it is called (API version
+negotiation), so a client created at import makes every process that imports the
+module wait for Docker, or fail, even when it never uses it. LazyDockerClient
+connects on first use and otherwise stands in for the docker.DockerClient: attribute
+access is forwarded, and it is falsy while Docker is unreachable, so existing
+`if not docker_client:` checks keep working.
+"""
+
+import threading
+import time
+
+# After a failed connection, seconds before the next use tries again
+RETRY_SECONDS = 10
+
+
+def connect():
+    """
+    docker.from_env() with its requests sent through the process's circuit breaker and
+    Docker scheduler (in that order, so a refused request never waits for a slot);
+    docker-py is imported here so importing this module stays cheap
+    """
+    import docker
+    from docker_scheduler import scheduler
+    from circuit_breaker import breaker
+    return breaker.attach(scheduler.attach(docker.from_env()))
+
+
+class LazyDockerClient:
+    """docker.DockerClient created on first use, shared by all threads"""
+
+    def __init__(self, factory=connect, retry=RETRY_SECONDS, on_error=None):
+        self.factory = factory
+        self.retry = retry
+        self.on_error = on_error or (lambda e: print(f"Warning: Could not connect to Docker: {e}"))
+        self.lock = threading.Lock()
+        self.client = None
+        self.failed_at = None
+
+    def get(self):
+        """The connected client, or None while Docker is unreachable"""
+        client = self.client
+        if client is not None:
+            return client
+        with self.lock:
+            if self.client is None and (self.failed_at is None or time.monotonic() - self.failed_at >= self.retry):
+                try:
+                    self.client = self.factory()
+                    self.failed_at = None
+                except Exception as e:
+                    self.failed_at = time.monotonic()
+                    self.on_error(e)
+            return self.client
+
+    def reset(self):
+        """Drop the connection, e.g. in a worker forked from a process that used it"""
+        with self.lock:
+            self.client = None
+            self.failed_at = None
+
+    def __bool__(self):
+        return self.get() is not None
+
+    def __getattr__(self, name):
+        # Only called for attributes the proxy itself does not have
+        if name.startswith('__'):
+            raise AttributeError(name)
+        client = self.get()
+        if client is None:
+            import docker
+            raise docker.errors.DockerException('Docker is not reachable')
+        return getattr(client, name)
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Container Leases
+Per-plan lease lengths for assigned containers. A lease is renewed while its owner
+is active; expired leases are reclaimed back to the pool by the container monitor.
+"""
+
+from datetime import datetime, timedelta
+
+# Defaults for the "leases" section of pool_catalog.json
+# enabled:             reclaim expired leases on every monitor cycle
+# default_plan:        plan of users that have none set
+# reclaim_batch_size:  containers released per batch (one commit per batch)
+# plans:               plan name -> {"lease_hours": hours, or null for no expiry}
+LEASE_DEFAULTS = {
+    'enabled': True,
+    'default_plan': 'free',
+    'reclaim_batch_size': 10,
+    'plans': {
+        'free': {'lease_hours': 24},
+    },
+}
+
+
+def get_lease_settings(catalog):
+    """Lease settings from the catalog, filled in with defaults"""
+    settings = dict(LEASE_DEFAULTS)
+    settings.update(catalog.leases)
+    return settings
+
+
+def lease_ttl(settings, plan):
+    """
+    Lease length of a plan.
+    Returns: timedelta, or None when containers on the plan never expire
+    """
+    plans = settings['plans']
+    plan_settings = plans.get(plan or settings['default_plan'])
+    if plan_settings is None:
+        plan_settings = plans.get(settings['default_plan'], {})
+    hours = plan_settings.get('lease_hours')
+    if not hours:
+        return None
+    return timedelta(hours=hours)
+
+
+def lease_expiry(settings, plan, now=None):
+    """Expiry time of a lease starting or renewed now, or None for no expiry"""
+    ttl = lease_ttl(settings, plan)
+    if ttl is None:
+        return None
+    return (now or datetime.utcnow()) + ttl
+
+
+def format_remaining(expires_at, now=None):
+    """Human readable time left on a lease"""
+    if expires_at is None:
+        return 'no expiry'
+    seconds = (expires_at - (now or datetime.utcnow())).total_seconds()
+    if seconds <= 0:
+        return 'expired'
+    hours = int(seconds // 3600)
+    if hours >= 48:
+        return f"{hours // 24} days"
+    if hours >= 1:
+        return f"{hours}h {int(seconds % 3600 // 60)}m"
+    return f"{max(int(seconds // 60), 1)}m"
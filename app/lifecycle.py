@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Container Lifecycle Events
+Structured history of every container: claimed, started, ready, files-mounted,
+released, recovered and failed, each with the duration of the phase it ends.
+Events are queued in memory and written to the ContainerEvent table in batches by a
+background thread, so recording them adds no database round trip to a request.
+"""
+
+import atexit
+import queue
+import threading
+import time
+from datetime import datetime
+
+EVENTS = ('claimed', 'started', 'ready', 'files-mounted', 'released', 'recovered', 'failed')
+
+# Writer settings
+# FLUSH_INTERVAL:  seconds a queued event waits at most before it is written
+# BATCH_SIZE:      events per INSERT
+# MAX_PENDING:     events held in memory; beyond this new events are dropped and counted
+FLUSH_INTERVAL = 1.0
+BATCH_SIZE = 200
+MAX_PENDING = 10000
+
+
+class EventWriter:
+    """Background thread writing queued event rows with a flush(rows) function"""
+
+    def __init__(self, flush, batch_size=BATCH_SIZE, interval=FLUSH_INTERVAL, max_pending=MAX_PENDING):
+        self.flush = flush
+        self.batch_size = batch_size
+        self.interval = interval
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.lock = threading.Lock()
+        self.thread = None
+        self.dropped = 0
+        self.written = 0
+
+    def start(self):
+        """Start the writer thread on first use, and flush what is left at exit"""
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.run, name='lifecycle-writer', daemon=True)
+                self.thread.start()
+                atexit.register(self.close)
+
+    def emit(self, row):
+        """Queue one event row without blocking"""
+        if self.thread is None:
+            self.start()
+        try:
+            self.queue.put_nowait(row)
+        except queue.Full:
+            self.dropped += 1
+
+    def run(self):
+        while True:
+            rows = [self.queue.get()]
+            deadline = time.monotonic() + self.interval
+            stopping = rows[0] is None
+            while not stopping and len(rows) < self.batch_size:
+                try:
+                    row = self.queue.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                stopping = row is None
+                rows.append(row)
+            rows = [row for row in rows if row is not None]
+            if rows:
+                try:
+                    self.flush(rows)
+                    self.written += len(rows)
+                except Exception as e:
+                    # History is best effort; the operations themselves already happened
+                    print(f"Warning: Could not write {len(rows)} lifecycle events: {e}")
+            if stopping:
+                return
+
+    def close(self, timeout=5):
+        """Write everything queued so far and stop the thread"""
+        thread = self.thread
+        if thread is None or not thread.is_alive():
+            return
+        try:
+            self.queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        thread.join(timeout)
+
+
+def event_row(event, image_type, container_id=None, user_id=None, phase=None, elapsed=None, detail=None):
+    """One ContainerEvent row; phase and elapsed are in seconds"""
+    return {
+        'container_id': container_id,
+        'user_id': user_id,
+        'image_type': image_type,
+        'event': event,
+        'at': datetime.utcnow(),
+        'phase_ms': None if phase is None else phase * 1000,
+        'elapsed_ms': None if elapsed is None else elapsed * 1000,
+        'detail': detail[:255] if detail else None,
+    }
+
+
+class Timeline:
+    """
+    Events of one operation (a launch or a restart), kept until finish() so they can
+    carry the database id of a container that does not exist yet when they happen.
+    """
+
+    def __init__(self, writer, image_type, user_id=None):
+        self.writer = writer
+        self.image_type = image_type
+        self.user_id = user_id
+        self.started = self.last = time.monotonic()
+        self.rows = []
+
+    def mark(self, event, detail=None):
+        """Record the end of a phase"""
+        now = time.monotonic()
+        self.rows.append(event_row(event, self.image_type, user_id=self.user_id,
+                                   phase=now - self.last, elapsed=now - self.started, detail=detail))
+        self.last = now
+
+    def finish(self, container_id=None):
+        """Hand the recorded events to the writer"""
+        if self.writer is None:
+            return
+        for row in self.rows:
+            row['container_id'] = container_id
+            self.writer.emit(row)
+        self.rows = []
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a sorted list, None when empty"""
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def summarize_events(rows):
+    """
+    Launch-to-ready and per-phase latency percentiles per image type.
+    rows: (image_type, event, phase_ms, elapsed_ms) tuples
+    Returns: dict type -> {'ready': count, 'failed': count, 'ready_p50': ms, 'ready_p95': ms,
+                           'phases': {event: (p50 ms, p95 ms)}}
+    """
+    ready = {}
+    phases = {}
+    failed = {}
+    for image_type, event, phase_ms, elapsed_ms in rows:
+        if event == 'ready' and elapsed_ms is not None:
+            ready.setdefault(image_type, []).append(elapsed_ms)
+        if event == 'failed':
+            failed[image_type] = failed.get(image_type, 0) + 1
+        if phase_ms is not None:
+            phases.setdefault(image_type, {}).setdefault(event, []).append(phase_ms)
+
+    summary = {}
+    for image_type in sorted(set(ready) | set(phases) | set(failed)):
+        times = sorted(ready.get(image_type, []))
+        summary[image_type] = {
+            'ready': len(times),
+            'failed': failed.get(image_type, 0),
+            'ready_p50': percentile(times, 0.5),
+            'ready_p95': percentile(times, 0.95),
+            'phases': {event: (percentile(sorted(values), 0.5), percentile(sorted(values), 0.95))
+                       for event, values in phases.get(image_type, {}).items()},
+        }
+    return summary
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Platform Metrics
+Counters and gauges shared by the web app, the container monitor and the CLI tools.
+Every process runs separately, so metrics live in a small JSON file updated under a
+file lock.
+"""
+
+import fcntl
+import json
+import os
+import sys
+from datetime import datetime
+
+METRICS_FILE = os.environ.get('POOL_METRICS', '/opt/my-paas/metrics.json')
+
+
+def load_metrics(path=METRICS_FILE):
+    """Read the metrics file, or empty metrics if it does not exist yet"""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'counters': {}, 'gauges': {}, 'updated_at': None}
+
+
+def record_metrics(counters=None, gauges=None, path=METRICS_FILE):
+    """
+    Add to counters and set gauges in one locked read-modify-write.
+    counters: dict name -> amount to add
+    gauges:   dict name -> current value
+    """
+    try:
+        with open(f"{path}.lock", 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            data = load_metrics(path)
+            for name, amount in (counters or {}).items():
+                data['counters'][name] = data['counters'].get(name, 0) + amount
+            for name, value in (gauges or {}).items():
+                data['gauges'][name] = value
+            data['updated_at'] = datetime.utcnow().isoformat(timespec='seconds')
+
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, path)
+    except OSError as e:
+        # Metrics must never break the operation being measured
+        print(f"Warning: Could not record metrics in {path}: {e}")
+
+
+def show_metrics(path=METRICS_FILE):
+    """Print all metrics"""
+    data = load_metrics(path)
+    print(f"Metrics ({path}, updated {data['updated_at'] or 'never'})")
+    print("-" * 60)
+    for section in ('counters', 'gauges'):
+        for name, value in sorted(data[section].items()):
+            if isinstance(value, float):
+                value = f"{value:.3f}"
+            print(f"  {name:44s} {value}")
+
+
+if __name__ == '__main__':
+    show_metrics(sys.argv[1] if len(sys.argv) > 1 else METRICS_FILE)
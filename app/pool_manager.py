@@ -4,65 +4,60 @@ Container Pool Management System
 Pre-creates and manages a pool of containers that can be assigned to users
 """
 
-from app import app, db, Container, User
+from app import create_app, db, Container, User, ContainerEvent, WarmContainer, renew_leases, lifecycle_summary
+from catalog import get_catalog, set_image
+from lazy_docker import LazyDockerClient
+from docker_scheduler import scheduler
+from leases import get_lease_settings
+from metrics import load_metrics, show_metrics
+from rebalancer import rebalance_pool
+from resource_profiles import get_host_capacity, calculate_density, format_size
+from resource_sampler import load_snapshot, snapshot_age, summarize_usage
+from streaming import iter_containers
+from warm_cache import get_warm_settings, hit_rate
+import argparse
 import docker
+import logging
 import sys
+import time
+from datetime import datetime
 
-client = docker.from_env()
+app = create_app(background=False)
 
-# Container pool configuration
-POOL_CONFIG = {
-    'nginx': {'count': 5, 'image': 'nginx:alpine', 'port': 80},
-    'apache': {'count': 3, 'image': 'httpd:alpine', 'port': 80},
-    'python': {'count': 3, 'image': 'python:3.11-alpine', 'port': 8000},
-    'node': {'count': 2, 'image': 'node:18-alpine', 'port': 3000},
-    'ubuntu-ssh': {'count': 2, 'image': 'ubuntu-ssh:latest', 'port': 22},
-}
+# Connected on first use, so commands that only read the database work without Docker
+client = LazyDockerClient()
+
+# Pool initialization and upgrades are replenishment work (docker_scheduler.py)
+scheduler.default = 'replenishment'
 
 def create_pool_container(image_type, pool_index):
     """Create a single container for the pool"""
-    config = POOL_CONFIG[image_type]
-    
-    # Generate unique port based on image type and index
-    # nginx: 8000-8004, apache: 8100-8102, python: 8200-8202, node: 8300-8301, ubuntu-ssh: 2200-2201
-    type_base_ports = {
-        'nginx': 8000,
-        'apache': 8100,
-        'python': 8200,
-        'node': 8300,
-        'ubuntu-ssh': 2200
-    }
-    base_port = type_base_ports.get(image_type, 8000) + pool_index
+    catalog = get_catalog()
+    
+    # Ports come from the image type's catalog range, e.g. nginx 8000+, ubuntu-ssh 2200+
+    base_port = catalog.base_port(image_type) + pool_index
     
     # Container configuration
-    container_config = {
-        'image': config['image'],
-        'detach': True,
-        'ports': {f"{config['port']}/tcp": base_port},
-        'name': f'pool_{image_type}_{pool_index}_{base_port}',
-        'labels': {
+    container_config = catalog.build_container_config(
+        image_type,
+        name=f'pool_{image_type}_{pool_index}_{base_port}',
+        host_port=base_port,
+        labels={
             'pool': 'true',
             'type': image_type,
             'status': 'available',
             'pool_index': str(pool_index)
         }
-    }
-    
-    # Add commands for containers that need them
-    if image_type == 'node':
-        container_config['command'] = 'sh -c "while true; do sleep 3600; done"'
-        container_config['working_dir'] = '/app'
-    elif image_type == 'python':
-        container_config['command'] = 'python -m http.server 8000'
-        container_config['working_dir'] = '/app'
+    )
+    image = container_config['image']
     
     try:
         # Pull image if needed
         try:
-            client.images.get(config['image'])
+            client.images.get(image)
         except:
-            print(f"  Pulling {config['image']}...")
-            client.images.pull(config['image'])
+            print(f"  Pulling {image}...")
+            client.images.pull(image)
         
         # Create container
         container = client.containers.run(**container_config)
@@ -93,9 +88,9 @@ def initialize_pool():
     
     # Create new pool
     total_created = 0
-    for image_type, config in POOL_CONFIG.items():
-        print(f"Creating {config['count']} {image_type} containers...")
-        for i in range(config['count']):
+    for image_type, count in get_catalog().pool_sizes().items():
+        print(f"Creating {count} {image_type} containers...")
+        for i in range(count):
             container_id, port = create_pool_container(image_type, i)
             if container_id:
                 total_created += 1
@@ -112,50 +107,423 @@ def show_pool_status():
     print("╚════════════════════════════════════════════════════════════════╝")
     print()
     
-    pool_containers = client.containers.list(all=True, filters={'label': 'pool=true'})
-    
-    if not pool_containers:
-        print("[ERROR] No pool containers found. Run with --init to create pool.")
-        return
-    
-    # Group by type and status
+    # Count by type and status; the detailed list below streams a second listing
     stats = {}
-    for container in pool_containers:
-        image_type = container.labels.get('type', 'unknown')
-        label_status = container.labels.get('status', 'available')
-        docker_status = container.status
+    for container in iter_containers(client, filters={'label': ['pool=true']}):
+        image_type = container['labels'].get('type', 'unknown')
+        label_status = container['labels'].get('status', 'available')
+        docker_status = container['state']
         
         if image_type not in stats:
-            stats[image_type] = {'available': 0, 'assigned': 0, 'stopped': 0}
+            stats[image_type] = {'available': 0, 'assigned': 0, 'warm': 0, 'stopped': 0}
         
-        if docker_status != 'running':
+        if docker_status == 'paused':
+            stats[image_type]['warm'] += 1
+        elif docker_status != 'running':
             stats[image_type]['stopped'] += 1
         elif label_status == 'assigned':
             stats[image_type]['assigned'] += 1
         else:
             stats[image_type]['available'] += 1
     
-    print("Type      | Available | Assigned | Stopped | Total")
-    print("----------|-----------|----------|---------|-------")
+    if not stats:
+        print("[ERROR] No pool containers found. Run with --init to create pool.")
+        return
+    
+    print("Type      | Available | Assigned | Warm | Stopped | Total")
+    print("----------|-----------|----------|------|---------|-------")
     for image_type in sorted(stats.keys()):
         s = stats[image_type]
-        total = s['available'] + s['assigned'] + s['stopped']
-        print(f"{image_type:9s} | {s['available']:9d} | {s['assigned']:8d} | {s['stopped']:7d} | {total:5d}")
+        total = s['available'] + s['assigned'] + s['warm'] + s['stopped']
+        print(f"{image_type:9s} | {s['available']:9d} | {s['assigned']:8d} | {s['warm']:4d} | {s['stopped']:7d} | {total:5d}")
     
     print()
+    show_usage_totals()
+    
     
-    # Show detailed list
+    # Show detailed list, one paged listing per type, newest first
     print("Detailed List:")
     print("-" * 80)
-    for container in sorted(pool_containers, key=lambda c: c.name):
-        status_icon = "[OK]" if container.status == 'running' else "[FAILED]"
-        label_status = container.labels.get('status', 'available')
-        ports = container.ports
-        port_str = ""
-        for port, bindings in ports.items():
-            if bindings:
-                port_str = f":{bindings[0]['HostPort']}"
-        print(f"{status_icon} {container.name:30s} | {label_status:10s} | {container.status:10s} | http://192.168.121.183{port_str}")
+    for image_type in sorted(stats):
+        type_filter = ['pool=true'] if image_type == 'unknown' else ['pool=true', f'type={image_type}']
+        for container in iter_containers(client, filters={'label': type_filter}):
+            if image_type == 'unknown' and 'type' in container['labels']:
+                continue
+            label_status = container['labels'].get('status', 'available')
+            docker_status = container['state']
+            port_str = f":{container['host_ports'][0]}" if container['host_ports'] else ""
+            status_icon = {'running': "[OK]", 'paused': "[WARM]"}.get(docker_status, "[FAILED]")
+            print(f"{status_icon} {container['name']:30s} | {label_status:10s} | {docker_status:10s} | "
+                  f"http://192.168.121.183{port_str}")
+
+def show_usage_totals():
+    """Show current CPU, memory and network use per type, from the web app's resource sampler"""
+    snapshot = load_snapshot()
+    age = snapshot_age(snapshot)
+    if snapshot is None:
+        print("[WARNING] No resource samples yet (the web app samples containers while it runs)")
+        print()
+        return
+    totals = summarize_usage(snapshot)
+    print(f"Resource Usage (sampled {age:.0f}s ago):")
+    print("Type      | Sampled | CPU (cores) | Memory     | Net In/s   | Net Out/s")
+    print("----------|---------|-------------|------------|------------|-----------")
+    for image_type in sorted(totals):
+        t = totals[image_type]
+        print(f"{image_type:9s} | {t['containers']:7d} | {t['cpu'] / 100:11.2f} | {format_size(t['memory']):>10s} | "
+              f"{format_size(t['rx']):>10s} | {format_size(t['tx']):>9s}")
+    if totals:
+        print(f"{'total':9s} | {sum(t['containers'] for t in totals.values()):7d} | "
+              f"{sum(t['cpu'] for t in totals.values()) / 100:11.2f} | "
+              f"{format_size(sum(t['memory'] for t in totals.values())):>10s} | "
+              f"{format_size(sum(t['rx'] for t in totals.values())):>10s} | "
+              f"{format_size(sum(t['tx'] for t in totals.values())):>9s}")
+    if age > 3 * snapshot.get('interval', 10):
+        print("[WARNING] Samples are stale - is the web app running?")
+    print()
+
+def show_density():
+    """Show how many containers of each type this host can hold under the resource profiles"""
+    print("╔════════════════════════════════════════════════════════════════╗")
+    print("║         Container Density                                      ║")
+    print("╚════════════════════════════════════════════════════════════════╝")
+    print()
+    
+    catalog = get_catalog()
+    memory_bytes, cpus = get_host_capacity(client)
+    profiles = {image_type: catalog.resource_profile(image_type) for image_type in catalog.pool_types()}
+    density = calculate_density(memory_bytes, cpus, profiles, catalog.host, catalog.pool_sizes())
+    
+    print(f"Host: {format_size(memory_bytes)} memory, {cpus} CPUs")
+    print(f"Usable after host reserve: {format_size(density['usable_memory'])} memory, {density['usable_cpus']:.1f} CPUs")
+    print()
+    print("Type       | Memory | CPUs | PIDs | By Mem | By CPU | Capacity | Limit")
+    print("-----------|--------|------|------|--------|--------|----------|-------")
+    for image_type, d in density['per_type'].items():
+        profile = profiles[image_type]
+        print(f"{image_type:10s} | {profile['mem_limit']:>6s} | {profile['cpus']:4.2f} | {profile['pids_limit']:4d} | "
+              f"{d['by_memory']:6d} | {d['by_cpu']:6d} | {d['capacity']:8d} | {d['limited_by']}")
+    print()
+    print(f"Configured pool needs {format_size(density['pool_memory'])} memory and {density['pool_cpus']:.2f} CPUs")
+    if density['pool_fits'] >= 1:
+        print(f"[OK] Configured pool fits {density['pool_fits']:.1f}x on this host")
+    else:
+        print(f"[WARNING] Configured pool only fits {density['pool_fits']:.2f}x - reduce pool sizes or profiles")
+
+def get_host_port(container):
+    """Get the host port a container is published on, or None"""
+    for port, bindings in container.ports.items():
+        if bindings:
+            return int(bindings[0]['HostPort'])
+    return None
+
+def wait_until_running(container, timeout=30):
+    """Wait for a freshly created container to reach the running state"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        container.reload()
+        if container.status == 'running':
+            return True
+        if container.status in ('exited', 'dead'):
+            return False
+        time.sleep(0.5)
+    return False
+
+def count_available(image_type):
+    """Count running available pool containers of a type, whatever image they run"""
+    return len(client.containers.list(filters={
+        'label': ['pool=true', f'type={image_type}', 'status=available'],
+        'status': 'running'
+    }))
+
+def container_image(container):
+    """Image reference a container was created from"""
+    return container.attrs.get('Config', {}).get('Image', '')
+
+def recreate_with_image(container, image_type, image):
+    """
+    Recreate a pool container with a new image, keeping its name, host port, labels and mounts.
+    The old container is only stopped and renamed until the new one runs; if the new one
+    cannot be created or does not come up, the old one is put back and started again.
+    Returns: the new container, or None if it did not come up
+    """
+    name = container.name
+    host_port = get_host_port(container)
+    labels = dict(container.labels)
+    binds = container.attrs.get('HostConfig', {}).get('Binds') or []
+    
+    container_config = get_catalog().build_container_config(
+        image_type,
+        name=name,
+        host_port=host_port,
+        labels=labels,
+        image=image
+    )
+    if binds:
+        container_config['volumes'] = binds
+    
+    # The host port is only free once the old container stops
+    container.stop(timeout=10)
+    container.rename(f"{name}_replaced")
+    new_container = None
+    try:
+        new_container = client.containers.run(**container_config)
+        if wait_until_running(new_container):
+            container.remove()
+            return new_container
+        print(f"  [FAILED] {name} did not start with {image}, keeping the old container")
+    except Exception as e:
+        print(f"  [FAILED] {name} could not be created with {image}, keeping the old container: {e}")
+    
+    if new_container is not None:
+        new_container.remove(force=True)
+    container.rename(name)
+    container.start()
+    return None
+
+def in_maintenance_window(window, now=None):
+    """Check whether the current time falls within an 'HH:MM-HH:MM' window (may wrap midnight)"""
+    now = (now or datetime.now()).strftime('%H:%M')
+    start, end = window.split('-')
+    if start <= end:
+        return start <= now < end
+    return now >= start or now < end
+
+def rolling_upgrade(image_type, new_image, batch_size=1, min_available=1, migrate_assigned=False,
+                    window=None, wait_timeout=300):
+    """
+    Replace the pool containers of a type with a new image in batches without ever
+    dropping below min_available free containers. Assigned containers are only
+    migrated when asked to, and only inside the maintenance window if one is given.
+    """
+    print("╔════════════════════════════════════════════════════════════════╗")
+    print("║         Rolling Pool Upgrade                                   ║")
+    print("╚════════════════════════════════════════════════════════════════╝")
+    print()
+    
+    catalog = get_catalog()
+    if image_type not in catalog.pool_types():
+        print(f"[ERROR] {image_type} is not a pooled image type")
+        return False
+    
+    upgrade_start = time.monotonic()
+    
+    # Pull first so no container is touched if the image is unavailable
+    print(f"Pulling {new_image}...")
+    pull_start = time.monotonic()
+    try:
+        client.images.pull(new_image)
+    except Exception as e:
+        print(f"[FAILED] Could not pull {new_image}: {e}")
+        return False
+    print(f"  [OK] Pulled in {time.monotonic() - pull_start:.1f}s")
+    
+    # New pool containers and releases now use the new image
+    set_image(image_type, new_image)
+    print(f"  [OK] Catalog now points {image_type} at {new_image}")
+    print()
+    
+    outdated = [c for c in client.containers.list(filters={
+        'label': ['pool=true', f'type={image_type}', 'status=available'],
+        'status': 'running'
+    }) if container_image(c) != new_image]
+    
+    total = len(outdated)
+    upgraded = 0
+    failed = 0
+    batch_number = 0
+    print(f"Upgrading {total} available {image_type} containers "
+          f"(batch size {batch_size}, keeping at least {min_available} available)")
+    
+    while outdated:
+        # Never take more containers out of service than the pool can spare
+        waited = 0
+        while True:
+            spare = count_available(image_type) - min_available
+            if spare > 0:
+                break
+            if waited >= wait_timeout:
+                print(f"[FAILED] Pool stayed at or below {min_available} available for {wait_timeout}s, stopping")
+                return False
+            time.sleep(5)
+            waited += 5
+        
+        batch = outdated[:min(batch_size, spare)]
+        outdated = outdated[len(batch):]
+        batch_number += 1
+        batch_start = time.monotonic()
+        
+        for container in batch:
+            try:
+                # Skip containers assigned to a user since they were listed
+                container.reload()
+                if container.labels.get('status') != 'available':
+                    print(f"  [SKIP] {container.name} was assigned during the upgrade")
+                    continue
+                if recreate_with_image(container, image_type, new_image):
+                    upgraded += 1
+                else:
+                    failed += 1
+            except docker.errors.NotFound:
+                print(f"  [SKIP] {container.name} no longer exists")
+            except Exception as e:
+                print(f"  [FAILED] {container.name}: {e}")
+                failed += 1
+        
+        print(f"  [Batch {batch_number}] {len(batch)} containers in {time.monotonic() - batch_start:.1f}s | "
+              f"progress {upgraded + failed}/{total} | available {count_available(image_type)}")
+    
+    if migrate_assigned:
+        if window and not in_maintenance_window(window):
+            print()
+            print(f"[INFO] Outside maintenance window {window}, assigned containers not migrated")
+        else:
+            print()
+            migrate_assigned_containers(image_type, new_image, batch_size)
+    
+    print()
+    print(f"[OK] Upgrade finished in {time.monotonic() - upgrade_start:.1f}s: "
+          f"{upgraded} upgraded, {failed} failed")
+    return failed == 0
+
+def migrate_assigned_containers(image_type, new_image, batch_size=1):
+    """
+    Move assigned containers of a type to a new image, keeping their port and mounted files.
+    Warm (paused) containers are left alone: a reclaim gives one back as it was, and an
+    eviction recycles its slot onto the new image.
+    """
+    with app.app_context():
+        warm_ids = {row[0] for row in db.session.query(WarmContainer.container_id)}
+    assigned = [c for c in client.containers.list(all=True, filters={
+        'label': ['pool=true', f'type={image_type}', 'status=assigned']
+    }) if container_image(c) != new_image and c.status != 'paused' and c.id not in warm_ids]
+    
+    print(f"Migrating {len(assigned)} assigned {image_type} containers...")
+    migrated = 0
+    with app.app_context():
+        for i in range(0, len(assigned), batch_size):
+            batch = assigned[i:i + batch_size]
+            batch_start = time.monotonic()
+            for container in batch:
+                old_id = container.id
+                try:
+                    new_container = recreate_with_image(container, image_type, new_image)
+                except Exception as e:
+                    print(f"  [FAILED] {container.name}: {e}")
+                    continue
+                if not new_container:
+                    continue
+                
+                db_container = Container.query.filter_by(container_id=old_id).first()
+                if db_container:
+                    db_container.container_id = new_container.id
+                    db_container.image_name = new_image
+                    db.session.commit()
+                migrated += 1
+            print(f"  [Batch {i // batch_size + 1}] {len(batch)} containers in {time.monotonic() - batch_start:.1f}s | "
+                  f"progress {min(i + batch_size, len(assigned))}/{len(assigned)}")
+    
+    print(f"[OK] Migrated {migrated} assigned containers")
+    return migrated
+
+def parse_upgrade_args(args):
+    """Parse the options of --upgrade"""
+    parser = argparse.ArgumentParser(prog='pool_manager.py --upgrade')
+    parser.add_argument('image_type')
+    parser.add_argument('image')
+    parser.add_argument('--batch-size', type=int, default=1)
+    parser.add_argument('--min-available', type=int, default=1)
+    parser.add_argument('--migrate-assigned', action='store_true')
+    parser.add_argument('--window', help="maintenance window for assigned containers, e.g. 02:00-04:00")
+    return parser.parse_args(args)
+
+def set_user_plan(username, plan):
+    """Move a user to another lease plan and restart their leases on it"""
+    settings = get_lease_settings(get_catalog())
+    if plan not in settings['plans']:
+        print(f"[ERROR] Unknown plan: {plan} (plans: {', '.join(settings['plans'])})")
+        return False
+    
+    with app.app_context():
+        user = User.query.filter_by(username=username).first()
+        if not user:
+            print(f"[ERROR] User not found: {username}")
+            return False
+        user.plan = plan
+        renew_leases(user)
+        db.session.commit()
+        print(f"[OK] {username} is now on the {plan} plan ({len(user.containers)} leases renewed)")
+        return True
+
+
+def format_ms(value):
+    """Milliseconds as a short duration, '-' when missing"""
+    if value is None:
+        return '-'
+    return f"{value / 1000:.1f}s" if value >= 1000 else f"{value:.0f}ms"
+
+
+def show_lifecycle(hours=24):
+    """Print launch-to-ready and phase latency percentiles per image type"""
+    with app.app_context():
+        summary = lifecycle_summary(hours)
+    
+    print("╔════════════════════════════════════════════════════════════════╗")
+    print(f"║         Container Lifecycle (last {hours}h)".ljust(65) + "║")
+    print("╚════════════════════════════════════════════════════════════════╝")
+    print()
+    if not summary:
+        print("No lifecycle events recorded")
+        return
+    
+    print(f"{'Type':12s} | {'Ready':>6s} | {'Failed':>6s} | {'Ready p50':>9s} | {'Ready p95':>9s}")
+    print("-" * 56)
+    for image_type, row in summary.items():
+        print(f"{image_type:12s} | {row['ready']:6d} | {row['failed']:6d} | "
+              f"{format_ms(row['ready_p50']):>9s} | {format_ms(row['ready_p95']):>9s}")
+    
+    print()
+    print("Phase durations (p50 / p95):")
+    for image_type, row in summary.items():
+        phases = ', '.join(f"{event} {format_ms(p50)} / {format_ms(p95)}" for event, (p50, p95) in row['phases'].items())
+        print(f"  {image_type:12s} {phases}")
+
+
+def show_history(container_id):
+    """Print every lifecycle event of one container"""
+    with app.app_context():
+        events = ContainerEvent.query.filter_by(container_id=container_id).order_by(ContainerEvent.at).all()
+    if not events:
+        print(f"No lifecycle events for container {container_id}")
+        return
+    for event in events:
+        print(f"{event.at.strftime('%Y-%m-%d %H:%M:%S')} | {event.event:13s} | {format_ms(event.phase_ms):>7s} | "
+              f"{event.detail or ''}")
+
+
+def show_warm():
+    """Print the warm containers, their age and the cache hit rate and evictions"""
+    settings = get_warm_settings(get_catalog())
+    now = datetime.utcnow()
+    with app.app_context():
+        entries = WarmContainer.query.order_by(WarmContainer.released_at.desc()).all()
+        print(f"Warm containers ({len(entries)} of {settings['max_containers']}, "
+              f"kept {settings['window_minutes']} minutes):")
+        print("ID     | User             | Type       | Port  | Stopped")
+        print("-------|------------------|------------|-------|--------")
+        for entry in entries:
+            minutes = (now - entry.released_at).total_seconds() / 60
+            print(f"{entry.id:6d} | {entry.owner.username:16s} | {entry.image_type:10s} | {entry.host_port:5d} | "
+                  f"{minutes:4.0f}m ago")
+    
+    counters = load_metrics()['counters']
+    print()
+    print(f"Relaunches served warm: {counters.get('warm.hits', 0)} of "
+          f"{counters.get('warm.hits', 0) + counters.get('warm.misses', 0)} launches ({hit_rate(counters):.0%})")
+    evictions = ', '.join(f"{reason} {counters.get(f'warm.evicted.{reason}', 0)}"
+                          for reason in ('expired', 'capacity', 'pressure', 'failed'))
+    print(f"Evicted: {counters.get('warm.evicted', 0)} ({evictions})")
+
 
 def assign_container(image_type, user_id, container_name):
     """Assign a container from the pool to a user"""
@@ -198,7 +566,7 @@ def assign_container(image_type, user_id, container_name):
     return {
         'container_id': container.id,
         'host_port': host_port,
-        'container_port': POOL_CONFIG[image_type]['port'],
+        'container_port': get_catalog().images[image_type]['port'],
         'docker_name': container.name
     }
 
@@ -208,6 +576,33 @@ if __name__ == '__main__':
             initialize_pool()
         elif sys.argv[1] == '--status':
             show_pool_status()
+        elif sys.argv[1] == '--density':
+            show_density()
+        elif sys.argv[1] == '--upgrade':
+            options = parse_upgrade_args(sys.argv[2:])
+            success = rolling_upgrade(
+                options.image_type,
+                options.image,
+                batch_size=options.batch_size,
+                min_available=options.min_available,
+                migrate_assigned=options.migrate_assigned,
+                window=options.window
+            )
+            sys.exit(0 if success else 1)
+        elif sys.argv[1] == '--rebalance':
+            logging.basicConfig(level=logging.INFO, format='%(message)s')
+            moved = rebalance_pool(client, dry_run='--dry-run' in sys.argv[2:])
+            print(f"[OK] Moved {moved} pool slots")
+        elif sys.argv[1] == '--set-plan' and len(sys.argv) > 3:
+            sys.exit(0 if set_user_plan(sys.argv[2], sys.argv[3]) else 1)
+        elif sys.argv[1] == '--metrics':
+            show_metrics()
+        elif sys.argv[1] == '--lifecycle':
+            show_lifecycle(int(sys.argv[2]) if len(sys.argv) > 2 else 24)
+        elif sys.argv[1] == '--history' and len(sys.argv) > 2:
+            show_history(int(sys.argv[2]))
+        elif sys.argv[1] == '--warm':
+            show_warm()
         elif sys.argv[1] == '--cleanup':
             print("Cleaning up pool containers...")
             containers = client.containers.list(all=True, filters={'label': 'pool=true'})
@@ -223,6 +618,18 @@ if __name__ == '__main__':
             print("Usage:")
             print("  python pool_manager.py --init      # Initialize container pool")
             print("  python pool_manager.py --status    # Show pool status")
+            print("  python pool_manager.py --density   # Show host capacity per container type")
+            print("  python pool_manager.py --upgrade TYPE IMAGE [--batch-size N] [--min-available N]")
+            print("                         [--migrate-assigned] [--window HH:MM-HH:MM]")
+            print("                                     # Roll the pool of TYPE onto a new image")
+            print("  python pool_manager.py --set-plan USER PLAN")
+            print("                                     # Change a user's lease plan")
+            print("  python pool_manager.py --metrics   # Show platform metrics")
+            print("  python pool_manager.py --lifecycle [HOURS]")
+            print("                                     # Launch-to-ready latency per type (default 24h)")
+            print("  python pool_manager.py --history ID")
+            print("                                     # Lifecycle events of one container")
+            print("  python pool_manager.py --warm      # Warm containers, hit rate and evictions")
             print("  python pool_manager.py --cleanup   # Remove all pool containers")
     else:
         with app.app_context():
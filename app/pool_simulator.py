@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Pool Sizing Simulator
+Replays a recorded demand trace (demand_trace.py) against candidate pool sizes,
+recycle latencies and scaling policies, and predicts the empty-pool rate and launch
+wait times of each combination. Runs offline: it needs only the trace and the catalog.
+
+    python pool_simulator.py --trace demand_trace.log
+    python pool_simulator.py --sizes nginx=3-8 python=2,4 --recycle 2,10 --policy static,on-demand,autoscale
+
+Model, per image type:
+- launches and pool-consuming recoveries from the trace arrive at their recorded times
+- each assignment is held for a duration drawn from the trace's release events
+- a released pool container is available again after the recycle latency
+- a launch that finds the pool empty waits in FIFO order for the next free container
+
+Policies:
+- static:     fixed pool size
+- on-demand:  what container_monitor.py does today: every monitor interval, queued
+              launches get new containers outside the pool, capped by the "queue"
+              settings; they are removed on release
+- autoscale:  every monitor interval, grow the pool to keep --min-free containers free,
+              up to --max-size times the base size; idle extra containers are removed
+
+The on-demand cap is shared by all types in production but applied per type here, so
+the on-demand results are slightly optimistic when several types run dry at once.
+"""
+
+import argparse
+import heapq
+import random
+import statistics
+import sys
+from collections import deque
+
+from catalog import get_catalog
+from demand_trace import TRACE_FILE, read_trace
+from launch_queue import get_queue_settings
+
+POLICIES = ('static', 'on-demand', 'autoscale')
+
+# Used when the trace has no release events to learn from
+DEFAULT_HOLD_SECONDS = 1800
+DEFAULT_RECYCLE_SECONDS = 2.0
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers, 0 when empty"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def load_demand(path):
+    """
+    Split a trace into per-type arrivals, hold times and release latencies.
+    Returns: dict type -> {'arrivals': [times], 'holds': [seconds], 'recycles': [seconds],
+                           'empty': count of arrivals that found the pool empty}
+    """
+    demand = {}
+    for event in read_trace(path):
+        entry = demand.setdefault(event.image_type, {'arrivals': [], 'holds': [], 'recycles': [], 'empty': 0})
+        if event.event in ('launch', 'recover'):
+            entry['arrivals'].append(event.time)
+            entry['empty'] += event.pool_empty
+        elif event.event == 'release':
+            if event.held is not None:
+                entry['holds'].append(event.held)
+            if event.latency is not None:
+                entry['recycles'].append(event.latency)
+    for entry in demand.values():
+        entry['arrivals'].sort()
+    return demand
+
+
+def simulate(arrivals, holds, size, recycle, policy, settings, seed=0):
+    """
+    Run one type's arrivals through one pool configuration.
+    settings: interval, provision, max_on_demand, max_on_demand_per_cycle, min_free, max_size
+    Returns: dict with launches, empty_rate, mean_wait, p95_wait, max_wait, peak (containers)
+    """
+    rng = random.Random(seed)
+    events = []
+    sequence = 0
+
+    def schedule(time, kind, data=None):
+        nonlocal sequence
+        heapq.heappush(events, (time, sequence, kind, data))
+        sequence += 1
+
+    def hold():
+        return rng.choice(holds) if holds else DEFAULT_HOLD_SECONDS
+
+    for time in arrivals:
+        schedule(time, 'arrive', time)
+    if policy != 'static' and arrivals:
+        # Monitor cycles from the first to the last arrival; later ones change nothing
+        cycle = arrivals[0]
+        while cycle <= arrivals[-1] + settings['interval']:
+            schedule(cycle, 'cycle')
+            cycle += settings['interval']
+
+    free = total = size
+    on_demand = pending = 0
+    queue = deque()
+    waits = []
+    empty = 0
+    peak = size
+
+    def assign(now, arrived, pooled):
+        waits.append(now - arrived)
+        if pooled:
+            schedule(now + hold() + recycle, 'recycled')
+        else:
+            schedule(now + hold(), 'on-demand-released')
+
+    while events:
+        now, _, kind, data = heapq.heappop(events)
+        if kind == 'arrive':
+            if free:
+                free -= 1
+                assign(now, data, pooled=True)
+            else:
+                empty += 1
+                queue.append(data)
+
+        elif kind == 'recycled':
+            if policy == 'autoscale' and total > size and free >= settings['min_free'] and not queue:
+                # Extra container no longer needed
+                total -= 1
+            elif queue:
+                assign(now, queue.popleft(), pooled=True)
+            else:
+                free += 1
+
+        elif kind == 'cycle' and policy == 'on-demand':
+            budget = min(settings['max_on_demand'] - on_demand - pending, settings['max_on_demand_per_cycle'])
+            while queue and budget > 0:
+                # The monitor claims the request, then creates its container
+                schedule(now + settings['provision'], 'on-demand-ready', queue.popleft())
+                pending += 1
+                budget -= 1
+
+        elif kind == 'cycle' and policy == 'autoscale':
+            wanted = settings['min_free'] + len(queue) - free - pending
+            room = settings['max_size'] - total - pending
+            for _ in range(max(0, min(wanted, room))):
+                schedule(now + settings['provision'], 'pool-ready')
+                pending += 1
+
+        elif kind == 'on-demand-ready':
+            pending -= 1
+            on_demand += 1
+            assign(now, data, pooled=False)
+
+        elif kind == 'on-demand-released':
+            on_demand -= 1
+
+        elif kind == 'pool-ready':
+            pending -= 1
+            total += 1
+            if queue:
+                assign(now, queue.popleft(), pooled=True)
+            else:
+                free += 1
+
+        peak = max(peak, total + on_demand)
+
+    launches = len(arrivals)
+    return {
+        'launches': launches,
+        'empty_rate': empty / launches if launches else 0.0,
+        'mean_wait': statistics.fmean(waits) if waits else 0.0,
+        'p95_wait': percentile(waits, 0.95),
+        'max_wait': max(waits) if waits else 0.0,
+        'unserved': len(queue),
+        'peak': peak,
+    }
+
+
+def parse_range(text):
+    """'3,5,8' or '2-10' (or a mix) as a sorted list of ints"""
+    values = set()
+    for part in text.split(','):
+        if '-' in part:
+            start, end = part.split('-', 1)
+            values.update(range(int(start), int(end) + 1))
+        elif part:
+            values.add(int(part))
+    return sorted(values)
+
+
+def parse_sizes(specs, catalog):
+    """
+    TYPE=RANGE arguments as candidate sizes per type; types without one are tried at
+    their current catalog size.
+    Returns: dict type -> list of sizes
+    """
+    sizes = {image_type: [size] for image_type, size in catalog.pool_sizes().items()}
+    for spec in specs:
+        image_type, _, values = spec.partition('=')
+        if image_type not in sizes or not values:
+            raise ValueError(f"Expected TYPE=SIZES with a pooled type ({', '.join(sizes)}): {spec}")
+        sizes[image_type] = parse_range(values)
+    return sizes
+
+
+def describe_trace(demand):
+    """Print what the trace contains per type"""
+    print("╔════════════════════════════════════════════════════════════════╗")
+    print("║         Recorded Demand                                       ║")
+    print("╚════════════════════════════════════════════════════════════════╝")
+    print()
+    print(f"{'Type':12s} {'Launches':>9s} {'Span':>8s} {'Empty':>7s} {'Median hold':>12s} {'Median recycle':>15s}")
+    print("-" * 68)
+    for image_type, entry in sorted(demand.items()):
+        arrivals = entry['arrivals']
+        span = (arrivals[-1] - arrivals[0]) / 3600 if len(arrivals) > 1 else 0
+        empty = entry['empty'] / len(arrivals) if arrivals else 0
+        hold = f"{statistics.median(entry['holds']) / 60:.0f}m" if entry['holds'] else '-'
+        recycle = f"{statistics.median(entry['recycles']):.1f}s" if entry['recycles'] else '-'
+        print(f"{image_type:12s} {len(arrivals):9d} {span:7.1f}h {empty:6.1%} {hold:>12s} {recycle:>15s}")
+    print()
+
+
+def main(args):
+    catalog = get_catalog()
+    queue_settings = get_queue_settings(catalog)
+
+    parser = argparse.ArgumentParser(description='Predict pool behaviour from a recorded demand trace')
+    parser.add_argument('--trace', default=TRACE_FILE, help='Demand trace to replay')
+    parser.add_argument('--sizes', nargs='*', default=[], metavar='TYPE=SIZES',
+                        help='Candidate pool sizes, e.g. nginx=3-8 python=2,4 (default: catalog sizes)')
+    parser.add_argument('--recycle', default=None,
+                        help='Candidate recycle latencies in seconds, e.g. 2,10 (default: median from the trace)')
+    parser.add_argument('--policy', default='static', help=f"Comma-separated policies: {', '.join(POLICIES)}")
+    parser.add_argument('--interval', type=float, default=catalog.monitor.get('interval_seconds', 30),
+                        help='Seconds between monitor runs')
+    parser.add_argument('--provision', type=float, default=5.0, help='Seconds to create a new container')
+    parser.add_argument('--min-free', type=int, default=1, help='Free containers autoscale keeps ready')
+    parser.add_argument('--max-size', type=float, default=2.0, help='Autoscale limit as a multiple of the base size')
+    parser.add_argument('--target-empty', type=float, default=0.01,
+                        help='Empty-pool rate a recommended size must stay under')
+    parser.add_argument('--seed', type=int, default=0)
+    options = parser.parse_args(args)
+
+    policies = options.policy.split(',')
+    for policy in policies:
+        if policy not in POLICIES:
+            print(f"[ERROR] Unknown policy: {policy} (policies: {', '.join(POLICIES)})")
+            return False
+    try:
+        sizes = parse_sizes(options.sizes, catalog)
+        recycles = [float(value) for value in options.recycle.split(',')] if options.recycle else None
+    except ValueError as e:
+        print(f"[ERROR] {e}")
+        return False
+
+    try:
+        demand = load_demand(options.trace)
+    except OSError as e:
+        print(f"[ERROR] Could not read trace: {e}")
+        return False
+    if not any(entry['arrivals'] for entry in demand.values()):
+        print(f"[ERROR] No launches in {options.trace}")
+        return False
+    describe_trace(demand)
+
+    print(f"{'Type':12s} {'Policy':10s} {'Size':>4s} {'Recycle':>8s} {'Empty':>7s} "
+          f"{'Mean wait':>10s} {'P95 wait':>9s} {'Max wait':>9s} {'Peak':>5s}")
+    print("-" * 82)
+    recommendations = []
+    for image_type, entry in sorted(demand.items()):
+        if image_type not in sizes or not entry['arrivals']:
+            continue
+        observed = [statistics.median(entry['recycles'])] if entry['recycles'] else [DEFAULT_RECYCLE_SECONDS]
+        for policy in policies:
+            for recycle in recycles or observed:
+                best = None
+                for size in sizes[image_type]:
+                    settings = {
+                        'interval': options.interval,
+                        'provision': options.provision,
+                        'max_on_demand': queue_settings['max_on_demand'],
+                        'max_on_demand_per_cycle': queue_settings['max_on_demand_per_cycle'],
+                        'min_free': options.min_free,
+                        'max_size': max(size + 1, int(size * options.max_size)),
+                    }
+                    result = simulate(entry['arrivals'], entry['holds'], size, recycle, policy, settings,
+                                      seed=options.seed)
+                    if best is None and result['empty_rate'] <= options.target_empty:
+                        best = size
+                    print(f"{image_type:12s} {policy:10s} {size:4d} {recycle:7.1f}s {result['empty_rate']:6.1%} "
+                          f"{result['mean_wait']:9.1f}s {result['p95_wait']:8.1f}s {result['max_wait']:8.1f}s "
+                          f"{result['peak']:5d}")
+                recommendations.append((image_type, policy, recycle, best))
+        print()
+
+    print(f"Smallest size with an empty-pool rate under {options.target_empty:.1%}:")
+    for image_type, policy, recycle, best in recommendations:
+        answer = str(best) if best is not None else f"none of {sizes[image_type]}"
+        print(f"  {image_type:12s} {policy:10s} recycle {recycle:.1f}s: {answer}")
+    return True
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main(sys.argv[1:]) else 1)
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Cross-Type Pool Rebalancer
+Moves idle pool capacity from under-used image types to starved ones, based on the
+per-type utilization visible in pool container labels.
+"""
+
+import logging
+
+from catalog import get_catalog
+from streaming import iter_containers
+
+logger = logging.getLogger('PoolRebalancer')
+
+# Defaults for the "rebalance" section of pool_catalog.json
+# enabled:        run a pass on every monitor cycle
+# global_budget:  maximum number of pool containers across all types
+# starved_below:  a type is starved when its available fraction drops below this
+# idle_above:     a type may donate when its available fraction is above this
+# max_moves:      maximum number of slots moved per run
+REBALANCE_DEFAULTS = {
+    'enabled': True,
+    'global_budget': 20,
+    'starved_below': 0.2,
+    'idle_above': 0.5,
+    'max_moves': 2,
+}
+
+
+def get_rebalance_settings(catalog):
+    """Rebalance settings from the catalog, filled in with defaults"""
+    settings = dict(REBALANCE_DEFAULTS)
+    settings.update(catalog.rebalance)
+    return settings
+
+
+def collect_pool_state(client, catalog):
+    """
+    Group pool containers by type, from a paged listing.
+    Returns: dict type -> {'available': [container ids], 'assigned': count, 'used_indices': set, 'used_ports': set}
+    """
+    state = {image_type: {'available': [], 'assigned': 0, 'used_indices': set(), 'used_ports': set()}
+             for image_type in catalog.pool_types()}
+
+    for container in iter_containers(client, filters={'label': ['pool=true']}):
+        labels = container['labels']
+        image_type = labels.get('type')
+        if image_type not in state:
+            continue
+        entry = state[image_type]
+        if 'pool_index' in labels:
+            entry['used_indices'].add(int(labels['pool_index']))
+        entry['used_ports'].update(container['host_ports'])
+
+        if labels.get('status') == 'assigned':
+            entry['assigned'] += 1
+        elif container['state'] == 'running':
+            entry['available'].append(container['id'])
+
+    return state
+
+
+def pool_total(entry):
+    """Number of pool containers of a type counted against the budget"""
+    return len(entry['available']) + entry['assigned']
+
+
+def next_free_slot(catalog, image_type, entry):
+    """
+    Find the lowest pool index whose port is inside the type's range and unused.
+    Returns: tuple (pool_index, host_port) or (None, None) when the range is full
+    """
+    start_port, end_port = catalog.port_range(image_type)
+    for pool_index in range(end_port - start_port + 1):
+        host_port = start_port + pool_index
+        if pool_index not in entry['used_indices'] and host_port not in entry['used_ports']:
+            return pool_index, host_port
+    return None, None
+
+
+def describe(image_type, entry):
+    """Short utilization summary for log lines"""
+    total = pool_total(entry)
+    return f"{image_type} {len(entry['available'])}/{total} available"
+
+
+def plan_moves(catalog, state, settings):
+    """
+    Decide which slots to move without touching Docker.
+    Returns: list of (donor_type or None, target_type, reason)
+    """
+    moves = []
+    budget_used = sum(pool_total(entry) for entry in state.values())
+    # Work on counts so several moves in one run see each other's effect
+    available = {t: len(e['available']) for t, e in state.items()}
+    totals = {t: pool_total(e) for t, e in state.items()}
+    free_ports = {}
+    for t in state:
+        start_port, end_port = catalog.port_range(t)
+        free_ports[t] = (end_port - start_port + 1) - len(state[t]['used_ports'])
+
+    def fraction(t):
+        return available[t] / totals[t] if totals[t] else 0.0
+
+    for _ in range(settings['max_moves']):
+        starved = [t for t in state
+                   if (available[t] == 0 or fraction(t) < settings['starved_below']) and free_ports[t] > 0]
+        if not starved:
+            break
+        # Most starved first: nothing available, then lowest available fraction
+        target = min(starved, key=lambda t: (available[t], fraction(t)))
+
+        if budget_used < settings['global_budget']:
+            reason = (f"{target} starved ({available[target]}/{totals[target]} available), "
+                      f"budget {budget_used}/{settings['global_budget']} has room")
+            moves.append((None, target, reason))
+            budget_used += 1
+        else:
+            donors = [t for t in state
+                      if t != target
+                      and fraction(t) > settings['idle_above']
+                      and available[t] > 1
+                      and totals[t] > catalog.min_pool_size(t)]
+            if not donors:
+                logger.info(f"{target} is starved but no type has idle slots to spare "
+                            f"(budget {budget_used}/{settings['global_budget']} reached)")
+                break
+            donor = max(donors, key=fraction)
+            reason = (f"{target} starved ({available[target]}/{totals[target]} available), "
+                      f"{donor} idle ({available[donor]}/{totals[donor]} available), budget full")
+            moves.append((donor, target, reason))
+            available[donor] -= 1
+            totals[donor] -= 1
+            free_ports[donor] += 1
+
+        available[target] += 1
+        totals[target] += 1
+        free_ports[target] -= 1
+
+    return moves
+
+
+def rebalance_pool(client, dry_run=False):
+    """
+    Run one rebalancing pass: convert idle slots of under-used types into slots of
+    starved types, within the global budget, per-type minimums and port ranges.
+    Returns: number of slots moved
+    """
+    catalog = get_catalog()
+    settings = get_rebalance_settings(catalog)
+    state = collect_pool_state(client, catalog)
+
+    logger.info("Pool utilization: " + ", ".join(describe(t, e) for t, e in state.items()))
+
+    moves = plan_moves(catalog, state, settings)
+    if not moves:
+        logger.info("Pool is balanced, no moves needed")
+        return 0
+
+    moved = 0
+    for donor, target, reason in moves:
+        if dry_run:
+            logger.info(f"[DRY RUN] Would move a slot {donor or 'budget'} -> {target}: {reason}")
+            continue
+
+        pool_index, host_port = next_free_slot(catalog, target, state[target])
+        if pool_index is None:
+            logger.warning(f"Skipping move to {target}: port range is full")
+            continue
+
+        if donor:
+            # Retire the donor slot first so the budget is never exceeded
+            donor_id = state[donor]['available'].pop()
+            try:
+                donor_container = client.containers.get(donor_id)
+                if donor_container.labels.get('status') != 'available':
+                    logger.info(f"Skipping move from {donor}: {donor_container.name} was just assigned")
+                    continue
+                donor_container.stop(timeout=10)
+                donor_container.remove()
+            except Exception as e:
+                logger.error(f"Failed to retire {donor} container {donor_id[:12]}: {e}")
+                continue
+
+        container_config = catalog.build_container_config(
+            target,
+            name=f'pool_{target}_{pool_index}_{host_port}',
+            host_port=host_port,
+            labels={
+                'pool': 'true',
+                'type': target,
+                'status': 'available',
+                'pool_index': str(pool_index)
+            }
+        )
+        try:
+            client.containers.run(**container_config)
+        except Exception as e:
+            logger.error(f"Failed to create {target} slot on port {host_port}: {e}")
+            continue
+
+        state[target]['used_indices'].add(pool_index)
+        state[target]['used_ports'].add(host_port)
+        moved += 1
+        source = f"{donor_container.name}" if donor else "spare budget"
+        logger.info(f"Moved slot {source} -> {container_config['name']}: {reason}")
+
+    return moved
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Request Profiler
+Opt-in profiling of selected web requests, to tell whether a slow page waits on
+Docker, the database or template rendering. A request is profiled when its endpoint
+is selected, when it falls within the sampling rate, or when an admin asks for it
+with the X-Profile header.
+
+Two modes:
+- sample:    one thread records the stack of every profiled request every few
+             milliseconds; stacks are aggregated per endpoint and exported in the
+             collapsed format of flamegraph.pl and speedscope
+- cprofile:  cProfile on the request thread, keeping the top functions of the slowest
+             requests (one request at a time; others fall back to sampling)
+
+Everything is kept in memory per process. When nothing is selected the only cost is
+one check per request.
+"""
+
+import cProfile
+import heapq
+import io
+import itertools
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+MODES = ('sample', 'cprofile')
+
+# Profiler settings
+# INTERVAL:     seconds between two stack samples of a profiled request
+# KEEP:         slowest profiled requests kept with their details
+# MAX_STACKS:   distinct stacks kept per endpoint; further ones are counted as truncated
+INTERVAL = 0.005
+KEEP = 20
+MAX_STACKS = 5000
+
+# Where a sample's time went, from the innermost frame that belongs to one of these
+CATEGORIES = (
+    ('docker', ('/docker/', '/urllib3/', '/requests/', '/http/client.py')),
+    ('database', ('/sqlalchemy/', '/sqlite3/', '/psycopg')),
+    ('templates', ('/jinja2/',)),
+)
+
+# Frames above Flask's request handling (server, thread pool) are left out of stacks
+ROOT_FRAME = 'wsgi_app'
+
+
+def frame_label(code):
+    """Name of a stack frame in collapsed output: function (file:line of definition)"""
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(';', ':')
+
+
+def categorize(codes):
+    """Category of a stack, innermost frame first"""
+    for code in reversed(codes):
+        for category, markers in CATEGORIES:
+            if any(marker in code.co_filename for marker in markers):
+                return category
+    return 'app'
+
+
+def read_stack(frame):
+    """
+    Code objects of a stack from its root down to frame, starting at Flask's wsgi_app.
+    Returns: list of code objects
+    """
+    codes = []
+    while frame is not None:
+        codes.append(frame.f_code)
+        if frame.f_code.co_name == ROOT_FRAME:
+            break
+        frame = frame.f_back
+    codes.reverse()
+    return codes
+
+
+class ProfileRun:
+    """One request being profiled"""
+
+    def __init__(self, endpoint, label, mode):
+        self.endpoint = endpoint
+        self.label = label
+        self.mode = mode
+        self.thread_id = threading.get_ident()
+        self.started = time.perf_counter()
+        self.stacks = Counter()
+        self.categories = Counter()
+        self.profile = None
+
+
+class RequestProfiler:
+    """Selection of requests to profile and the aggregated results of this process"""
+
+    def __init__(self, routes=(), sample_rate=0.0, mode='sample', interval=INTERVAL, keep=KEEP,
+                 max_stacks=MAX_STACKS):
+        self.interval = interval
+        self.keep = keep
+        self.max_stacks = max_stacks
+        self.lock = threading.Lock()
+        self.runs = {}
+        self.sampler = None
+        self.cprofile_busy = False
+        self.sequence = itertools.count()
+        self.configure(routes, sample_rate, mode)
+        self.reset()
+
+    def configure(self, routes=(), sample_rate=0.0, mode='sample'):
+        """Select endpoints and a share of all requests to profile"""
+        if mode not in MODES:
+            raise ValueError(f"Unknown profiling mode: {mode}")
+        self.routes = frozenset(routes)
+        self.sample_rate = max(0.0, min(float(sample_rate), 1.0))
+        self.mode = mode
+
+    @property
+    def active(self):
+        """Whether any request is selected without being asked for"""
+        return bool(self.routes) or self.sample_rate > 0
+
+    def reset(self):
+        """Forget everything recorded so far"""
+        with self.lock:
+            self.stacks = {}
+            self.endpoints = {}
+            self.slowest = []
+
+    def wants(self, endpoint):
+        """Whether a request to endpoint is selected by route or sampling rate"""
+        return endpoint in self.routes or (self.sample_rate > 0 and random.random() < self.sample_rate)
+
+    def begin(self, endpoint, label, mode=None):
+        """Start profiling the current request; returns the run to pass to finish()"""
+        run = ProfileRun(endpoint, label, mode or self.mode)
+        if run.mode == 'cprofile':
+            with self.lock:
+                if self.cprofile_busy:
+                    run.mode = 'sample'
+                else:
+                    self.cprofile_busy = True
+        if run.mode == 'cprofile':
+            run.profile = cProfile.Profile()
+            run.profile.enable()
+        else:
+            with self.lock:
+                self.runs[run.thread_id] = run
+            self.start_sampler()
+        return run
+
+    def finish(self, run, status):
+        """Stop profiling a request and add it to the results"""
+        seconds = time.perf_counter() - run.started
+        details = None
+        if run.profile is not None:
+            run.profile.disable()
+            with self.lock:
+                self.cprofile_busy = False
+        else:
+            with self.lock:
+                self.runs.pop(run.thread_id, None)
+
+        with self.lock:
+            qualifies = len(self.slowest) < self.keep or seconds > self.slowest[0][0]
+        if run.profile is not None and qualifies:
+            # Formatting the stats is the expensive part, so only for requests that are kept
+            output = io.StringIO()
+            pstats.Stats(run.profile, stream=output).sort_stats('cumulative').print_stats(15)
+            details = output.getvalue()
+
+        with self.lock:
+            stats = self.endpoints.setdefault(run.endpoint, {'requests': 0, 'seconds': 0.0, 'max': 0.0,
+                                                              'samples': Counter()})
+            stats['requests'] += 1
+            stats['seconds'] += seconds
+            stats['max'] = max(stats['max'], seconds)
+            stats['samples'].update(run.categories)
+
+            stacks = self.stacks.setdefault(run.endpoint, Counter())
+            for stack, count in run.stacks.items():
+                if stack in stacks or len(stacks) < self.max_stacks:
+                    stacks[stack] += count
+                else:
+                    stacks['[truncated]'] += count
+
+            entry = (seconds, next(self.sequence), {
+                'label': run.label,
+                'endpoint': run.endpoint,
+                'status': status,
+                'seconds': seconds,
+                'mode': run.mode,
+                'at': time.time(),
+                'samples': dict(run.categories),
+                'details': details,
+            })
+            if len(self.slowest) < self.keep:
+                heapq.heappush(self.slowest, entry)
+            elif seconds > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, entry)
+
+    def start_sampler(self):
+        with self.lock:
+            if self.sampler is None or not self.sampler.is_alive():
+                self.sampler = threading.Thread(target=self.sample_loop, name='request-profiler', daemon=True)
+                self.sampler.start()
+
+    def sample_loop(self):
+        """Sampler thread body; exits when no request has been profiled for a while"""
+        idle_since = time.monotonic()
+        while True:
+            time.sleep(self.interval)
+            with self.lock:
+                runs = list(self.runs.values())
+            if not runs:
+                if time.monotonic() - idle_since > 10:
+                    with self.lock:
+                        if not self.runs:
+                            self.sampler = None
+                            return
+                continue
+            idle_since = time.monotonic()
+
+            frames = sys._current_frames()
+            samples = []
+            for run in runs:
+                frame = frames.get(run.thread_id)
+                if frame is not None:
+                    codes = read_stack(frame)
+                    samples.append((run, ';'.join(frame_label(code) for code in codes), categorize(codes)))
+            del frames
+            # A run finished meanwhile is already being aggregated; leave it alone
+            with self.lock:
+                for run, stack, category in samples:
+                    if self.runs.get(run.thread_id) is run:
+                        run.stacks[stack] += 1
+                        run.categories[category] += 1
+
+    def collapsed(self, endpoint=None):
+        """Aggregated stacks, one 'frame;frame;frame count' line each, for flamegraph.pl or speedscope"""
+        with self.lock:
+            selected = [self.stacks.get(endpoint, Counter())] if endpoint else list(self.stacks.values())
+            total = Counter()
+            for stacks in selected:
+                total.update(stacks)
+        return ''.join(f"{stack} {count}\n" for stack, count in sorted(total.items()))
+
+    def summary(self):
+        """
+        Per-endpoint totals and the slowest requests.
+        Returns: tuple (endpoints, slowest) with endpoint dicts sorted by total time and
+                 slowest requests first; 'share' maps each category to its share of samples
+        """
+        with self.lock:
+            endpoints = [{'endpoint': name, 'requests': stats['requests'], 'max': stats['max'],
+                          'mean': stats['seconds'] / stats['requests'], 'total': stats['seconds'],
+                          'share': shares(stats['samples'])}
+                         for name, stats in self.endpoints.items()]
+            slowest = [dict(entry, share=shares(entry['samples']))
+                       for _, _, entry in sorted(self.slowest, reverse=True)]
+        endpoints.sort(key=lambda e: e['total'], reverse=True)
+        return endpoints, slowest
+
+
+def shares(samples):
+    """Share of samples per category, or an empty dict without samples"""
+    total = sum(samples.values())
+    return {category: count / total for category, count in samples.items()} if total else {}
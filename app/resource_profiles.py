@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Container Resource Profiles
+Per-image-type resource limits for pool containers and a host density calculator
+"""
+
+import docker
+
+# CFS scheduler period used to express CPU quotas (100ms, the Docker default)
+CPU_PERIOD = 100000
+
+# Resource profile fields (profiles themselves live in pool_catalog.json)
+# mem_limit:  hard memory limit (swap is disabled by setting memswap to the same value)
+# cpu_shares: relative CPU weight when the host is contended (default 1024)
+# cpus:       hard CPU ceiling, converted to a CFS quota
+# pids_limit: maximum number of processes inside the container
+# nofile:     open file descriptor ulimit
+PROFILE_FIELDS = ('mem_limit', 'cpu_shares', 'cpus', 'pids_limit', 'nofile')
+
+
+def parse_size(value):
+    """Convert a Docker-style size string ('64m', '1g', '512k') to bytes"""
+    if isinstance(value, int):
+        return value
+    units = {'b': 1, 'k': 1024, 'm': 1024 ** 2, 'g': 1024 ** 3}
+    value = str(value).strip().lower()
+    if value and value[-1] in units:
+        return int(float(value[:-1]) * units[value[-1]])
+    return int(value)
+
+
+def format_size(num_bytes):
+    """Format a byte count for display"""
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if num_bytes < 1024 or unit == 'GB':
+            return f"{num_bytes:.0f}{unit}" if unit == 'B' else f"{num_bytes:.1f}{unit}"
+        num_bytes /= 1024
+
+
+def build_resource_limits(profile):
+    """
+    Build the docker-py run() keyword arguments enforcing a resource profile.
+    Returns: dict to merge into a container config
+    """
+    mem_limit = parse_size(profile['mem_limit'])
+
+    return {
+        'mem_limit': mem_limit,
+        'memswap_limit': mem_limit,
+        'cpu_shares': profile['cpu_shares'],
+        'cpu_period': CPU_PERIOD,
+        'cpu_quota': int(profile['cpus'] * CPU_PERIOD),
+        'pids_limit': profile['pids_limit'],
+        'ulimits': [docker.types.Ulimit(name='nofile', soft=profile['nofile'], hard=profile['nofile'])],
+    }
+
+
+def get_host_capacity(client):
+    """
+    Read total memory and CPU count from the Docker daemon.
+    Returns: tuple (memory_bytes, cpus)
+    """
+    info = client.info()
+    return info.get('MemTotal', 0), info.get('NCPU', 0)
+
+
+def calculate_density(memory_bytes, cpus, profiles, host, pool_counts=None):
+    """
+    Calculate how many containers of each type fit on a host under the resource profiles.
+
+    Memory is a hard limit so it is never overcommitted. CPU quotas are ceilings, not
+    reservations, so the CPU bound allows host['cpu_overcommit'] times the usable CPUs.
+
+    Returns: dict with per-type capacity and, when pool_counts is given, how many times
+    the configured pool mix fits on the host
+    """
+    usable_memory = max(memory_bytes - parse_size(host['reserved_memory']), 0)
+    usable_cpus = max(cpus - host['reserved_cpus'], 0)
+    schedulable_cpus = usable_cpus * host['cpu_overcommit']
+
+    per_type = {}
+    for image_type in sorted(profiles):
+        profile = profiles[image_type]
+        by_memory = usable_memory // parse_size(profile['mem_limit'])
+        by_cpu = int(schedulable_cpus / profile['cpus']) if profile['cpus'] else by_memory
+        per_type[image_type] = {
+            'by_memory': int(by_memory),
+            'by_cpu': by_cpu,
+            'capacity': int(min(by_memory, by_cpu)),
+            'limited_by': 'memory' if by_memory <= by_cpu else 'cpu',
+        }
+
+    result = {
+        'usable_memory': usable_memory,
+        'usable_cpus': usable_cpus,
+        'per_type': per_type,
+    }
+
+    if pool_counts:
+        pool_memory = sum(parse_size(profiles[t]['mem_limit']) * n for t, n in pool_counts.items())
+        pool_cpus = sum(profiles[t]['cpus'] * n for t, n in pool_counts.items())
+        result['pool_memory'] = pool_memory
+        result['pool_cpus'] = pool_cpus
+        result['pool_fits'] = min(
+            usable_memory / pool_memory if pool_memory else 0,
+            schedulable_cpus / pool_cpus if pool_cpus else 0,
+        )
+
+    return result
@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+"""
+Container Resource Sampler
+Samples CPU, memory and network usage of every running pool container in one pass
+per interval and keeps the last HISTORY samples of each in fixed-size ring buffers.
+Counters are read from the containers' cgroup files and /proc, so a pass costs one
+container listing plus a few small file reads per container; container.stats() is
+only used for containers whose cgroup cannot be found (e.g. a remote daemon).
+
+One process per host samples: the web workers compete for a lock file, the holder
+samples and writes a snapshot to STATS_FILE, and the others (and pool_manager.py
+--status) read the snapshot. If the sampling worker exits, another takes over and
+continues its history from the snapshot.
+"""
+
+import fcntl
+import json
+import os
+import threading
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+
+from docker_scheduler import scheduler, Overloaded
+from streaming import iter_containers
+
+# Sampler settings
+# SAMPLE_INTERVAL: seconds between passes [RESOURCE_SAMPLE_INTERVAL]
+# HISTORY:         samples kept per container, 60 x 10s = 10 minutes [RESOURCE_HISTORY]
+# STATS_FILE:      snapshot shared with the other workers and the CLI [RESOURCE_STATS]
+SAMPLE_INTERVAL = float(os.environ.get('RESOURCE_SAMPLE_INTERVAL', '10'))
+HISTORY = int(os.environ.get('RESOURCE_HISTORY', '60'))
+STATS_FILE = os.environ.get('RESOURCE_STATS', '/opt/my-paas/resource_stats.json')
+
+CGROUP_ROOT = '/sys/fs/cgroup'
+PROC_ROOT = '/proc'
+
+# Per container: CPU % of one core, memory bytes, network receive/transmit bytes per second
+SERIES = ('cpu', 'memory', 'rx', 'tx')
+
+# Concurrent container.stats() calls for containers without a readable cgroup
+STATS_WORKERS = 8
+
+
+class RingBuffer:
+    """Fixed number of floats; appending to a full buffer overwrites the oldest"""
+
+    __slots__ = ('data', 'start', 'size')
+
+    def __init__(self, capacity=HISTORY, values=()):
+        self.data = array('d', bytes(8 * capacity))
+        self.start = 0
+        self.size = 0
+        for value in list(values)[-capacity:]:
+            self.append(value)
+
+    def append(self, value):
+        capacity = len(self.data)
+        self.data[(self.start + self.size) % capacity] = value
+        if self.size < capacity:
+            self.size += 1
+        else:
+            self.start = (self.start + 1) % capacity
+
+    def values(self):
+        """Samples, oldest first"""
+        end = self.start + self.size
+        if end <= len(self.data):
+            return self.data[self.start:end].tolist()
+        return (self.data[self.start:] + self.data[:end - len(self.data)]).tolist()
+
+    def __len__(self):
+        return self.size
+
+
+def read_int(path):
+    with open(path) as f:
+        return int(f.read().split()[0])
+
+
+def read_keyed(path, key):
+    """Value of one 'key value' line of a cgroup stat file, or 0"""
+    with open(path) as f:
+        for line in f:
+            name, _, value = line.partition(' ')
+            if name == key:
+                return int(value)
+    return 0
+
+
+def find_cgroup(container_id, root=CGROUP_ROOT):
+    """
+    Locate a container's cgroup under the systemd or cgroupfs driver.
+    Returns: tuple (version, cpu directory, memory directory) or None
+    """
+    for scope in (f"system.slice/docker-{container_id}.scope", f"docker/{container_id}"):
+        if os.path.exists(f"{root}/{scope}/cpu.stat") and os.path.exists(f"{root}/{scope}/memory.current"):
+            return 2, f"{root}/{scope}", f"{root}/{scope}"
+        cpu_dir = f"{root}/cpuacct/{scope}"
+        memory_dir = f"{root}/memory/{scope}"
+        if os.path.exists(f"{cpu_dir}/cpuacct.usage") and os.path.exists(f"{memory_dir}/memory.usage_in_bytes"):
+            return 1, cpu_dir, memory_dir
+    return None
+
+
+def read_network(pid, proc=PROC_ROOT):
+    """Received and transmitted bytes of all non-loopback interfaces in a process's network namespace"""
+    rx = tx = 0
+    with open(f"{proc}/{pid}/net/dev") as f:
+        for line in f.readlines()[2:]:
+            interface, _, counters = line.partition(':')
+            if interface.strip() == 'lo':
+                continue
+            fields = counters.split()
+            rx += int(fields[0])
+            tx += int(fields[8])
+    return rx, tx
+
+
+def read_cgroup(cgroup, proc=PROC_ROOT):
+    """
+    Read a container's counters from its cgroup.
+    Returns: tuple (cpu nanoseconds, memory bytes, rx bytes, tx bytes)
+    """
+    version, cpu_dir, memory_dir = cgroup
+    # Memory as `docker stats` reports it: usage without the reclaimable page cache
+    if version == 2:
+        cpu_ns = read_keyed(f"{cpu_dir}/cpu.stat", 'usage_usec') * 1000
+        memory = read_int(f"{memory_dir}/memory.current") - read_keyed(f"{memory_dir}/memory.stat", 'inactive_file')
+    else:
+        cpu_ns = read_int(f"{cpu_dir}/cpuacct.usage")
+        memory = (read_int(f"{memory_dir}/memory.usage_in_bytes")
+                  - read_keyed(f"{memory_dir}/memory.stat", 'total_inactive_file'))
+    with open(f"{cpu_dir}/cgroup.procs") as f:
+        pid = f.readline().strip()
+    rx, tx = read_network(pid, proc) if pid else (0, 0)
+    return cpu_ns, max(memory, 0), rx, tx
+
+
+def read_docker_stats(client, container_id):
+    """
+    Read a container's counters with one non-streaming stats call.
+    Returns: tuple (cpu nanoseconds, memory bytes, rx bytes, tx bytes)
+    """
+    stats = client.api.stats(container_id, stream=False, one_shot=True)
+    memory_stats = stats.get('memory_stats') or {}
+    inactive = (memory_stats.get('stats') or {}).get('inactive_file',
+                                                      (memory_stats.get('stats') or {}).get('total_inactive_file', 0))
+    networks = (stats.get('networks') or {}).values()
+    return (stats['cpu_stats']['cpu_usage']['total_usage'],
+            max(memory_stats.get('usage', 0) - inactive, 0),
+            sum(n.get('rx_bytes', 0) for n in networks),
+            sum(n.get('tx_bytes', 0) for n in networks))
+
+
+def load_snapshot(path=STATS_FILE):
+    """Read the snapshot written by the sampling process, or None if there is none"""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def snapshot_age(snapshot):
+    """Seconds since a snapshot was written, or None"""
+    return time.time() - snapshot['updated_at'] if snapshot else None
+
+
+def summarize_usage(snapshot):
+    """
+    Latest usage added up per pool type.
+    Returns: dict type -> {'containers', 'cpu', 'memory', 'rx', 'tx'}
+    """
+    totals = {}
+    for container in (snapshot or {}).get('containers', {}).values():
+        if not container['cpu']:
+            continue
+        t = totals.setdefault(container['type'], {'containers': 0, **{series: 0.0 for series in SERIES}})
+        t['containers'] += 1
+        for series in SERIES:
+            t[series] += container[series][-1]
+    return totals
+
+
+def sparkline(values, width=80, height=20):
+    """SVG polyline points for a series, scaled to its own maximum"""
+    if len(values) < 2:
+        return ''
+    top = max(values) or 1
+    step = width / (len(values) - 1)
+    return ' '.join(f"{i * step:.1f},{height - value / top * (height - 1) - 0.5:.1f}"
+                    for i, value in enumerate(values))
+
+
+class ResourceSampler:
+    """Ring buffers of recent usage per container, sampled or read from the snapshot"""
+
+    def __init__(self, client, interval=SAMPLE_INTERVAL, history=HISTORY, path=STATS_FILE,
+                 cgroup_root=CGROUP_ROOT, proc_root=PROC_ROOT):
+        self.client = client
+        self.interval = interval
+        self.history = history
+        self.path = path
+        self.cgroup_root = cgroup_root
+        self.proc_root = proc_root
+        self.lock = threading.Lock()
+        self.buffers = {}
+        self.previous = {}
+        self.cgroups = {}
+        self.snapshot = None
+        self.snapshot_mtime = None
+        self.owner = None
+        self.thread = None
+
+    def acquire(self):
+        """Become the sampling process of this host if no other process is"""
+        if self.owner is None:
+            lock = open(f"{self.path}.lock", 'w')
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock.close()
+                return False
+            self.owner = lock
+            # Continue the history of the previous sampling process
+            self.reload()
+            for container_id, container in ((self.snapshot or {}).get('containers') or {}).items():
+                self.buffers[container_id] = {
+                    'name': container['name'], 'type': container['type'], 'status': container['status'],
+                    **{series: RingBuffer(self.history, container[series]) for series in SERIES}
+                }
+        return True
+
+    def read(self, container_id):
+        """Counters of one container, from its cgroup when it can be found"""
+        if container_id not in self.cgroups:
+            self.cgroups[container_id] = find_cgroup(container_id, self.cgroup_root)
+        cgroup = self.cgroups[container_id]
+        if cgroup:
+            try:
+                return read_cgroup(cgroup, self.proc_root)
+            except (OSError, ValueError, IndexError):
+                # Restarted since the cgroup was found; look it up again next pass
+                del self.cgroups[container_id]
+        return read_docker_stats(self.client, container_id)
+
+    def sample_once(self):
+        """One pass over all running pool containers; returns the number sampled"""
+        running = list(iter_containers(self.client, filters={'label': ['pool=true'], 'status': 'running'},
+                                       all=False))
+        now = time.monotonic()
+        counters = {}
+        slow = []
+        for summary in running:
+            container_id = summary['id']
+            if self.cgroups.get(container_id, True) is None:
+                slow.append(container_id)
+                continue
+            try:
+                counters[container_id] = self.read(container_id)
+            except Exception:
+                pass
+        if slow:
+            with ThreadPoolExecutor(max_workers=STATS_WORKERS) as executor:
+                for container_id, result in zip(slow, executor.map(self.try_docker_stats, slow)):
+                    if result:
+                        counters[container_id] = result
+
+        with self.lock:
+            live = {summary['id'] for summary in running}
+            for gone in set(self.buffers) - live:
+                del self.buffers[gone]
+            for gone in set(self.previous) - live:
+                del self.previous[gone]
+            for gone in set(self.cgroups) - live:
+                del self.cgroups[gone]
+
+            for summary in running:
+                container_id = summary['id']
+                if container_id not in counters:
+                    continue
+                cpu_ns, memory, rx, tx = counters[container_id]
+                previous = self.previous.get(container_id)
+                self.previous[container_id] = (now, cpu_ns, rx, tx)
+                # Rates need two samples; counters going backwards mean a restart
+                if not previous or cpu_ns < previous[1] or rx < previous[2] or tx < previous[3]:
+                    continue
+                seconds = max(now - previous[0], 1e-6)
+                buffers = self.buffers.get(container_id)
+                if buffers is None:
+                    buffers = self.buffers[container_id] = {series: RingBuffer(self.history) for series in SERIES}
+                buffers.update(name=summary['name'], type=summary['labels'].get('type', 'unknown'),
+                               status=summary['labels'].get('status', 'available'))
+                buffers['cpu'].append((cpu_ns - previous[1]) / seconds / 1e7)
+                buffers['memory'].append(memory)
+                buffers['rx'].append((rx - previous[2]) / seconds)
+                buffers['tx'].append((tx - previous[3]) / seconds)
+            self.snapshot = {
+                'updated_at': time.time(),
+                'interval': self.interval,
+                'containers': {
+                    container_id: {'name': b['name'], 'type': b['type'], 'status': b['status'],
+                                   **{series: [round(v, 2) for v in b[series].values()] for series in SERIES}}
+                    for container_id, b in self.buffers.items()
+                },
+            }
+            snapshot = self.snapshot
+        self.write(snapshot)
+        return len(counters)
+
+    def try_docker_stats(self, container_id):
+        try:
+            with scheduler.operation('background'):
+                return read_docker_stats(self.client, container_id)
+        except Exception:
+            return None
+
+    def write(self, snapshot):
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(snapshot, f, separators=(',', ':'))
+            os.replace(tmp_path, self.path)
+            self.snapshot_mtime = os.stat(self.path).st_mtime
+        except OSError as e:
+            print(f"Warning: Could not write resource stats to {self.path}: {e}")
+
+    def reload(self):
+        """Read the snapshot if the sampling process has written a new one"""
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            return
+        if mtime != self.snapshot_mtime:
+            snapshot = load_snapshot(self.path)
+            with self.lock:
+                self.snapshot, self.snapshot_mtime = snapshot, mtime
+
+    def series(self, container_id):
+        """
+        Recent usage of one container.
+        Returns: dict series name -> list of values (oldest first), or None
+        """
+        if self.thread is None:
+            self.reload()
+        with self.lock:
+            container = ((self.snapshot or {}).get('containers') or {}).get(container_id)
+        return {series: container[series] for series in SERIES} if container else None
+
+    def run(self):
+        while True:
+            started = time.monotonic()
+            try:
+                if not self.acquire():
+                    self.reload()
+                elif self.client:
+                    with scheduler.operation('background'):
+                        self.sample_once()
+            except Overloaded:
+                # Skip the pass while Docker is slow; the graphs show a gap
+                pass
+            except Exception as e:
+                print(f"Warning: Resource sampling failed: {e}")
+            time.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def start(self):
+        """Start sampling (or following the sampling process) in a daemon thread"""
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(target=self.run, name='resource-sampler', daemon=True)
+            self.thread.start()
+        return self.thread
+
+
+_sampler = None
+_sampler_lock = threading.Lock()
+
+
+def get_sampler(client=None):
+    """The process-wide sampler (created on first call, with the given Docker client)"""
+    global _sampler
+    with _sampler_lock:
+        if _sampler is None:
+            _sampler = ResourceSampler(client)
+        return _sampler
+
+
+def start_sampler(client):
+    return get_sampler(client).start()
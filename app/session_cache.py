@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Session Cache
+Small in-process TTL cache for per-user data loaded on every request, with hit and
+miss counters for the metrics file, and a stale-while-revalidate cache for state that
+is slow to load (Docker), refreshed in the background while the last value is served.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+
+class TTLCache:
+    """Thread-safe key/value cache whose entries expire after `ttl` seconds"""
+
+    def __init__(self, ttl, max_entries=10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self.reported_hits = 0
+        self.reported_misses = 0
+        self.reported_at = time.monotonic()
+
+    def get(self, key):
+        """Cached value, or None when missing or expired"""
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self.entries[key]
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        """Store a value, dropping the oldest entries when full"""
+        if self.ttl <= 0:
+            return
+        with self.lock:
+            self.entries.pop(key, None)
+            while len(self.entries) >= self.max_entries:
+                del self.entries[next(iter(self.entries))]
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+
+    def invalidate(self, key):
+        """Forget a key, after the data behind it changed"""
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def hit_rate(self):
+        """Share of lookups answered from the cache since the process started"""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def take_counts(self, min_interval=0):
+        """
+        Hits and misses since the previous call, at most once per `min_interval` seconds.
+        Returns: tuple (hits, misses), or None when called again too soon
+        """
+        now = time.monotonic()
+        with self.lock:
+            if now - self.reported_at < min_interval:
+                return None
+            hits = self.hits - self.reported_hits
+            misses = self.misses - self.reported_misses
+            self.reported_hits, self.reported_misses, self.reported_at = self.hits, self.misses, now
+        return hits, misses
+
+
+class StaleCache:
+    """
+    Last known values, refreshed in the background once older than `max_age` seconds.
+    Each key has at most one refresh running; a reader waits for it until a deadline
+    and otherwise gets the previous value with its age, so reads never block for long.
+    """
+
+    def __init__(self, max_age, workers=4, max_entries=10000):
+        self.max_age = max_age
+        self.workers = workers
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.failures = {}
+        self.pending = {}
+        self.executor = None
+
+    def revalidate(self, key, load, force=False):
+        """
+        Start refreshing a key with load() in the background, unless it is fresh, a
+        refresh is already running, or the last one failed less than max_age ago.
+        """
+        now = time.monotonic()
+        with self.lock:
+            if key in self.pending:
+                return
+            if not force:
+                entry = self.entries.get(key)
+                failure = self.failures.get(key)
+                if entry is not None and now - entry[0] < self.max_age:
+                    return
+                if failure is not None and now - failure[0] < self.max_age:
+                    return
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='stale-cache')
+            self.pending[key] = self.executor.submit(self.refresh, key, load)
+
+    def refresh(self, key, load):
+        try:
+            value = load()
+        except Exception as e:
+            with self.lock:
+                self.failures[key] = (time.monotonic(), str(e))
+                self.pending.pop(key, None)
+            return
+        with self.lock:
+            self.entries.pop(key, None)
+            while len(self.entries) >= self.max_entries:
+                del self.entries[next(iter(self.entries))]
+            self.entries[key] = (time.monotonic(), value)
+            self.failures.pop(key, None)
+            self.pending.pop(key, None)
+
+    def read(self, key, deadline=None):
+        """
+        Latest value of a key, after waiting for a running refresh until `deadline`
+        (a time.monotonic() value).
+        Returns: tuple (value, age in seconds, error of a refresh that failed since),
+                 value and age None when the key was never loaded
+        """
+        with self.lock:
+            future = self.pending.get(key)
+        if future is not None and deadline is not None:
+            wait([future], timeout=max(deadline - time.monotonic(), 0))
+        with self.lock:
+            entry = self.entries.get(key)
+            failure = self.failures.get(key)
+        error = failure[1] if failure is not None else None
+        if entry is None:
+            return None, None, error
+        return entry[1], time.monotonic() - entry[0], error
+
+    def invalidate(self, key):
+        """Forget a key's value, after the data behind it changed"""
+        with self.lock:
+            self.entries.pop(key, None)
+            self.failures.pop(key, None)
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Monitor Shards
+Splits containers into a fixed number of shards by user id and hands the shards out
+to cooperating container_monitor.py workers through leases in the database. Leases
+expire when a worker stops renewing them, so the remaining workers pick up its shards.
+"""
+
+import math
+import os
+import socket
+from datetime import datetime, timedelta
+
+from app import db, Container, MonitorWorker, ShardLease
+
+# Defaults for the "monitor" section of pool_catalog.json
+# shards:            number of shards; every worker must agree on it
+# lease_seconds:     how long a shard lease or worker heartbeat stays valid without renewal
+# interval_seconds:  time between the starts of two cycles of a worker
+MONITOR_DEFAULTS = {
+    'shards': 16,
+    'lease_seconds': 90,
+    'interval_seconds': 30,
+}
+
+
+def get_monitor_settings(catalog):
+    """Monitor settings from the catalog, filled in with defaults"""
+    settings = dict(MONITOR_DEFAULTS)
+    settings.update(catalog.monitor)
+    return settings
+
+
+def default_worker_name():
+    """Worker name unique to this host and process"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def shard_filter(shards, shard_count):
+    """SQL condition selecting the containers of the given shards (hash of user id)"""
+    return (Container.user_id % shard_count).in_(list(shards))
+
+
+class ShardWorker:
+    """One monitor worker's view of the shard leases"""
+
+    def __init__(self, name, settings):
+        self.name = name
+        self.shard_count = settings['shards']
+        self.lease = timedelta(seconds=settings['lease_seconds'])
+
+    def ensure_shards(self):
+        """Create lease rows for shards that do not have one yet"""
+        existing = {row.shard for row in db.session.query(ShardLease.shard)}
+        for shard in range(self.shard_count):
+            if shard not in existing:
+                db.session.add(ShardLease(shard=shard))
+        try:
+            db.session.commit()
+        except Exception:
+            # Another worker created them first
+            db.session.rollback()
+
+    def heartbeat(self, now):
+        """Mark this worker alive"""
+        worker = MonitorWorker.query.get(self.name)
+        if worker is None:
+            db.session.add(MonitorWorker(name=self.name, heartbeat_at=now, started_at=now))
+        else:
+            worker.heartbeat_at = now
+        db.session.commit()
+
+    def live_workers(self, now):
+        """Names of workers whose heartbeat has not expired"""
+        rows = MonitorWorker.query.filter(MonitorWorker.heartbeat_at > now - self.lease).all()
+        return sorted({row.name for row in rows} | {self.name})
+
+    def owned(self, now=None):
+        """Shards this worker currently holds a valid lease on"""
+        now = now or datetime.utcnow()
+        rows = ShardLease.query.filter(ShardLease.owner == self.name, ShardLease.expires_at > now,
+                                       ShardLease.shard < self.shard_count) \
+            .order_by(ShardLease.shard).all()
+        return [row.shard for row in rows]
+
+    def renew(self, now=None):
+        """
+        Extend this worker's leases.
+        Returns: shards still held
+        """
+        now = now or datetime.utcnow()
+        ShardLease.query.filter(ShardLease.owner == self.name, ShardLease.expires_at > now) \
+            .update({'expires_at': now + self.lease}, synchronize_session=False)
+        db.session.commit()
+        return self.owned(now)
+
+    def sync(self):
+        """
+        Heartbeat, renew held leases, give up shards above the fair share and claim
+        free or expired shards up to it. The fair share is the shard count divided by
+        the number of live workers, so shards rebalance as workers come and go.
+        Returns: list of shards owned after the sync
+        """
+        now = datetime.utcnow()
+        self.ensure_shards()
+        self.heartbeat(now)
+        fair_share = math.ceil(self.shard_count / len(self.live_workers(now)))
+        mine = self.renew(now)
+
+        if len(mine) > fair_share:
+            surplus = mine[fair_share:]
+            ShardLease.query.filter(ShardLease.shard.in_(surplus), ShardLease.owner == self.name) \
+                .update({'owner': None, 'expires_at': None}, synchronize_session=False)
+            db.session.commit()
+            mine = mine[:fair_share]
+
+        free = ShardLease.query.filter(
+            ShardLease.shard < self.shard_count,
+            db.or_(ShardLease.owner.is_(None), ShardLease.expires_at.is_(None), ShardLease.expires_at <= now)
+        ).order_by(ShardLease.shard).all()
+        for row in free:
+            if len(mine) >= fair_share:
+                break
+            # Conditional update so two workers cannot both claim the same shard
+            claimed = ShardLease.query.filter(
+                ShardLease.shard == row.shard,
+                db.or_(ShardLease.owner.is_(None), ShardLease.expires_at.is_(None), ShardLease.expires_at <= now)
+            ).update({'owner': self.name, 'expires_at': now + self.lease}, synchronize_session=False)
+            db.session.commit()
+            if claimed:
+                mine.append(row.shard)
+
+        return sorted(mine)
+
+    def record_cycle(self, shard, seconds, containers):
+        """Store the duration and size of the last cycle of a shard"""
+        ShardLease.query.filter_by(shard=shard, owner=self.name).update({
+            'last_cycle_at': datetime.utcnow(),
+            'last_cycle_seconds': seconds,
+            'last_cycle_containers': containers,
+        }, synchronize_session=False)
+        db.session.commit()
+
+    def leave(self):
+        """Release all leases so other workers take over immediately"""
+        ShardLease.query.filter_by(owner=self.name) \
+            .update({'owner': None, 'expires_at': None}, synchronize_session=False)
+        MonitorWorker.query.filter_by(name=self.name).delete()
+        db.session.commit()
+
+
+def show_shards():
+    """Print the shard table"""
+    now = datetime.utcnow()
+    print("Shard | Owner                          | Lease  | Last Cycle | Containers")
+    print("------|--------------------------------|--------|------------|-----------")
+    for row in ShardLease.query.order_by(ShardLease.shard).all():
+        valid = row.owner and row.expires_at and row.expires_at > now
+        lease = f"{(row.expires_at - now).total_seconds():5.0f}s" if valid else "  free"
+        cycle = f"{row.last_cycle_seconds:9.2f}s" if row.last_cycle_seconds is not None else "         -"
+        containers = row.last_cycle_containers if row.last_cycle_containers is not None else '-'
+        print(f"{row.shard:5d} | {(row.owner if valid else '-'):30s} | {lease} | {cycle} | {containers}")
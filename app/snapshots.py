@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Writable-Layer Snapshots
+Commits the writable layer of assigned containers of stateful types (ubuntu-ssh by
+default) to an image, so the container monitor can recover a lost container with
+the packages and files its user added instead of a fresh one. Snapshots are taken
+by the monitor between health checks, only for containers that changed since their
+last snapshot, within a per-cycle count and byte budget.
+
+Uploaded files are bind mounts and not part of a snapshot; they are mounted again
+on recovery as before.
+"""
+
+import time
+from datetime import datetime, timedelta
+
+import docker
+
+from app import db, Container, ContainerSnapshot
+from docker_scheduler import scheduler
+from metrics import record_metrics
+from resource_profiles import parse_size, format_size
+
+# Defaults for the "snapshots" section of pool_catalog.json
+# enabled:              take snapshots in the monitor and restore from them on recovery
+# image_types:          types whose containers are snapshotted
+# interval_minutes:     minimum time between two snapshots of one container
+# min_layer_size:       writable layers smaller than this are not worth a snapshot
+# max_layer_size:       larger writable layers are skipped rather than committed
+# max_per_cycle:        snapshots taken per monitor cycle
+# max_bytes_per_cycle:  writable-layer bytes committed per monitor cycle
+# pause:                pause the container during the commit for a consistent copy
+# repository:           image repository snapshots are tagged in (tag container-<id>)
+SNAPSHOT_DEFAULTS = {
+    'enabled': True,
+    'image_types': ['ubuntu-ssh'],
+    'interval_minutes': 30,
+    'min_layer_size': '1m',
+    'max_layer_size': '2g',
+    'max_per_cycle': 2,
+    'max_bytes_per_cycle': '1g',
+    'pause': True,
+    'repository': 'my-paas-snapshots',
+}
+
+
+def get_snapshot_settings(catalog):
+    """Snapshot settings from the catalog, filled in with defaults"""
+    settings = dict(SNAPSHOT_DEFAULTS)
+    settings.update(catalog.snapshots)
+    return settings
+
+
+def snapshot_tag(db_container_id):
+    return f"container-{db_container_id}"
+
+
+def list_candidates(client, settings):
+    """
+    Running assigned containers of the snapshotted types with their writable layer size.
+    Returns: dict Docker id -> writable layer bytes
+    """
+    sizes = {}
+    for image_type in settings['image_types']:
+        # size=True makes the daemon measure every layer, so list one type at a time
+        for summary in client.api.containers(size=True, filters={
+            'label': ['pool=true', f'type={image_type}', 'status=assigned'],
+            'status': 'running'
+        }):
+            sizes[summary['Id']] = summary.get('SizeRw') or 0
+    return sizes
+
+
+def needs_snapshot(row, docker_id, layer_bytes, settings, now):
+    """Decide whether a container changed enough since its last snapshot to take another"""
+    if layer_bytes < parse_size(settings['min_layer_size']):
+        return False
+    if row is None:
+        return True
+    if now - row.taken_at < timedelta(minutes=settings['interval_minutes']):
+        return False
+    # A recovered container starts from the snapshot image, so any layer is new work
+    return row.source_id != docker_id or row.layer_bytes != layer_bytes
+
+
+def take_snapshot(client, db_container, docker_id, layer_bytes, settings):
+    """
+    Commit one container's writable layer and record it, replacing its previous snapshot.
+    Returns: the ContainerSnapshot row
+    """
+    started = time.monotonic()
+    # Commit copies the container's labels into the image; created_by is overridden so
+    # a container restored into a pool slot is not counted as an on-demand one
+    image = client.api.commit(docker_id, repository=settings['repository'], tag=snapshot_tag(db_container.id),
+                              message=f"Snapshot of container {db_container.id}", pause=settings['pause'],
+                              conf={'Labels': {'snapshot_of': str(db_container.id), 'created_by': 'snapshot'}})
+    seconds = time.monotonic() - started
+
+    row = db_container.snapshot
+    previous = row.image_id if row else None
+    if row is None:
+        row = ContainerSnapshot(container_id=db_container.id)
+        db.session.add(row)
+    row.image = f"{settings['repository']}:{snapshot_tag(db_container.id)}"
+    row.image_id = image['Id']
+    row.source_id = docker_id
+    row.layer_bytes = layer_bytes
+    row.taken_at = datetime.utcnow()
+    row.seconds = seconds
+    db.session.commit()
+
+    # The previous image stays while a restored container or a newer snapshot builds on it
+    if previous and previous != image['Id']:
+        try:
+            client.api.remove_image(previous)
+        except docker.errors.APIError:
+            pass
+    return row
+
+
+def take_snapshots(client, settings, now=None):
+    """
+    Snapshot the containers whose writable layer changed since their last snapshot,
+    least recently snapshotted first, within the per-cycle count and byte budgets.
+    Returns: dict of taken, unchanged, too_large, deferred and failed counts, and bytes
+    """
+    now = now or datetime.utcnow()
+    counts = {'taken': 0, 'unchanged': 0, 'too_large': 0, 'deferred': 0, 'failed': 0, 'bytes': 0}
+    sizes = list_candidates(client, settings)
+    if not sizes:
+        return counts
+
+    containers = Container.query.filter(Container.container_id.in_(list(sizes))).all()
+    due = []
+    for db_container in containers:
+        docker_id = db_container.container_id
+        if not needs_snapshot(db_container.snapshot, docker_id, sizes[docker_id], settings, now):
+            counts['unchanged'] += 1
+        elif sizes[docker_id] > parse_size(settings['max_layer_size']):
+            counts['too_large'] += 1
+        else:
+            due.append(db_container)
+    due.sort(key=lambda c: c.snapshot.taken_at if c.snapshot else datetime.min)
+
+    byte_budget = parse_size(settings['max_bytes_per_cycle'])
+    for db_container in due:
+        layer_bytes = sizes[db_container.container_id]
+        # The first snapshot of a cycle may exceed the byte budget, so large layers still get one
+        if counts['taken'] >= settings['max_per_cycle'] or (counts['taken'] and counts['bytes'] + layer_bytes > byte_budget):
+            counts['deferred'] += 1
+            continue
+        # Commits are heavy; stop once the daemon slows down for other work
+        if scheduler.shedding('background'):
+            counts['deferred'] += 1
+            continue
+        try:
+            row = take_snapshot(client, db_container, db_container.container_id, layer_bytes, settings)
+        except docker.errors.APIError as e:
+            print(f"Snapshot of container {db_container.id} failed: {e}")
+            counts['failed'] += 1
+            continue
+        counts['taken'] += 1
+        counts['bytes'] += layer_bytes
+        print(f"Snapshot of container {db_container.id}: {format_size(layer_bytes)} in {row.seconds:.1f}s")
+
+    record_metrics(
+        counters={'snapshots.taken': counts['taken'], 'snapshots.failed': counts['failed'],
+                  'snapshots.bytes': counts['bytes']},
+        gauges={'snapshots.deferred': counts['deferred'], 'snapshots.stored': ContainerSnapshot.query.count()}
+    )
+    return counts
+
+
+def prune_snapshots(client):
+    """
+    Remove snapshot images no container refers to any more (released or deleted
+    containers). Images a running container or a newer snapshot still uses are kept.
+    Returns: number of images removed
+    """
+    current = {row.image_id for row in db.session.query(ContainerSnapshot.image_id)}
+    removed = 0
+    for image in client.api.images(filters={'label': 'snapshot_of'}):
+        if image['Id'] in current:
+            continue
+        try:
+            client.api.remove_image(image['Id'])
+            removed += 1
+        except docker.errors.APIError:
+            pass
+    return removed
+
+
+def restore_image(client, db_container, settings):
+    """
+    Snapshot to recover a container from, if its type is snapshotted and the image
+    still exists. A snapshot whose image is gone is forgotten.
+    Returns: ContainerSnapshot row or None
+    """
+    row = db_container.snapshot
+    if row is None or not settings['enabled'] or db_container.image_type not in settings['image_types']:
+        return None
+    try:
+        client.images.get(row.image_id)
+    except docker.errors.NotFound:
+        db.session.delete(row)
+        db.session.commit()
+        return None
+    return row
+
+
+def record_restore(row, seconds):
+    """Count a recovery from a snapshot (caller commits)"""
+    row.restores = (row.restores or 0) + 1
+    row.restored_at = datetime.utcnow()
+    row.restore_seconds = seconds
+    record_metrics(counters={'snapshots.restored': 1}, gauges={'snapshots.restore_seconds': round(seconds, 3)})
+
+
+def show_snapshots():
+    """Print the snapshot table"""
+    now = datetime.utcnow()
+    rows = ContainerSnapshot.query.order_by(ContainerSnapshot.container_id).all()
+    print("Container | User             | Type       | Layer    | Age     | Commit  | Restores | Last Restore")
+    print("----------|------------------|------------|----------|---------|---------|----------|-------------")
+    for row in rows:
+        container = row.container
+        age = f"{(now - row.taken_at).total_seconds() / 60:6.0f}m"
+        commit = f"{row.seconds:6.1f}s" if row.seconds is not None else "      -"
+        restore = f"{row.restore_seconds:.1f}s" if row.restore_seconds is not None else "-"
+        print(f"{row.container_id:9d} | {container.owner.username:16s} | {container.image_type:10s} | "
+              f"{format_size(row.layer_bytes):>8s} | {age} | {commit} | {row.restores or 0:8d} | {restore}")
+    total = sum(row.layer_bytes for row in rows)
+    print(f"\n{len(rows)} snapshots, {format_size(total)} of writable layers")
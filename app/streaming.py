@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Streaming Iteration
+Memory-bounded iteration over database rows and Docker containers, so periodic
+jobs never hold the whole fleet in memory at once.
+"""
+
+import docker
+
+# Rows fetched per database window
+DB_WINDOW = 500
+
+# Containers fetched per Docker listing page
+DOCKER_PAGE = 200
+
+
+def iter_query(query, key_column, window=DB_WINDOW):
+    """
+    Iterate over a query in windows of `window` rows using keyset pagination on
+    `key_column` (a unique, sortable column such as the primary key). Only one
+    window is loaded at a time, and committing between rows is safe.
+    """
+    last_key = None
+    while True:
+        page = query
+        if last_key is not None:
+            page = page.filter(key_column > last_key)
+        rows = page.order_by(key_column).limit(window).all()
+        if not rows:
+            return
+        for row in rows:
+            yield row
+        last_key = getattr(rows[-1], key_column.key)
+        if len(rows) < window:
+            return
+
+
+def summarize(raw):
+    """
+    Reduce a raw /containers/json entry to the fields the pool tools use.
+    Returns: dict with id, name, state, labels and host_ports
+    """
+    host_ports = [port['PublicPort'] for port in raw.get('Ports') or [] if port.get('PublicPort')]
+    names = raw.get('Names') or ['']
+    return {
+        'id': raw['Id'],
+        'name': names[0].lstrip('/'),
+        'state': raw.get('State', ''),
+        'labels': raw.get('Labels') or {},
+        'host_ports': sorted(set(host_ports)),
+    }
+
+
+def iter_containers(client, filters=None, all=True, page_size=DOCKER_PAGE):
+    """
+    Iterate over container summaries page by page, newest first, using the Engine
+    API's limit and 'before' filter. Unlike client.containers.list(), this does not
+    inspect every container and never holds more than one page of raw JSON.
+
+    filters: Docker listing filters, e.g. {'label': ['pool=true']}
+    Yields: dicts from summarize()
+    """
+    seen = set()
+    before = None
+    while True:
+        page_filters = dict(filters or {})
+        if before:
+            page_filters['before'] = before
+        try:
+            page = client.api.containers(all=all, limit=page_size, filters=page_filters)
+        except docker.errors.NotFound:
+            # The page anchor was removed while listing; finish with one full listing
+            for raw in client.api.containers(all=all, filters=filters):
+                if raw['Id'] not in seen:
+                    yield summarize(raw)
+            return
+
+        for raw in page:
+            seen.add(raw['Id'])
+            yield summarize(raw)
+        if len(page) < page_size:
+            return
+        before = page[-1]['Id']
+
+
+def used_host_ports(client, start_port=None, end_port=None):
+    """Host ports published by any container, optionally limited to a range"""
+    used_ports = set()
+    for summary in iter_containers(client):
+        for port in summary['host_ports']:
+            if start_port is None or start_port <= port <= end_port:
+                used_ports.add(port)
+    return used_ports
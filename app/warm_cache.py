@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Warm Reassignment Cache
+A pool container its user stops is paused and kept for a while instead of being
+recreated for the pool. Relaunching the same type within the window gives the user
+back the very same container, port and mounted files with one unpause. The cache is
+an LRU bounded per user and overall, and gives way to the pool: warm containers are
+evicted when their window ends, when the cache is full, and when their type runs
+short of free containers. The entries are the WarmContainer table in app.py.
+"""
+
+from datetime import datetime, timedelta
+
+# Defaults for the "warm" section of pool_catalog.json
+# enabled:         keep stopped pool containers warm
+# window_minutes:  how long a stopped container stays warm
+# max_containers:  warm containers across all users
+# max_per_user:    warm containers per user
+# min_available:   evict warm containers of a type while fewer of its pool containers are free
+WARM_DEFAULTS = {
+    'enabled': True,
+    'window_minutes': 15,
+    'max_containers': 10,
+    'max_per_user': 2,
+    'min_available': 1,
+}
+
+
+def get_warm_settings(catalog):
+    """Warm cache settings from the catalog, filled in with defaults"""
+    settings = dict(WARM_DEFAULTS)
+    settings.update(catalog.warm)
+    return settings
+
+
+def warm_cutoff(settings, now=None):
+    """Release time before which a warm container has expired"""
+    return (now or datetime.utcnow()) - timedelta(minutes=settings['window_minutes'])
+
+
+def make_room(entries, user_id, settings):
+    """
+    Entries to evict before one more container of a user is kept warm, least recently
+    stopped first, so the user and the whole cache stay within their limits.
+    entries: current WarmContainer rows
+    Returns: list of entries to evict
+    """
+    ordered = sorted(entries, key=lambda e: e.released_at)
+    own = [e for e in ordered if e.user_id == user_id]
+    evict = own[:max(len(own) - settings['max_per_user'] + 1, 0)]
+    rest = [e for e in ordered if e not in evict]
+    evict.extend(rest[:max(len(rest) - settings['max_containers'] + 1, 0)])
+    return evict
+
+
+def hit_rate(counters):
+    """Share of launches served from the warm cache, from the metrics counters"""
+    hits = counters.get('warm.hits', 0)
+    total = hits + counters.get('warm.misses', 0)
+    return hits / total if total else 0.0
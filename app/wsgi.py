@@ -0,0 +1,16 @@
+#!/usr/bin/env python3
+"""
+WSGI Entry Point
+Production entry for gunicorn (settings in gunicorn.conf.py):
+
+    gunicorn -c gunicorn.conf.py wsgi:application
+
+With preload_app the master imports this module once, creating the schema before any
+worker starts; gunicorn.conf.py's post_fork hook then calls after_fork() in each worker.
+"""
+
+from app import create_app, init_db
+
+# Background threads are started per worker by after_fork(), not in the master
+application = create_app(background=False)
+init_db()
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Async API Benchmark
+Bulk API requests served by one process, through the Flask routes on a fixed pool of
+threads (how a gunicorn gthread worker runs them) and through the native handlers of
+asgi.py on one event loop. Both talk to the fake Docker Engine over a unix socket,
+with a delay on every Engine API call standing in for a busy daemon. Requests are
+called in-process, so the numbers leave out the HTTP server in front.
+
+    python benchmarks/bench_async.py
+    python benchmarks/bench_async.py --concurrency 10,100,500 --threads 16 --latency-ms 20
+
+Scenarios:
+- status:       POST /api/v1/containers/status for one container, as dashboards poll it
+- launch+stop:  each user launches one container from the pool, then stops it
+
+Launches that lose a race for a pool container are queued; a stop that frees a
+container then serves the queue (process_launch_queue) before it returns, which is
+why a stop can take much longer than the launches did.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+APP_DIR = BENCH_DIR.parent / 'app'
+
+
+def start_fake_docker(socket_path, seed, latency_ms):
+    """Run fake_docker.py in its own process so its threads do not share our GIL"""
+    process = subprocess.Popen([sys.executable, str(BENCH_DIR / 'fake_docker.py'), '--socket', socket_path,
+                                '--seed', str(seed), '--latency-ms', str(latency_ms)],
+                               stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + 10
+    while not os.path.exists(socket_path):
+        if time.monotonic() > deadline or process.poll() is not None:
+            raise RuntimeError('fake_docker.py did not start')
+        time.sleep(0.05)
+    return process
+
+
+def seed_users(web, users):
+    """
+    One user per assigned fake container, each with an API token.
+    Returns: list of (token, Container.id)
+    """
+    client = web.docker_client
+    assigned = client.containers.list(filters={'label': ['pool=true', 'status=assigned']})
+    accounts = []
+    with web.app.app_context():
+        for index, container in enumerate(assigned[:users]):
+            token = f"bench-token-{index}"
+            user = web.User(username=f"bench{index}", email=f"bench{index}@example.com", password_hash='x',
+                            api_token_hash=web.hash_api_token(token))
+            web.db.session.add(user)
+            web.db.session.flush()
+            row = web.Container(container_id=container.id, name=container.name, image_name='nginx:latest',
+                                image_type=container.labels['type'], status='running',
+                                host_port=int(container.name.rsplit('_', 1)[1]), container_port=80,
+                                from_pool=True, pool_name=container.name, user_id=user.id)
+            web.db.session.add(row)
+            web.db.session.flush()
+            accounts.append((token, row.id))
+        web.db.session.commit()
+    if len(accounts) < users:
+        print(f"[WARNING] Only {len(accounts)} assigned containers to seed users with")
+    return accounts
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+
+def run_sync(flask_app, calls, threads):
+    """
+    Run (method, path, token, body) calls on a thread pool through the Flask app.
+    Returns: tuple (seconds, latencies, responses) with (status, JSON body) responses
+    """
+    submitted = time.monotonic()
+
+    def call(request):
+        method, path, token, body = request
+        response = flask_app.test_client().open(path, method=method, json=body,
+                                                headers={'Authorization': f"Bearer {token}"})
+        return time.monotonic() - submitted, (response.status_code, response.get_json())
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        outcomes = list(executor.map(call, calls))
+    return time.monotonic() - submitted, [o[0] for o in outcomes], [o[1] for o in outcomes]
+
+
+async def call_asgi(application, method, path, token, body):
+    """One request through the ASGI app; returns (status, JSON body)"""
+    payload = json.dumps(body).encode() if body is not None else b''
+    scope = {'type': 'http', 'method': method, 'path': path, 'root_path': '', 'query_string': b'',
+             'headers': [(b'authorization', f"Bearer {token}".encode()), (b'content-type', b'application/json')],
+             'http_version': '1.1', 'scheme': 'http', 'server': ('localhost', 5000), 'client': ('127.0.0.1', 1)}
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': payload, 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    await application(scope, receive, send)
+    return messages[0]['status'], json.loads(b''.join(m.get('body', b'') for m in messages[1:]))
+
+
+def run_async(application, calls, client):
+    """
+    Run (method, path, token, body) calls concurrently through the ASGI app, then
+    close the Docker connections that belong to this event loop.
+    Returns: tuple (seconds, latencies, responses) with (status, JSON body) responses
+    """
+    async def main():
+        submitted = time.monotonic()
+
+        async def call(request):
+            response = await call_asgi(application, *request)
+            return time.monotonic() - submitted, response
+
+        outcomes = await asyncio.gather(*(call(request) for request in calls))
+        await client.close()
+        return time.monotonic() - submitted, [o[0] for o in outcomes], [o[1] for o in outcomes]
+
+    return asyncio.run(main())
+
+
+def report(label, seconds, latencies, responses):
+    """Print one result row; returns the responses"""
+    failed = sum(1 for status, _ in responses if status != 200)
+    queued = sum(1 for status, body in responses if status == 200
+                 for result in body.get('results', []) if result.get('status') == 'queued')
+    print(f"  {label:14s} {len(latencies) / seconds:9.0f}/s {statistics.median(latencies) * 1000:9.0f}ms "
+          f"{percentile(latencies, 0.95) * 1000:9.0f}ms {seconds:8.2f}s {failed:7d} {queued:7d}")
+    return responses
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sync (threads) vs async (asyncio) API request handling')
+    parser.add_argument('--concurrency', default='10,100,500', help='Requests in flight at once, comma-separated')
+    parser.add_argument('--threads', type=int, default=16, help='Threads of the sync path (one worker process)')
+    parser.add_argument('--latency-ms', type=float, default=20, help='Fake Docker delay per API call')
+    parser.add_argument('--launches', type=int, default=50, help='Users launching at once in launch+stop')
+    args = parser.parse_args()
+    levels = [int(level) for level in args.concurrency.split(',')]
+    users = max(levels + [args.launches])
+
+    with tempfile.TemporaryDirectory() as workdir:
+        socket_path = f"{workdir}/docker.sock"
+        # Half of the seeded containers are assigned: one per user, the rest is the pool
+        fake = start_fake_docker(socket_path, seed=users * 2 + args.launches * 8, latency_ms=args.latency_ms)
+        os.environ.update({
+            'DOCKER_HOST': f"unix://{socket_path}",
+            'DATABASE_URL': f"sqlite:///{workdir}/bench.db",
+            'POOL_METRICS': f"{workdir}/metrics.json",
+            'DEMAND_TRACE': f"{workdir}/trace.log",
+            'UPLOAD_FOLDER': f"{workdir}/user_files",
+            'ASGI_THREADS': str(args.threads),
+        })
+        sys.path.insert(0, str(APP_DIR))
+        try:
+            import app as web
+            import asgi
+            accounts = seed_users(web, users)
+
+            print(f"Fake Docker: {args.latency_ms:.0f} ms per call; sync path: {args.threads} threads")
+            header = f"  {'Path':14s} {'Requests':>11s} {'p50':>11s} {'p95':>11s} {'Total':>9s} {'Errors':>7s} {'Queued':>7s}"
+            print()
+            print("status (one container per request)")
+            print(header)
+            for level in levels:
+                calls = [('POST', '/api/v1/containers/status', token, {'ids': [container_id]})
+                         for token, container_id in accounts[:level]]
+                report(f"sync x{level}", *run_sync(web.app, calls, args.threads))
+                report(f"async x{level}", *run_async(asgi.application, calls, asgi.docker))
+
+            print()
+            print(f"launch+stop ({args.launches} users at once)")
+            print(header)
+            tokens = [token for token, _ in accounts[:args.launches]]
+            for label, runner in (('sync', lambda calls: run_sync(web.app, calls, args.threads)),
+                                  ('async', lambda calls: run_async(asgi.application, calls, asgi.docker))):
+                launch = [('POST', '/api/v1/containers/launch', token, {'items': [{'image_type': 'nginx'}]})
+                          for token in tokens]
+                responses = report(f"{label} launch", *runner(launch))
+                stop = [('POST', '/api/v1/containers/stop', token, {'ids': [body['results'][0]['container']['id']]})
+                        for token, (status, body) in zip(tokens, responses)
+                        if status == 200 and body['results'][0]['status'] == 'launched']
+                if stop:
+                    report(f"{label} stop", *runner(stop))
+        finally:
+            fake.terminate()
+            fake.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Startup Benchmark
+Wall time from process start to useful work for the web app and both CLIs, measured
+in fresh interpreters against the fake Docker Engine (with per-call latency) and
+against an unreachable daemon. Each target does something that needs no Docker, so
+the numbers show what importing app.py costs the tools that only need the database.
+
+    python benchmarks/bench_startup.py --runs 10
+    python benchmarks/bench_startup.py --app-dir /tmp/old-checkout/app   # compare a checkout
+
+Targets:
+- web app:            import app, build it and serve GET /login through the test client
+- pool_manager.py:    --metrics (reads the metrics file)
+- container_monitor:  --shard-status (reads the shard table)
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+APP_DIR = BENCH_DIR.parent / 'app'
+sys.path.insert(0, str(BENCH_DIR))
+
+from fake_docker import FakeEngine, start_in_thread
+
+# Works with checkouts from before create_app() existed
+WEB_APP = (
+    "import app as web\n"
+    "application = web.create_app(background=False) if hasattr(web, 'create_app') else web.app\n"
+    "assert application.test_client().get('/login').status_code == 200\n"
+)
+
+INIT_DB = (
+    "import app as web\n"
+    "if hasattr(web, 'create_app'):\n"
+    "    web.create_app(background=False)\n"
+    "web.init_db()\n"
+)
+
+TARGETS = [
+    ('python (interpreter only)', ['-c', 'pass']),
+    ('web app (first request)', ['-c', WEB_APP]),
+    ('pool_manager.py --metrics', ['pool_manager.py', '--metrics']),
+    ('container_monitor.py --shard-status', ['container_monitor.py', '--shard-status']),
+]
+
+
+def run_once(app_dir, args, env):
+    """Seconds one command takes; raises when it fails"""
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable] + args, cwd=app_dir, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    elapsed = time.perf_counter() - started
+    if result.returncode != 0:
+        raise RuntimeError(f"{' '.join(args[:2])[:60]} exited with {result.returncode}: {result.stderr[-500:]}")
+    return elapsed
+
+
+def bench(app_dir, env, runs):
+    """
+    Median, min and max seconds per target.
+    Returns: list of (label, median, min, max), or (label, error) when a target fails
+    """
+    results = []
+    for label, args in TARGETS:
+        try:
+            times = [run_once(app_dir, args, env) for _ in range(runs)]
+        except RuntimeError as e:
+            results.append((label, str(e).strip().splitlines()[-1]))
+            continue
+        results.append((label, statistics.median(times), min(times), max(times)))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Startup time of the web app and CLI tools')
+    parser.add_argument('--app-dir', default=str(APP_DIR), help='app/ directory to benchmark')
+    parser.add_argument('--runs', type=int, default=5, help='Runs per target and scenario')
+    parser.add_argument('--latency-ms', type=float, default=50, help='Fake Docker delay per API call')
+    args = parser.parse_args()
+
+    app_dir = Path(args.app_dir).resolve()
+    engine = FakeEngine(latency=args.latency_ms / 1000)
+    engine.seed(20)
+    server, url = start_in_thread(engine)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        env = dict(os.environ)
+        env.update({
+            'DATABASE_URL': f"sqlite:///{workdir}/startup.db",
+            'POOL_METRICS': f"{workdir}/metrics.json",
+            'DEMAND_TRACE': f"{workdir}/trace.log",
+            'MONITOR_LOG': f"{workdir}/monitor.log",
+            'UPLOAD_FOLDER': f"{workdir}/user_files",
+            'PYTHONDONTWRITEBYTECODE': '1',
+        })
+        run_once(app_dir, ['-c', INIT_DB], dict(env, DOCKER_HOST=url))
+
+        scenarios = [
+            (f"Docker up ({args.latency_ms:.0f} ms per call)", dict(env, DOCKER_HOST=url)),
+            ("Docker unreachable", dict(env, DOCKER_HOST='tcp://127.0.0.1:1')),
+        ]
+        print(f"App: {app_dir}")
+        print(f"Runs per target: {args.runs}")
+        for name, scenario_env in scenarios:
+            print()
+            print(name)
+            print(f"  {'Target':38s} {'Median':>9s} {'Min':>9s} {'Max':>9s}")
+            print("  " + "-" * 68)
+            for label, *timing in bench(app_dir, scenario_env, args.runs):
+                if len(timing) == 1:
+                    print(f"  {label:38s} [FAILED] {timing[0][:80]}")
+                    continue
+                median, fastest, slowest = timing
+                print(f"  {label:38s} {median * 1000:7.0f}ms {fastest * 1000:7.0f}ms {slowest * 1000:7.0f}ms")
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
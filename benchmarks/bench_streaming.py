@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Streaming Benchmark
+Compares peak Python memory and run time of loading the whole fleet at once against
+the windowed / paged iteration used by the monitor and pool_manager.py.
+
+Runs against the fake Docker Engine and a throwaway SQLite database:
+    python benchmarks/bench_streaming.py --containers 5000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR))
+sys.path.insert(0, str(BENCH_DIR.parent / 'app'))
+
+from fake_docker import FakeEngine, start_in_thread
+
+
+def measure(label, func):
+    """Run func and report its peak traced memory and duration"""
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {label:44s} {peak / 1024 / 1024:8.2f} MB {elapsed:8.2f}s   -> {result}")
+    return peak, elapsed
+
+
+def seed_database(db, User, Container, count):
+    """Insert `count` container rows spread over 100 users"""
+    users = [User(username=f"bench{i}", email=f"bench{i}@example.com", password_hash='x') for i in range(100)]
+    db.session.add_all(users)
+    db.session.commit()
+    db.session.bulk_insert_mappings(Container, [{
+        'container_id': f"{i:064x}",
+        'name': f"bench-{i}",
+        'image_name': 'nginx:alpine',
+        'image_type': 'nginx',
+        'status': 'running',
+        'host_port': 8000 + i,
+        'container_port': 80,
+        'pool_name': f"pool_nginx_{i}_{8000 + i}",
+        'user_id': users[i % len(users)].id,
+    } for i in range(count)])
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Memory benchmark for fleet iteration')
+    parser.add_argument('--containers', type=int, default=5000)
+    args = parser.parse_args()
+
+    engine = FakeEngine()
+    engine.seed(args.containers)
+    server, base_url = start_in_thread(engine)
+
+    workdir = tempfile.mkdtemp(prefix='bench-streaming-')
+    os.environ['DOCKER_HOST'] = base_url
+    os.environ['DATABASE_URL'] = f"sqlite:///{workdir}/bench.db"
+    os.environ.setdefault('POOL_METRICS', f"{workdir}/metrics.json")
+
+    import docker
+    from app import create_app, db, User, Container
+    app = create_app(background=False)
+    from streaming import iter_query, iter_containers, used_host_ports
+
+    client = docker.DockerClient(base_url=base_url)
+
+    print(f"Docker listing ({args.containers} containers)")
+    measure("containers.list(all=True)", lambda: len(client.containers.list(all=True)))
+    measure("iter_containers()", lambda: sum(1 for _ in iter_containers(client)))
+    measure("used ports, containers.list()", lambda: len({
+        int(b['HostPort'])
+        for c in client.containers.list(all=True)
+        for bindings in (c.ports or {}).values() for b in bindings or []
+    }))
+    measure("used ports, used_host_ports()", lambda: len(used_host_ports(client)))
+
+    with app.app_context():
+        db.create_all()
+        seed_database(db, User, Container, args.containers)
+        db.session.expunge_all()
+
+        print(f"Database rows ({args.containers} containers)")
+
+        def load_all():
+            count = sum(1 for _ in Container.query.all())
+            db.session.expunge_all()
+            return count
+
+        def load_windows():
+            count = sum(1 for _ in iter_query(Container.query, Container.id))
+            db.session.expunge_all()
+            return count
+
+        measure("Container.query.all()", load_all)
+        measure("iter_query(Container.query)", load_windows)
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,455 @@
+#!/usr/bin/env python3
+"""
+Chaos and Recovery-Time Harness
+Breaks a share of the assigned and pool containers at once (kill, remove or OOM),
+lets a container_monitor.py worker recover them, and reports per scenario how long
+the monitor took to notice and to recover, how many users got a new port and
+whether uploaded files survived. Exits non-zero when anything was not recovered or
+lost its files, so it can run in CI and the numbers tracked over releases (--json).
+
+Runs against the fake Docker Engine by default, with a throwaway database. With
+--docker local it uses the daemon of DOCKER_HOST and really kills containers: run
+it on a disposable VM with a pool created by pool_manager.py --init only.
+
+    python benchmarks/chaos_harness.py
+    python benchmarks/chaos_harness.py --scenarios kill,remove --assigned 0.5 --pool 0.2
+    python benchmarks/chaos_harness.py --json recovery-$(git rev-parse --short HEAD).json
+    python benchmarks/chaos_harness.py --docker local --containers 6 --interval 10 --yes
+
+Faults:
+- kill:    SIGKILL of the main process (exit code 137)
+- remove:  container deleted, as with docker rm -f
+- oom:     killed by the OOM killer (local: PID 1 made the OOM killer's first choice,
+           then the memory limit is filled; fake engine: marked OOMKilled)
+Scenario "mixed" draws one fault per container; "mass" removes most assigned
+containers at once, which takes the monitor's parallel mass-recovery path.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+APP_DIR = BENCH_DIR.parent / 'app'
+sys.path.insert(0, str(BENCH_DIR))
+sys.path.insert(0, str(APP_DIR))
+
+from fake_docker import FakeEngine, start_in_thread
+
+FAULTS = ('kill', 'remove', 'oom')
+
+# Scenario -> (faults drawn from, minimum share of assigned containers hit)
+SCENARIOS = {
+    'kill': (('kill',), 0.0),
+    'remove': (('remove',), 0.0),
+    'oom': (('oom',), 0.0),
+    'mixed': (FAULTS, 0.0),
+    # Above container_monitor.MASS_LOSS_FRACTION
+    'mass': (('remove',), 0.6),
+}
+
+
+class FakeBackend:
+    """Fake Engine served from this process; faults change its state directly"""
+
+    name = 'fake'
+
+    def __init__(self, pool_size, latency=0.0):
+        self.engine = FakeEngine(latency=latency)
+        self.engine.seed(pool_size, assigned_fraction=0)
+        self.server, self.base_url = start_in_thread(self.engine)
+
+    def inject(self, container_id, fault):
+        with self.engine.lock:
+            container = self.engine.containers.get(container_id)
+            if container is None:
+                return
+            if fault == 'remove':
+                del self.engine.containers[container_id]
+            else:
+                container['State'] = 'exited'
+                container['ExitCode'] = 137
+                container['OOMKilled'] = fault == 'oom'
+
+    def close(self):
+        self.server.shutdown()
+
+
+class LocalBackend:
+    """Docker daemon of DOCKER_HOST; faults are real kills, removals and OOM kills"""
+
+    name = 'local'
+
+    def __init__(self):
+        import docker
+        self.docker = docker
+        self.client = docker.from_env()
+        self.base_url = os.environ.get('DOCKER_HOST', 'unix:///var/run/docker.sock')
+
+    def inject(self, container_id, fault):
+        try:
+            container = self.client.containers.get(container_id)
+            if fault == 'remove':
+                container.remove(force=True)
+            elif fault == 'kill':
+                container.kill()
+            else:
+                # Make PID 1 the OOM killer's first choice, then fill the memory limit
+                result = container.exec_run(['sh', '-c', 'echo 1000 > /proc/1/oom_score_adj'])
+                if result.exit_code != 0:
+                    print(f"[WARNING] Cannot raise oom_score_adj in {container.name}, killing it instead")
+                    container.kill()
+                    return
+                container.exec_run(['sh', '-c', 'exec tail /dev/zero'], detach=True)
+        except self.docker.errors.APIError as e:
+            print(f"[WARNING] Could not inject {fault} into {container_id[:12]}: {e}")
+
+    def close(self):
+        self.client.close()
+
+
+def write_catalog(workdir, interval):
+    """Copy the catalog with a fast monitor and without pool moves or lease reclaim"""
+    with open(APP_DIR / 'pool_catalog.json') as f:
+        data = json.load(f)
+    data['monitor'] = {'shards': 4, 'lease_seconds': interval * 3, 'interval_seconds': interval}
+    data['rebalance']['enabled'] = False
+    data['leases']['enabled'] = False
+    path = Path(workdir) / 'pool_catalog.json'
+    path.write_text(json.dumps(data, indent=2))
+    return path
+
+
+def prepare_environment(workdir, base_url, interval):
+    """Point the app, and the monitor started later, at the backend and a throwaway database"""
+    env = {
+        'DOCKER_HOST': base_url,
+        'DATABASE_URL': f"sqlite:///{workdir}/chaos.db",
+        'POOL_CATALOG': str(write_catalog(workdir, interval)),
+        'POOL_METRICS': f"{workdir}/metrics.json",
+        'DEMAND_TRACE': f"{workdir}/demand.log",
+        'MONITOR_LOG': f"{workdir}/monitor.log",
+        'UPLOAD_FOLDER': f"{workdir}/user_files",
+        'RESOURCE_STATS': f"{workdir}/resource_stats.json",
+    }
+    os.environ.update(env)
+    return dict(os.environ)
+
+
+def file_digest(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def seed_assigned(web, count, files_share):
+    """
+    Assign pool containers to harness users through the app, the first files_share
+    of them with an uploaded index.html mounted.
+    Returns: dict Container.id -> sha256 of its uploaded file, or None without files
+    """
+    catalog = web.get_catalog()
+    types = [t for t in catalog.pool_types() if web.count_available(t)]
+    files = {}
+    with web.app.app_context():
+        for index in range(count):
+            image_type = types[index % len(types)]
+            user = web.User(username=f"chaos{index}", email=f"chaos{index}@example.com", password_hash='x')
+            web.db.session.add(user)
+            web.db.session.flush()
+            row = web.Container(container_id=f"pending-{index}", name=f"chaos{index}",
+                                image_name=catalog.images[image_type]['name'], image_type=image_type,
+                                status='starting', host_port=0, container_port=catalog.images[image_type]['port'],
+                                user_id=user.id)
+            web.db.session.add(row)
+            web.db.session.flush()
+
+            with_files = index < count * files_share and catalog.specs[image_type].get('mount_point')
+            if with_files:
+                path = web.get_user_files_path(user.id, row.id) / 'index.html'
+                path.write_text(f"<h1>chaos{index} {random.random()}</h1>\n")
+                files[row.id] = file_digest(path)
+            else:
+                files[row.id] = None
+
+            container_id, host_port, status, pool_name = web.assign_container_from_pool(
+                image_type, row.name, user.id, mount_files=bool(with_files), db_container_id=row.id)
+            if not container_id:
+                print(f"[ERROR] Could not assign a {image_type} container: {status}")
+                web.db.session.rollback()
+                break
+            row.container_id = container_id
+            row.host_port = host_port
+            row.status = status
+            row.pool_name = pool_name
+            row.has_custom_files = bool(with_files)
+            web.db.session.commit()
+    return files
+
+
+def release_assigned(web):
+    """Give the harness's containers back to the pool (local backend)"""
+    with web.app.app_context():
+        for row in web.Container.query.all():
+            if row.pool_name:
+                web.release_container_to_pool(row.container_id, row.pool_name)
+
+
+def start_monitor(env, interval):
+    return subprocess.Popen([sys.executable, str(APP_DIR / 'container_monitor.py'), '--worker', '--name', 'chaos',
+                             '--interval', str(interval)],
+                            env=env, cwd=APP_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def wait_for_monitor(web, timeout=60):
+    """Wait until the monitor worker holds its shard leases"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with web.app.app_context():
+            if web.db.session.query(web.MonitorWorker).count():
+                return True
+        time.sleep(0.2)
+    return False
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else None
+
+
+def docker_states(streaming, client):
+    """Container id -> summary, and running container names, from one listing"""
+    summaries = {s['id']: s for s in streaming.iter_containers(client)}
+    return summaries, {s['name'] for s in summaries.values() if s['state'] == 'running'}
+
+
+def run_scenario(name, backend, web, files, args, rng):
+    """Inject one scenario's faults and measure the recovery; returns a result dict"""
+    import streaming
+    client = web.docker_client
+    fault_kinds, min_share = SCENARIOS[name]
+
+    with web.app.app_context():
+        rows = {row.id: {'container_id': row.container_id, 'host_port': row.host_port, 'name': row.pool_name}
+                for row in web.Container.query.filter_by(status='running').all()}
+    available = [s for s in streaming.iter_containers(
+        client, filters={'label': ['pool=true', 'status=available'], 'status': 'running'}, all=False)]
+    hit_rows = rng.sample(sorted(rows), round(len(rows) * max(args.assigned, min_share)))
+    hit_pool = rng.sample(available, round(len(available) * args.pool))
+    plan = ([(rows[row_id]['container_id'], rng.choice(fault_kinds)) for row_id in hit_rows]
+            + [(summary['id'], rng.choice(fault_kinds)) for summary in hit_pool])
+
+    fault_at = datetime.now()
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        list(executor.map(lambda target: backend.inject(*target), plan))
+    injected = time.monotonic() - started
+
+    # A target counts as recovered once it was seen down and is running again
+    down = set()
+    recovered = {}
+    targets = len(hit_rows) + len(hit_pool)
+    deadline = started + args.timeout
+    while len(recovered) < targets and time.monotonic() < deadline:
+        time.sleep(args.poll)
+        summaries, running_names = docker_states(streaming, client)
+        with web.app.app_context():
+            current = {row.id: row for row in web.Container.query.filter(web.Container.id.in_(hit_rows)).all()}
+            for row_id in hit_rows:
+                row = current.get(row_id)
+                key = ('assigned', row_id)
+                if row is None or key in recovered:
+                    continue
+                # Recovery may restart the container or replace it with a new one
+                if row.container_id != rows[row_id]['container_id']:
+                    down.add(key)
+                if summaries.get(row.container_id, {}).get('state') != 'running':
+                    down.add(key)
+                elif key in down and row.status == 'running':
+                    recovered[key] = time.monotonic() - started
+        for summary in hit_pool:
+            key = ('pool', summary['name'])
+            if key in recovered:
+                continue
+            if summary['name'] not in running_names:
+                down.add(key)
+            elif key in down:
+                recovered[key] = time.monotonic() - started
+
+    # Detected: the first monitor log line about the container (or the mass loss)
+    markers = {('assigned', row_id): [f"Container {row_id} (user:", f"Pool container {rows[row_id]['name']} is",
+                                      'Mass loss detected'] for row_id in hit_rows}
+    markers.update({('pool', summary['name']): [f"Pool container {summary['name']} is"] for summary in hit_pool})
+    detected = monitor_detections(os.environ['MONITOR_LOG'], fault_at, markers)
+    detect = list(detected.values())
+
+    ports_changed = 0
+    data_lost = 0
+    with web.app.app_context():
+        for row_id in hit_rows:
+            row = web.db.session.get(web.Container, row_id)
+            if row.host_port != rows[row_id]['host_port']:
+                ports_changed += 1
+            if files.get(row_id) and not files_intact(web, client, row, files[row_id]):
+                data_lost += 1
+
+    recover_times = list(recovered.values())
+    return {
+        'scenario': name,
+        'assigned_hit': len(hit_rows),
+        'pool_hit': len(hit_pool),
+        'inject_seconds': round(injected, 3),
+        'detect_p50': percentile(detect, 0.5),
+        'detect_max': max(detect) if detect else None,
+        'recover_p50': percentile(recover_times, 0.5),
+        'recover_p95': percentile(recover_times, 0.95),
+        'recover_max': max(recover_times) if recover_times else None,
+        'recovered': len(recovered),
+        'not_recovered': targets - len(recovered),
+        'ports_changed': ports_changed,
+        'files_checked': sum(1 for row_id in hit_rows if files.get(row_id)),
+        'data_lost': data_lost,
+    }
+
+
+def monitor_detections(log_path, since, markers):
+    """
+    Seconds from `since` to the first monitor log line containing one of each key's markers.
+    Returns: dict key -> seconds, for the keys that were mentioned
+    """
+    detected = {}
+    with open(log_path, errors='replace') as f:
+        for line in f:
+            try:
+                at = datetime.strptime(line[:23], '%Y-%m-%d %H:%M:%S,%f')
+            except ValueError:
+                continue
+            if at < since:
+                continue
+            for key, texts in markers.items():
+                if key not in detected and any(text in line for text in texts):
+                    detected[key] = (at - since).total_seconds()
+    return detected
+
+
+def files_intact(web, client, row, digest):
+    """Whether the recovered container mounts the user's files and they are unchanged"""
+    path = Path(web.app.config['UPLOAD_FOLDER']) / str(row.user_id) / f"container_{row.id}"
+    try:
+        binds = client.api.inspect_container(row.container_id)['HostConfig'].get('Binds') or []
+    except Exception:
+        return False
+    mounted = any(bind.split(':', 1)[0] == str(path) for bind in binds)
+    return mounted and (path / 'index.html').exists() and file_digest(path / 'index.html') == digest
+
+
+def seconds(value):
+    return f"{value:.1f}s" if value is not None else '-'
+
+
+def report(results):
+    print()
+    print(f"  {'Scenario':9s} {'Hit':>9s} {'Detect p50/max':>15s} {'Recover p50/p95/max':>22s} "
+          f"{'Recovered':>10s} {'Ports':>6s} {'Data lost':>10s}")
+    print(f"  {'':9s} {'asg/pool':>9s} {'':>15s} {'':>22s} {'':>10s} {'moved':>6s} {'':>10s}")
+    for r in results:
+        hit = f"{r['assigned_hit']}/{r['pool_hit']}"
+        detect = f"{seconds(r['detect_p50'])}/{seconds(r['detect_max'])}"
+        recover = f"{seconds(r['recover_p50'])}/{seconds(r['recover_p95'])}/{seconds(r['recover_max'])}"
+        total = r['recovered'] + r['not_recovered']
+        lost = f"{r['data_lost']}/{r['files_checked']}"
+        print(f"  {r['scenario']:9s} {hit:>9s} {detect:>15s} {recover:>22s} "
+              f"{r['recovered']:>4d}/{total:<5d} {r['ports_changed']:>6d} {lost:>10s}")
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCH_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Inject container faults and measure monitor recovery')
+    parser.add_argument('--docker', choices=['fake', 'local'], default='fake', help='Backend (default: fake)')
+    parser.add_argument('--scenarios', default='kill,remove,oom,mixed,mass',
+                        help=f"Comma-separated, from {', '.join(SCENARIOS)}")
+    parser.add_argument('--containers', type=int, default=40, help='Containers assigned to harness users')
+    parser.add_argument('--pool-size', type=int, default=120, help='Fake engine pool containers')
+    parser.add_argument('--assigned', type=float, default=0.25, help='Share of assigned containers hit')
+    parser.add_argument('--pool', type=float, default=0.1, help='Share of available pool containers hit')
+    parser.add_argument('--files', type=float, default=0.5, help='Share of assigned containers with uploaded files')
+    parser.add_argument('--interval', type=float, default=2, help='Monitor cycle interval (seconds)')
+    parser.add_argument('--timeout', type=float, default=None,
+                        help='Seconds to wait for recovery per scenario (default: 10 monitor intervals)')
+    parser.add_argument('--poll', type=float, default=0.1, help='Seconds between recovery checks')
+    parser.add_argument('--latency-ms', type=float, default=0, help='Fake Docker delay per API call')
+    parser.add_argument('--seed', type=int, default=1, help='Random seed for target selection')
+    parser.add_argument('--json', help='Write the results to this file')
+    parser.add_argument('--yes', action='store_true', help='Confirm breaking containers of the local daemon')
+    args = parser.parse_args()
+
+    args.timeout = args.timeout or args.interval * 10
+    scenarios = args.scenarios.split(',')
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario: {', '.join(unknown)}")
+    if args.docker == 'local' and not args.yes:
+        parser.error('--docker local kills and removes real containers; pass --yes on a disposable host')
+
+    backend = FakeBackend(args.pool_size, args.latency_ms / 1000) if args.docker == 'fake' else LocalBackend()
+    workdir = tempfile.mkdtemp(prefix='chaos-')
+    env = prepare_environment(workdir, backend.base_url, args.interval)
+
+    import app as web
+    web.create_app(background=False)
+    web.init_db()
+    files = seed_assigned(web, args.containers, args.files)
+    print(f"[OK] {backend.name} Docker at {backend.base_url}: {len(files)} assigned containers "
+          f"({sum(1 for d in files.values() if d)} with files); work directory {workdir}")
+
+    monitor = start_monitor(env, args.interval)
+    results = []
+    try:
+        if not wait_for_monitor(web):
+            print(f"[ERROR] Monitor did not start, see {env['MONITOR_LOG']}")
+            sys.exit(1)
+        rng = random.Random(args.seed)
+        for name in scenarios:
+            print(f"Scenario {name}...", flush=True)
+            results.append(run_scenario(name, backend, web, files, args, rng))
+            # Let the monitor finish its cycle before the next scenario
+            time.sleep(args.interval)
+    finally:
+        monitor.terminate()
+        monitor.wait()
+        if args.docker == 'local':
+            release_assigned(web)
+        backend.close()
+
+    report(results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'revision': git_revision(), 'backend': backend.name, 'at': datetime.utcnow().isoformat(),
+                       'settings': {k: v for k, v in vars(args).items() if k not in ('json', 'yes')},
+                       'scenarios': results}, f, indent=2)
+        print(f"\n[OK] Results written to {args.json}")
+
+    failures = sum(r['not_recovered'] + r['data_lost'] for r in results)
+    if failures:
+        print(f"\n[FAILED] {failures} containers not recovered or lost their files (monitor log: {env['MONITOR_LOG']})")
+        sys.exit(1)
+    print("\n[OK] Everything recovered with its files")
+
+
+if __name__ == '__main__':
+    main()
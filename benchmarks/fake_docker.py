@@ -0,0 +1,467 @@
+#!/usr/bin/env python3
+"""
+Fake Docker Engine API
+A small in-memory stand-in for the Docker daemon, speaking enough of the Engine API
+for docker-py to list, inspect, create, start, stop, rename, remove and commit containers
+and read their stats. Used by the benchmarks to exercise the pool tools at fleet sizes a
+development VM cannot run.
+
+Usage:
+    python fake_docker.py --port 2375 --seed 5000          # DOCKER_HOST=tcp://127.0.0.1:2375
+    python fake_docker.py --socket /tmp/fake-docker.sock   # DOCKER_HOST=unix:///tmp/fake-docker.sock
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import re
+import socket
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+API_VERSION = '1.41'
+
+# Pool types seeded by --seed, with their container port and first host port
+SEED_TYPES = {
+    'nginx': (80, 8000),
+    'apache': (80, 8100),
+    'python': (8000, 8200),
+    'node': (3000, 8300),
+}
+
+
+class FakeEngine:
+    """In-memory container store shared by all request handler threads"""
+
+    def __init__(self, latency=0.0, memory=2 * 1024 ** 3, cpus=2):
+        self.lock = threading.Lock()
+        self.containers = {}
+        self.images = {}
+        self.sequence = itertools.count(1)
+        self.latency = latency
+        self.memory = memory
+        self.cpus = cpus
+        self.requests = 0
+
+    def new_id(self, name):
+        return hashlib.sha256(f"{name}-{time.time_ns()}-{next(self.sequence)}".encode()).hexdigest()
+
+    def create(self, name, body):
+        """Create a container from a /containers/create body"""
+        with self.lock:
+            if name and any(c['Name'] == name for c in self.containers.values()):
+                return None, f'Conflict. The container name "/{name}" is already in use'
+            container_id = self.new_id(name)
+            host_config = body.get('HostConfig') or {}
+            self.containers[container_id] = {
+                'Id': container_id,
+                'Name': name or container_id[:12],
+                'Image': body.get('Image', ''),
+                'Labels': body.get('Labels') or {},
+                'Cmd': body.get('Cmd'),
+                'PortBindings': host_config.get('PortBindings') or {},
+                'Binds': host_config.get('Binds') or [],
+                'Memory': host_config.get('Memory', 0),
+                'NanoCpus': host_config.get('NanoCpus', 0),
+                'CpuQuota': host_config.get('CpuQuota', 0),
+                'State': 'created',
+                'SizeRw': 0,
+                'Created': int(time.time()),
+                'Order': next(self.sequence),
+            }
+            return container_id, None
+
+    def seed(self, count, assigned_fraction=0.5):
+        """Create `count` running pool containers spread over the seed types"""
+        types = list(SEED_TYPES)
+        for index in range(count):
+            image_type = types[index % len(types)]
+            container_port, base_port = SEED_TYPES[image_type]
+            pool_index = index // len(types)
+            # Past 100 per type the type ranges would overlap, so use a separate port block
+            host_port = base_port + pool_index if pool_index < 100 else 20000 + index
+            status = 'assigned' if index < count * assigned_fraction else 'available'
+            name = f"pool_{image_type}_{pool_index}_{host_port}"
+            container_id, _ = self.create(name, {
+                'Image': f"{image_type}:latest",
+                'Labels': {'pool': 'true', 'type': image_type, 'status': status, 'pool_index': str(pool_index)},
+                'HostConfig': {'PortBindings': {f"{container_port}/tcp": [{'HostIp': '', 'HostPort': str(host_port)}]}},
+            })
+            self.containers[container_id]['State'] = 'running'
+
+    def used_ports(self, exclude=None):
+        ports = set()
+        for container in self.containers.values():
+            if container['State'] in ('running', 'paused') and container['Id'] != exclude:
+                ports.update(host_ports(container))
+        return ports
+
+    def start(self, container_id):
+        with self.lock:
+            container = self.containers[container_id]
+            if container['State'] == 'running':
+                return None
+            clash = set(host_ports(container)) & self.used_ports(exclude=container_id)
+            if clash:
+                return f"Bind for 0.0.0.0:{min(clash)} failed: port is already allocated"
+            container.update(State='running', ExitCode=0, OOMKilled=False)
+            return None
+
+    def commit(self, container, repository, tag, conf):
+        """Image of a container's writable layer, tagged repository:tag (moving the tag)"""
+        with self.lock:
+            name = f"{repository}:{tag or 'latest'}"
+            parent = self.image(container['Image'])
+            for image in self.images.values():
+                if name in image['RepoTags']:
+                    image['RepoTags'].remove(name)
+            labels = dict(container['Labels'])
+            labels.update((conf or {}).get('Labels') or {})
+            image_id = f"sha256:{self.new_id(name)}"
+            self.images[image_id] = {
+                'Id': image_id,
+                'RepoTags': [name],
+                'Labels': labels,
+                'Parent': parent['Id'] if parent else '',
+                'Size': (parent['Size'] if parent else 0) + container['SizeRw'],
+                'Created': int(time.time()),
+            }
+            return image_id
+
+    def image(self, ref):
+        """Look up a committed image by id or tag"""
+        if ref in self.images:
+            return self.images[ref]
+        for image in self.images.values():
+            if ref in image['RepoTags']:
+                return image
+        return None
+
+    def find(self, ref):
+        """Look up a container by full id, id prefix or name"""
+        if ref in self.containers:
+            return self.containers[ref]
+        for container in self.containers.values():
+            if container['Name'] == ref.lstrip('/') or container['Id'].startswith(ref):
+                return container
+        return None
+
+
+def host_ports(container):
+    ports = []
+    for bindings in container['PortBindings'].values():
+        for binding in bindings or []:
+            if binding.get('HostPort'):
+                ports.append(int(binding['HostPort']))
+    return ports
+
+
+def summary(container, size=False):
+    """Entry of GET /containers/json"""
+    ports = []
+    for port, bindings in container['PortBindings'].items():
+        private, proto = port.split('/')
+        for binding in bindings or []:
+            entry = {'PrivatePort': int(private), 'Type': proto}
+            if container['State'] in ('running', 'paused') and binding.get('HostPort'):
+                entry.update({'IP': '0.0.0.0', 'PublicPort': int(binding['HostPort'])})
+            ports.append(entry)
+    entry = {
+        'Id': container['Id'],
+        'Names': [f"/{container['Name']}"],
+        'Image': container['Image'],
+        'Created': container['Created'],
+        'Labels': container['Labels'],
+        'State': container['State'],
+        'Status': {'running': 'Up', 'paused': 'Up (Paused)'}.get(container['State'], 'Exited (0)'),
+        'Ports': ports,
+    }
+    if size:
+        entry['SizeRw'] = container['SizeRw']
+    return entry
+
+
+def inspect(container):
+    """Body of GET /containers/{id}/json"""
+    running = container['State'] == 'running'
+    network_ports = {}
+    for port, bindings in container['PortBindings'].items():
+        network_ports[port] = [{'HostIp': '0.0.0.0', 'HostPort': b['HostPort']} for b in bindings or []] if running else None
+    return {
+        'Id': container['Id'],
+        'Name': f"/{container['Name']}",
+        'Image': f"sha256:{hashlib.sha256(container['Image'].encode()).hexdigest()}",
+        'Created': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(container['Created'])),
+        'State': {'Status': container['State'], 'Running': running, 'ExitCode': container.get('ExitCode', 0),
+                  'OOMKilled': container.get('OOMKilled', False)},
+        'Config': {'Image': container['Image'], 'Labels': container['Labels'], 'Cmd': container['Cmd']},
+        'HostConfig': {
+            'Binds': container['Binds'],
+            'PortBindings': container['PortBindings'],
+            'Memory': container['Memory'],
+            'NanoCpus': container['NanoCpus'],
+            'CpuQuota': container['CpuQuota'],
+        },
+        'NetworkSettings': {'Ports': network_ports},
+    }
+
+
+def parse_filters(raw):
+    """Decode the filters query parameter into dict name -> list of values"""
+    if not raw:
+        return {}
+    filters = json.loads(raw)
+    return {name: list(values) if isinstance(values, (list, dict)) else [values]
+            for name, values in filters.items()}
+
+
+def stats(container):
+    """One-shot stats with counters growing steadily since the fake engine started"""
+    seed = int(container['Id'][:8], 16)
+    uptime = time.monotonic()
+    return {
+        'cpu_stats': {'cpu_usage': {'total_usage': int(uptime * (seed % 50 + 1) * 1e7)}},
+        'memory_stats': {'usage': (seed % 200 + 20) * 1024 ** 2, 'stats': {'inactive_file': 4 * 1024 ** 2}},
+        'networks': {'eth0': {'rx_bytes': int(uptime * (seed % 1000)), 'tx_bytes': int(uptime * (seed % 500))}},
+    }
+
+
+def matches(container, filters):
+    for label in filters.get('label', []):
+        key, _, value = label.partition('=')
+        if key not in container['Labels'] or (value and container['Labels'][key] != value):
+            return False
+    if 'status' in filters and container['State'] not in filters['status']:
+        return False
+    if 'name' in filters and not any(n in container['Name'] for n in filters['name']):
+        return False
+    if 'id' in filters and not any(container['Id'].startswith(i) for i in filters['id']):
+        return False
+    return True
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Routes Engine API calls to the FakeEngine on the server"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        # Headers and body are written separately; without this, delayed ACKs add ~40ms per call
+        if self.connection.family != socket.AF_UNIX:
+            self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, format, *args):
+        pass
+
+    def address_string(self):
+        return 'fake-docker'
+
+    def send_json(self, status, body=None):
+        data = json.dumps(body).encode() if body is not None else b''
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length) or b'{}') if length else {}
+
+    def route(self, method):
+        engine = self.server.engine
+        engine.requests += 1
+        if engine.latency:
+            time.sleep(engine.latency)
+
+        url = urlparse(self.path)
+        path = re.sub(r'^/v[\d.]+', '', url.path)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+
+        if path in ('/_ping', '/version', '/info') and method == 'GET':
+            if path == '/_ping':
+                data = b'OK'
+                self.send_response(200)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+                return
+            if path == '/version':
+                return self.send_json(200, {'ApiVersion': API_VERSION, 'MinAPIVersion': '1.12',
+                                            'Version': '20.10.0-fake', 'Os': 'linux', 'Arch': 'amd64'})
+            running = sum(1 for c in engine.containers.values() if c['State'] == 'running')
+            return self.send_json(200, {'MemTotal': engine.memory, 'NCPU': engine.cpus,
+                                        'Containers': len(engine.containers), 'ContainersRunning': running})
+
+        if path == '/containers/json' and method == 'GET':
+            filters = parse_filters(query.get('filters'))
+            show_all = query.get('all') in ('1', 'true', 'True')
+            with engine.lock:
+                containers = sorted(engine.containers.values(), key=lambda c: c['Order'], reverse=True)
+                if 'before' in filters:
+                    anchor = engine.find(filters['before'][0])
+                    if anchor is None:
+                        return self.send_json(404, {'message': f"No such container: {filters['before'][0]}"})
+                    containers = [c for c in containers if c['Order'] < anchor['Order']]
+                with_size = query.get('size') in ('1', 'true', 'True')
+                result = [summary(c, with_size) for c in containers
+                          if (show_all or c['State'] == 'running') and matches(c, filters)]
+            limit = int(query.get('limit', -1))
+            if limit > 0:
+                result = result[:limit]
+            return self.send_json(200, result)
+
+        if path == '/containers/create' and method == 'POST':
+            container_id, error = engine.create(query.get('name'), self.read_body())
+            if error:
+                return self.send_json(409, {'message': error})
+            return self.send_json(201, {'Id': container_id, 'Warnings': []})
+
+        match = re.match(r'^/containers/([^/]+)(?:/(\w+))?$', path)
+        if match:
+            container = engine.find(match.group(1))
+            if container is None:
+                return self.send_json(404, {'message': f"No such container: {match.group(1)}"})
+            action = match.group(2)
+
+            if method == 'GET' and action == 'json':
+                return self.send_json(200, inspect(container))
+            if method == 'DELETE' and action is None:
+                with engine.lock:
+                    if container['State'] == 'running' and query.get('force') not in ('1', 'true', 'True'):
+                        return self.send_json(409, {'message': 'You cannot remove a running container'})
+                    del engine.containers[container['Id']]
+                return self.send_json(204)
+            if method == 'POST' and action in ('start', 'restart'):
+                if action == 'restart':
+                    container['State'] = 'exited'
+                error = engine.start(container['Id'])
+                if error:
+                    return self.send_json(500, {'message': error})
+                return self.send_json(204)
+            if method == 'POST' and action in ('stop', 'kill'):
+                container['State'] = 'exited'
+                return self.send_json(204)
+            if method == 'POST' and action == 'rename':
+                with engine.lock:
+                    if any(c['Name'] == query.get('name') for c in engine.containers.values() if c is not container):
+                        return self.send_json(409, {'message': f"Conflict. The name \"/{query.get('name')}\" is in use"})
+                    container['Name'] = query.get('name')
+                return self.send_json(204)
+            if method == 'POST' and action in ('pause', 'unpause'):
+                if container['State'] != ('running' if action == 'pause' else 'paused'):
+                    return self.send_json(409, {'message': f"Container {container['Id']} is {container['State']}"})
+                container['State'] = 'paused' if action == 'pause' else 'running'
+                return self.send_json(204)
+            if method == 'GET' and action == 'stats':
+                return self.send_json(200, stats(container))
+            if method == 'POST' and action == 'wait':
+                return self.send_json(200, {'StatusCode': 0})
+
+        if path == '/commit' and method == 'POST':
+            container = engine.find(query.get('container', ''))
+            if container is None:
+                return self.send_json(404, {'message': f"No such container: {query.get('container')}"})
+            image_id = engine.commit(container, query.get('repo'), query.get('tag'), self.read_body())
+            return self.send_json(201, {'Id': image_id})
+
+        if path == '/images/json' and method == 'GET':
+            filters = parse_filters(query.get('filters'))
+            with engine.lock:
+                images = [image for image in engine.images.values() if matches(image, filters)]
+            return self.send_json(200, images)
+
+        if path.startswith('/images/') and method == 'GET':
+            name = path[len('/images/'):].rsplit('/json', 1)[0]
+            image = engine.image(name)
+            if image:
+                return self.send_json(200, image)
+            if name.startswith('sha256:'):
+                return self.send_json(404, {'message': f"No such image: {name}"})
+            # Any other name is a base image the fake daemon pretends to have
+            return self.send_json(200, {'Id': f"sha256:{hashlib.sha256(name.encode()).hexdigest()}",
+                                        'RepoTags': [name]})
+
+        if path.startswith('/images/') and method == 'DELETE':
+            name = path[len('/images/'):]
+            with engine.lock:
+                image = engine.image(name)
+                if image is None:
+                    return self.send_json(404, {'message': f"No such image: {name}"})
+                refs = {image['Id']} | set(image['RepoTags'])
+                if any(c['Image'] in refs for c in engine.containers.values()) or \
+                        any(other['Parent'] == image['Id'] for other in engine.images.values()):
+                    return self.send_json(409, {'message': f"conflict: unable to delete {name}: image is in use"})
+                del engine.images[image['Id']]
+            return self.send_json(200, [{'Untagged': tag} for tag in image['RepoTags']] + [{'Deleted': image['Id']}])
+
+        self.send_json(404, {'message': f"page not found: {method} {path}"})
+
+    def do_GET(self):
+        self.route('GET')
+
+    def do_POST(self):
+        self.route('POST')
+
+    def do_DELETE(self):
+        self.route('DELETE')
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    # dockerd listens with the system backlog; the default of 5 drops concurrent clients
+    request_queue_size = 1024
+
+
+class FakeTCPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+def make_server(engine, port=None, socket_path=None, host='127.0.0.1'):
+    """Create a server for the engine on a TCP port or a unix socket"""
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = UnixHTTPServer(socket_path, Handler)
+    else:
+        server = FakeTCPServer((host, port or 0), Handler)
+    server.engine = engine
+    return server
+
+
+def start_in_thread(engine, port=None, socket_path=None):
+    """
+    Serve the engine from a background thread.
+    Returns: tuple (server, base_url) where base_url is usable with docker.DockerClient
+    """
+    server = make_server(engine, port=port, socket_path=socket_path)
+    threading.Thread(target=server.serve_forever, name='fake-docker', daemon=True).start()
+    if socket_path:
+        return server, f"unix://{socket_path}"
+    return server, f"tcp://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Fake Docker Engine API for benchmarks')
+    parser.add_argument('--port', type=int, default=2375)
+    parser.add_argument('--socket', help='Serve on a unix socket instead of TCP')
+    parser.add_argument('--seed', type=int, default=0, help='Number of pool containers to create')
+    parser.add_argument('--latency-ms', type=float, default=0, help='Delay added to every request')
+    args = parser.parse_args()
+
+    engine = FakeEngine(latency=args.latency_ms / 1000)
+    engine.seed(args.seed)
+    server = make_server(engine, port=args.port, socket_path=args.socket)
+    where = f"unix://{args.socket}" if args.socket else f"tcp://127.0.0.1:{args.port}"
+    print(f"Fake Docker Engine on {where} with {args.seed} containers (DOCKER_HOST={where})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
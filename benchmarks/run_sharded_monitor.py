@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Sharded Monitor Run
+Starts several container_monitor.py workers as separate processes against the fake
+Docker Engine and a throwaway database, kills one part-way through, and prints how
+the shards moved and how long each shard's cycle took.
+
+    python benchmarks/run_sharded_monitor.py --workers 3 --containers 2000
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+APP_DIR = BENCH_DIR.parent / 'app'
+sys.path.insert(0, str(BENCH_DIR))
+sys.path.insert(0, str(APP_DIR))
+
+from fake_docker import FakeEngine, start_in_thread
+
+
+def write_catalog(workdir, shards, lease_seconds, interval):
+    """Copy the catalog with short leases so a killed worker is noticed quickly"""
+    with open(APP_DIR / 'pool_catalog.json') as f:
+        data = json.load(f)
+    data['monitor'] = {'shards': shards, 'lease_seconds': lease_seconds, 'interval_seconds': interval}
+    # Keep the run about the shards: no pool moves or lease reclaim
+    data['rebalance']['enabled'] = False
+    data['leases']['enabled'] = False
+    path = Path(workdir) / 'pool_catalog.json'
+    path.write_text(json.dumps(data, indent=2))
+    return path
+
+
+def seed_database(engine, users):
+    """One database row per assigned container in the fake engine"""
+    from app import create_app, db, User, Container
+    app = create_app(background=False)
+
+    with app.app_context():
+        db.create_all()
+        accounts = [User(username=f"user{i}", email=f"user{i}@example.com", password_hash='x') for i in range(users)]
+        db.session.add_all(accounts)
+        db.session.commit()
+
+        rows = []
+        for index, container in enumerate(c for c in engine.containers.values()
+                                           if c['Labels'].get('status') == 'assigned'):
+            port = int(next(iter(container['PortBindings'].values()))[0]['HostPort'])
+            rows.append({
+                'container_id': container['Id'],
+                'name': container['Name'],
+                'image_name': container['Image'],
+                'image_type': container['Labels']['type'],
+                'status': 'running',
+                'host_port': port,
+                'container_port': 80,
+                'pool_name': container['Name'],
+                'user_id': accounts[index % users].id,
+            })
+        db.session.bulk_insert_mappings(Container, rows)
+        db.session.commit()
+        return len(rows)
+
+
+def show_shards(env):
+    subprocess.run([sys.executable, str(APP_DIR / 'container_monitor.py'), '--shard-status'], env=env,
+                   cwd=APP_DIR, stderr=subprocess.DEVNULL)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run sharded monitor workers locally')
+    parser.add_argument('--workers', type=int, default=3)
+    parser.add_argument('--containers', type=int, default=2000)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--shards', type=int, default=12)
+    parser.add_argument('--interval', type=float, default=2)
+    parser.add_argument('--lease-seconds', type=float, default=6)
+    parser.add_argument('--duration', type=float, default=24, help='Seconds to run in total')
+    args = parser.parse_args()
+
+    engine = FakeEngine()
+    engine.seed(args.containers)
+    # A few stopped containers give the workers something to recover
+    for container in list(engine.containers.values())[::50]:
+        container['State'] = 'exited'
+    server, base_url = start_in_thread(engine)
+
+    workdir = tempfile.mkdtemp(prefix='sharded-monitor-')
+    env = dict(os.environ)
+    env.update({
+        'DOCKER_HOST': base_url,
+        'DATABASE_URL': f"sqlite:///{workdir}/monitor.db",
+        'POOL_CATALOG': str(write_catalog(workdir, args.shards, args.lease_seconds, args.interval)),
+        'POOL_METRICS': f"{workdir}/metrics.json",
+        'MONITOR_LOG': f"{workdir}/monitor.log",
+    })
+    os.environ.update(env)
+    tracked = seed_database(engine, args.users)
+    print(f"Fake Docker on {base_url}: {args.containers} containers, {tracked} tracked in the database")
+    print(f"Work directory: {workdir}")
+
+    workers = []
+    for index in range(args.workers):
+        workers.append(subprocess.Popen(
+            [sys.executable, str(APP_DIR / 'container_monitor.py'), '--worker', '--name', f"worker-{index}"],
+            env=env, cwd=APP_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        ))
+
+    try:
+        time.sleep(args.duration / 2)
+        print(f"\nShards with {args.workers} workers:")
+        show_shards(env)
+
+        print(f"\nKilling worker-0 (pid {workers[0].pid}) without releasing its leases...")
+        workers[0].kill()
+        time.sleep(args.duration / 2)
+        print(f"\nShards after its leases expired ({args.workers - 1} workers):")
+        show_shards(env)
+    finally:
+        for process in workers:
+            process.terminate()
+        for process in workers:
+            process.wait()
+        server.shutdown()
+
+    with open(env['POOL_METRICS']) as f:
+        metrics = json.load(f)
+    print("\nPer-shard cycles and recoveries:")
+    for shard in range(args.shards):
+        cycles = metrics['counters'].get(f'monitor.shard.{shard}.cycles', 0)
+        recovered = metrics['counters'].get(f'monitor.shard.{shard}.recovered', 0)
+        seconds = metrics['gauges'].get(f'monitor.shard.{shard}.cycle_seconds', 0)
+        print(f"  shard {shard:2d}: {cycles:3d} cycles, {recovered:3d} recovered, last cycle {seconds:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Test fixtures: the web app on a throwaway SQLite database, talking to the fake Docker
+Engine from benchmarks/fake_docker.py, like the chaos harness does.
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / 'benchmarks'))
+sys.path.insert(0, str(ROOT / 'app'))
+
+from fake_docker import FakeEngine, start_in_thread
+
+WORKDIR = tempfile.mkdtemp(prefix='paas-tests-')
+ENGINE = FakeEngine()
+SERVER, BASE_URL = start_in_thread(ENGINE)
+
+# Set before the app is imported, which reads them at import
+os.environ.update({
+    'DOCKER_HOST': BASE_URL,
+    'DATABASE_URL': f"sqlite:///{WORKDIR}/tests.db",
+    'POOL_METRICS': f"{WORKDIR}/metrics.json",
+    'DEMAND_TRACE': f"{WORKDIR}/demand.log",
+    'UPLOAD_FOLDER': f"{WORKDIR}/user_files",
+    'RESOURCE_STATS': f"{WORKDIR}/resource_stats.json",
+    'MONITOR_LOG': f"{WORKDIR}/monitor.log",
+    'USER_CACHE_TTL': '30',
+})
+
+import app as web
+
+web.create_app({'TESTING': True}, background=False)
+
+
+@pytest.fixture
+def engine():
+    """The fake Docker Engine, with one available pool container per seed type"""
+    with ENGINE.lock:
+        ENGINE.containers.clear()
+    ENGINE.seed(4, assigned_fraction=0)
+    return ENGINE
+
+
+@pytest.fixture
+def app(engine):
+    """The web app on an empty database"""
+    with web.app.app_context():
+        web.db.drop_all()
+        web.db.create_all()
+    web.user_cache.clear()
+    return web.app
+
+
+@pytest.fixture
+def user(app):
+    """A registered user, by id"""
+    with app.app_context():
+        user = web.User(username='alice', email='alice@example.com')
+        user.set_password('secret123')
+        web.db.session.add(user)
+        web.db.session.commit()
+        return user.id
+
+
+@pytest.fixture
+def client(app, user):
+    """Test client logged in as the user"""
+    client = app.test_client()
+    client.post('/login', data={'username': 'alice', 'password': 'secret123'})
+    return client
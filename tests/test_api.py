@@ -0,0 +1,71 @@
+"""Token-authenticated JSON API"""
+
+import time
+from datetime import datetime, timedelta
+
+import app as web
+import asgi
+
+TOKEN = 'test-token'
+
+
+def give_token(user_id):
+    with web.app.app_context():
+        web.User.query.filter_by(id=user_id).update({'api_token_hash': web.hash_api_token(TOKEN)})
+        web.db.session.commit()
+
+
+def add_container(user_id, lease_expires_at):
+    with web.app.app_context():
+        container = web.Container(container_id='c0ffee', name='site', image_name='nginx:latest', image_type='nginx',
+                                  status='running', host_port=8000, container_port=80, user_id=user_id,
+                                  lease_expires_at=lease_expires_at)
+        web.db.session.add(container)
+        web.db.session.commit()
+        return container.id
+
+
+def test_api_requests_renew_leases(app, user):
+    give_token(user)
+    expiring = datetime.utcnow() + timedelta(minutes=1)
+    container_id = add_container(user, expiring)
+    
+    response = app.test_client().get('/api/v1/containers', headers={'Authorization': f'Bearer {TOKEN}'})
+    assert response.status_code == 200
+    
+    with web.app.app_context():
+        assert web.db.session.get(web.Container, container_id).lease_expires_at > expiring + timedelta(hours=1)
+        assert web.db.session.get(web.User, user).last_seen_at is not None
+
+
+def test_async_api_requests_renew_leases(app, user):
+    give_token(user)
+    expiring = datetime.utcnow() + timedelta(minutes=1)
+    container_id = add_container(user, expiring)
+    
+    with web.app.app_context():
+        assert asgi.api_user_id(TOKEN) == user
+        assert web.db.session.get(web.Container, container_id).lease_expires_at > expiring + timedelta(hours=1)
+
+
+def test_launch_rejects_huge_count_before_expanding_it(app, user):
+    give_token(user)
+    started = time.monotonic()
+    response = app.test_client().post('/api/v1/containers/launch', headers={'Authorization': f'Bearer {TOKEN}'},
+                                      json={'items': [{'image_type': 'nginx', 'count': 100000000}]})
+    assert response.status_code == 400
+    assert 'At most' in response.get_json()['error']
+    assert time.monotonic() - started < 1
+
+
+def test_status_keeps_last_known_status_while_docker_is_unreachable(app, user, monkeypatch):
+    give_token(user)
+    container_id = add_container(user, None)
+    monkeypatch.setattr(web, 'get_container_status', lambda docker_id: 'unknown')
+    
+    response = app.test_client().post('/api/v1/containers/status', headers={'Authorization': f'Bearer {TOKEN}'},
+                                      json={'ids': [container_id]})
+    assert response.status_code == 200
+    assert response.get_json()['results'][0]['status'] == 'running'
+    with web.app.app_context():
+        assert web.db.session.get(web.Container, container_id).status == 'running'
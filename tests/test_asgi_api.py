@@ -0,0 +1,53 @@
+"""Natively served JSON API endpoints (asgi.py) against the Flask routes they mirror"""
+
+import asyncio
+
+import app as web
+import asgi
+
+
+def call(handler, user_id, payload):
+    async def run():
+        try:
+            return await handler(user_id, payload)
+        finally:
+            await asgi.docker.close()
+    return asyncio.run(run())
+
+
+def test_async_stop_keeps_container_warm_and_launch_reclaims_it(client, user, engine):
+    client.post('/launch', data={'image_type': 'nginx', 'container_name': 'site'})
+    with web.app.app_context():
+        container = web.Container.query.filter_by(user_id=user).one()
+        container_id, docker_id = container.id, container.container_id
+    
+    status, data = call(asgi.api_stop, user, {'ids': [container_id]})
+    assert status == 200
+    assert data['results'][0] == {'id': container_id, 'status': 'stopped', 'warm': True}
+    assert engine.containers[docker_id]['State'] == 'paused'
+    
+    status, data = call(asgi.api_launch, user, {'items': [{'image_type': 'nginx', 'name': 'site'}]})
+    assert status == 200
+    assert data['results'][0]['warm'] is True
+    assert data['results'][0]['container']['id'] == container_id
+    assert engine.containers[docker_id]['State'] == 'running'
+    with web.app.app_context():
+        assert web.WarmContainer.query.count() == 0
+
+
+def test_async_launch_recycles_warm_container_of_another_user(client, user, engine):
+    client.post('/launch', data={'image_type': 'nginx', 'container_name': 'site'})
+    client.post('/stop/1')
+    with web.app.app_context():
+        assert web.WarmContainer.query.count() == 1
+        other = web.User(username='bob', email='bob@example.com', password_hash='x')
+        web.db.session.add(other)
+        web.db.session.commit()
+        other_id = other.id
+    
+    status, data = call(asgi.api_launch, other_id, {'items': [{'image_type': 'nginx'}]})
+    assert status == 200
+    assert data['results'][0]['status'] == 'launched'
+    with web.app.app_context():
+        assert web.WarmContainer.query.count() == 0
+        assert web.Container.query.filter_by(user_id=other_id).count() == 1
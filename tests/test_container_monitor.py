@@ -0,0 +1,28 @@
+"""Fleet checks of the container monitor (container_monitor.py)"""
+
+import app as web
+import container_monitor
+
+
+def track(user_id, docker_id, number):
+    container = web.Container(container_id=docker_id, image_name='nginx:latest', image_type='nginx', status='running',
+                              host_port=8000 + number, container_port=80, user_id=user_id)
+    web.db.session.add(container)
+    web.db.session.flush()
+    return container.id
+
+
+def test_fleet_states_keeps_only_containers_that_are_down(app, user, engine):
+    ids = list(engine.containers)
+    engine.containers[ids[1]]['State'] = 'exited'
+    with app.app_context():
+        running = track(user, ids[0], 0)
+        stopped = track(user, ids[1], 1)
+        missing = track(user, 'gone', 2)
+        web.db.session.commit()
+        
+        total, states = container_monitor.get_fleet_states()
+    
+    assert total == 3
+    assert states == {stopped: 'stopped', missing: 'missing'}
+    assert running not in states
@@ -0,0 +1,35 @@
+"""Rolling image upgrades of pool containers (pool_manager.py)"""
+
+import pool_manager
+
+
+def pool_container(engine, image_type='nginx'):
+    summary = next(c for c in engine.containers.values() if c['Labels']['type'] == image_type)
+    return pool_manager.client.containers.get(summary['Id'])
+
+
+def test_recreate_replaces_container_with_new_image(engine):
+    old = pool_container(engine)
+    new = pool_manager.recreate_with_image(old, 'nginx', 'nginx:1.27')
+    
+    assert new is not None
+    assert old.id not in engine.containers
+    assert engine.containers[new.id]['Name'] == old.name
+    assert engine.containers[new.id]['State'] == 'running'
+
+
+def test_recreate_keeps_old_container_when_new_one_does_not_start(engine, monkeypatch):
+    old = pool_container(engine)
+    monkeypatch.setattr(pool_manager, 'wait_until_running', lambda container: False)
+    
+    assert pool_manager.recreate_with_image(old, 'nginx', 'nginx:broken') is None
+    assert [c['Id'] for c in engine.containers.values() if c['Labels']['type'] == 'nginx'] == [old.id]
+    assert engine.containers[old.id]['Name'] == old.name
+    assert engine.containers[old.id]['State'] == 'running'
+
+
+def test_status_lists_every_pool_container(engine, capsys):
+    pool_manager.show_pool_status()
+    output = capsys.readouterr().out
+    for container in engine.containers.values():
+        assert container['Name'] in output
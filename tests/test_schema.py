@@ -0,0 +1,45 @@
+"""Schema upgrades of existing databases (app.upgrade_schema)"""
+
+from datetime import datetime
+
+import app as web
+
+
+def make_container(user_id, container_id, number):
+    return web.Container(id=number, container_id=container_id, image_name='nginx:latest', image_type='nginx',
+                         status='running', host_port=8000 + number, container_port=80, user_id=user_id)
+
+
+def test_upgrade_rebuilds_container_table_without_reusing_warm_ids(app, user):
+    with app.app_context():
+        engine = web.db.engine
+        web.Container.__table__.drop(engine)
+        # The table as created before it had AUTOINCREMENT
+        metadata = web.db.MetaData()
+        web.User.__table__.to_metadata(metadata)
+        old_table = web.Container.__table__.to_metadata(metadata)
+        old_table.dialect_options['sqlite']['autoincrement'] = False
+        old_table.create(engine)
+        
+        web.db.session.add_all([make_container(user, 'a', 1), make_container(user, 'b', 2)])
+        # Container 3 was stopped and is kept warm; its row is gone
+        web.db.session.add(web.WarmContainer(id=3, container_id='c', user_id=user, image_type='nginx',
+                                             image_name='nginx:latest', host_port=8003, container_port=80,
+                                             pool_name='pool_nginx_0_8003', released_at=datetime.utcnow()))
+        web.db.session.commit()
+        
+        web.upgrade_schema()
+        web.upgrade_schema()
+        
+        sql = web.db.session.execute(web.db.text(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'container'")).scalar()
+        assert 'AUTOINCREMENT' in sql
+        indexes = {index['name'] for index in web.db.inspect(engine).get_indexes('container')}
+        assert indexes == {index.name for index in web.Container.__table__.indexes}
+        assert [c.container_id for c in web.Container.query.order_by(web.Container.id)] == ['a', 'b']
+        
+        container = web.Container(container_id='d', image_name='nginx:latest', image_type='nginx',
+                                  status='running', host_port=8004, container_port=80, user_id=user)
+        web.db.session.add(container)
+        web.db.session.commit()
+        assert container.id == 4
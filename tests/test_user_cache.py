@@ -0,0 +1,50 @@
+"""Cached users and containers (app.load_user) against rows changed behind the cache"""
+
+import app as web
+
+
+def launch(client, image_type='nginx'):
+    client.post('/launch', data={'image_type': image_type, 'container_name': 'site'})
+    with web.app.app_context():
+        return web.Container.query.filter_by(image_type=image_type).one().id
+
+
+def replace_in_docker(engine, docker_id):
+    """Recreate a container under a new Docker id, as the monitor's recovery does"""
+    with engine.lock:
+        container = engine.containers.pop(docker_id)
+        new_id = engine.new_id(container['Name'])
+        engine.containers[new_id] = dict(container, Id=new_id)
+    return new_id
+
+
+def test_stop_uses_container_replaced_after_user_was_cached(client, engine):
+    container_id = launch(client)
+    # The first request records activity and drops the entry; the second caches the user
+    client.get(f'/upload/{container_id}')
+    client.get(f'/upload/{container_id}')
+    entry = web.user_cache.get(next(iter(web.user_cache.entries)))
+    old_docker_id = entry['containers'][0]['container_id']
+    
+    new_docker_id = replace_in_docker(engine, old_docker_id)
+    with web.app.app_context():
+        web.Container.query.filter_by(id=container_id).update({'container_id': new_docker_id})
+        web.db.session.commit()
+    
+    client.post(f'/stop/{container_id}')
+    
+    with web.app.app_context():
+        warm = web.db.session.get(web.WarmContainer, container_id)
+        assert warm is not None
+        assert warm.container_id == new_docker_id
+    assert engine.containers[new_docker_id]['State'] == 'paused'
+    assert old_docker_id not in engine.containers
+
+
+def test_cached_user_is_not_in_the_session(client, user):
+    client.get('/dashboard')
+    with web.app.test_request_context():
+        web.load_user(user)
+        cached = web.load_user(user)
+        assert cached not in web.db.session
+        assert web.db.session.get(web.User, user) is not cached